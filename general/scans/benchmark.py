@@ -0,0 +1,547 @@
+"""
+The module benchmarks the scan engine against a simulated instrument.
+
+The mock genie_python used by the tests answers every call at once, so
+the tests say nothing about how many points a second a scan can manage.
+The LatencyGenie instead simulates a single axis instrument and a DAE,
+and waits for a configurable time in each of the calls that go over
+the network on a real instrument: cget, cset, waitfor_move, get_spectrum
+and integrate_spectrum.  Counting takes no time, so whatever is left
+once the injected latency is taken away is the overhead of the scan
+engine itself.
+
+The benchmarks run SimpleScan, ProductScan, ContinuousScan and a
+SimpleScan fitted with each of the standard fits, and report the points
+per second, the overhead of each point and the peak memory used.  The
+results can be saved and compared with a later run, e.g.
+
+    python -m general.scans.benchmark --points 10 100 --save base.json
+    python -m general.scans.benchmark --points 10 100 --baseline base.json
+
+The second command fails if any benchmark has become slower or uses more
+memory than the baseline by more than the allowed margin.  From Python,
+main takes the same arguments and returns the results and regressions.
+"""
+
+from __future__ import print_function
+
+import argparse
+from contextlib import ExitStack, contextmanager, redirect_stdout
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from matplotlib.figure import Figure
+from mock import patch
+
+from . import checkpoint, defaults, detector, monitor, motion, scans
+from .defaults import Defaults
+from .detector import NormalisedIntensityDetector, create_spectra_definition
+from .fit import (CentreOfMass, DampedOscillator, Erf, Gaussian, Linear,
+                  SlitScan, TopHat)
+from .motion import BlockMotion
+from .scans import ContinuousMove, ContinuousScan, ProductScan, SimpleScan
+
+#: The calls of the LatencyGenie that wait before they answer
+LATENCY_CALLS = ("cget", "cset", "waitfor_move", "get_spectrum",
+                 "integrate_spectrum")
+
+#: The number of points in each size of scan
+DEFAULT_POINTS = (10, 100, 1000, 10000)
+
+#: The fits that are benchmarked
+FITS = (Linear, Gaussian, DampedOscillator, Erf, TopHat, CentreOfMass,
+        SlitScan)
+
+#: The factor by which a benchmark may be slower, or use more memory,
+#: than its baseline before it counts as a regression
+DEFAULT_MARGIN = 1.25
+
+#: The time between samples of a continuous scan
+CONTINUOUS_SAMPLE_SECONDS = 0.001
+
+# The modules which talk to genie_python
+_GENIE_MODULES = (checkpoint, defaults, detector, monitor, motion, scans)
+
+
+class LatencyGenie(object):
+    """
+    A simulated genie_python which waits before answering the calls
+    that would go over the network on a real instrument.
+
+    Moves are instant, unless the velocity of the axis has been set
+    (as a ContinuousScan does), in which case the axis travels to its
+    target at that velocity.  The detector sees a peak at zero, above a
+    flat background, normalised to a monitor.  Calls that are not
+    simulated do nothing.
+    """
+
+    def __init__(self, latencies=None, script_dir=None,
+                 blocks=("Theta", "Two_Theta")):
+        """
+        Parameters
+        ----------
+        latencies
+            a dictionary from the name of a call in LATENCY_CALLS to the
+            time in seconds that it waits
+        script_dir
+            the directory for the scan logs
+        blocks
+            the names of the blocks of the instrument
+        """
+        unknown = set(latencies or {}) - set(LATENCY_CALLS)
+        if unknown:
+            raise ValueError("Cannot add latency to {}".format(
+                ", ".join(sorted(unknown))))
+        self.latencies = dict(latencies or {})
+        self.script_dir = script_dir
+        self.injected = 0.0
+        self.calls = {name: 0 for name in LATENCY_CALLS}
+        self.pvs = {}
+        self.runstate = "SETUP"
+        self.period = 1
+        self._moves = {block: (0.0, 0.0, 0.0, None) for block in blocks}
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+    def _wait(self, call):
+        self.calls[call] += 1
+        latency = self.latencies.get(call, 0)
+        if latency:
+            time.sleep(latency)
+            self.injected += latency
+
+    def _position(self, block):
+        start, target, started, velocity = self._moves[block]
+        if velocity is None:
+            return target
+        travelled = velocity * (time.time() - started)
+        if travelled >= abs(target - start):
+            return target
+        return start + np.sign(target - start) * travelled
+
+    def cget(self, block):
+        """Read a block"""
+        self._wait("cget")
+        if block not in self._moves:
+            return None
+        return {"name": block, "value": self._position(block)}
+
+    def cset(self, block=None, value=None, **kwargs):
+        """Set blocks, starting any moves"""
+        self._wait("cset")
+        targets = dict(kwargs)
+        if block is not None:
+            targets[block] = value
+        for name, target in targets.items():
+            velocity = self.pvs.get("CS:SB:{}.VELO".format(name))
+            self._moves[name] = (self._position(name), float(target),
+                                 time.time(),
+                                 float(velocity) if velocity else None)
+
+    def waitfor_move(self, *blocks, **kwargs):
+        """Wait for moves to finish"""
+        # pylint: disable=unused-argument
+        self._wait("waitfor_move")
+        for name in blocks or list(self._moves):
+            start, target, started, velocity = self._moves[name]
+            if velocity:
+                arrival = started + abs(target - start) / velocity
+                time.sleep(max(0.0, arrival - time.time()))
+
+    def get_blocks(self):
+        """The names of the blocks"""
+        return list(self._moves)
+
+    def get_pv(self, name, **kwargs):
+        """Read a PV, e.g. the deadband of an axis"""
+        # pylint: disable=unused-argument
+        if name.endswith(".RDBD"):
+            return self.pvs.get(name, 0.001)
+        return self.pvs.get(name)
+
+    def set_pv(self, name, value, **kwargs):
+        """Write a PV, e.g. the velocity of an axis"""
+        # pylint: disable=unused-argument
+        self.pvs[name] = value
+
+    def _counts(self, spectrum):
+        if spectrum == 1:
+            return 1000.0
+        theta = self._position("Theta")
+        return 100.0 + 1000.0 * np.exp(-theta ** 2 / 2.0)
+
+    def get_spectrum(self, spectrum, period=1, *args, **kwargs):
+        """Read a spectrum"""
+        # pylint: disable=unused-argument, keyword-arg-before-vararg
+        self._wait("get_spectrum")
+        signal = np.full(1000, self._counts(spectrum) / 1000.0)
+        return {"time": np.arange(1001.0), "signal": signal, "sum": None,
+                "mode": "distribution"}
+
+    def integrate_spectrum(self, spectrum, period=1, t_min=None, t_max=None):
+        """Sum the counts of a spectrum"""
+        # pylint: disable=unused-argument
+        self._wait("integrate_spectrum")
+        return self._counts(spectrum)
+
+    def get_runstate(self):
+        """The state of the DAE"""
+        return self.runstate
+
+    def begin(self, paused=False, **kwargs):
+        """Start a run"""
+        # pylint: disable=unused-argument
+        self.runstate = "PAUSED" if paused else "RUNNING"
+
+    def resume(self):
+        """Resume counting"""
+        self.runstate = "RUNNING"
+
+    def pause(self):
+        """Pause counting"""
+        self.runstate = "PAUSED"
+
+    def end(self):
+        """End the run"""
+        self.runstate = "SETUP"
+
+    def abort(self):
+        """Abort the run"""
+        self.runstate = "SETUP"
+
+    def get_period(self):
+        """The current period"""
+        return self.period
+
+    def change_period(self, period):
+        """Move to another period"""
+        self.period = period
+
+    def get_frames(self):
+        """The frames counted, which never changes as counts are instant"""
+        return 0
+
+    def get_uamps(self):
+        """The current counted, which never changes as counts are instant"""
+        return 0.0
+
+    def get_script_dir(self):
+        """The directory for the scan logs"""
+        return self.script_dir
+
+
+@contextmanager
+def use_genie(genie):
+    """
+    Make the scan engine talk to a simulated genie_python
+
+    Parameters
+    ----------
+    genie
+        the simulated genie_python, e.g. a LatencyGenie
+    """
+    with ExitStack() as stack:
+        for module in _GENIE_MODULES:
+            stack.enter_context(patch.object(module, "g", genie))
+        yield genie
+
+
+class _NullPlot(object):
+    """Plot functions that draw nothing, so that only the scan engine is
+    timed"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class BenchmarkDefaults(Defaults):
+    """
+    The defaults of the simulated instrument.  Scans are measured with a
+    NormalisedIntensityDetector and, unless plot is set, nothing is drawn.
+    """
+
+    detector = NormalisedIntensityDetector(spectra_definitions=[
+        create_spectra_definition(1, name="default_monitor"),
+        create_spectra_definition(2, name="default_detector")])
+
+    def __init__(self, plot=False):
+        """
+        Parameters
+        ----------
+        plot
+            whether to draw the plots, on a figure that is never shown
+        """
+        self.plot_functions = _NullPlot()
+        self._fig = Figure()
+        self._axis = self._fig.add_subplot(1, 1, 1)
+        if plot:
+            # pylint: disable=import-outside-toplevel
+            from .plot_functions import PlotFunctions
+            self.plot_functions = PlotFunctions()
+
+    def get_fig(self):
+        return self._fig, self._axis
+
+
+def _grid(points):
+    """The sides of a grid with about the given number of points"""
+    side = max(2, int(round(np.sqrt(points))))
+    return side, max(1, int(round(points / side)))
+
+
+def _scan(kind, points, bench_defaults, genie):
+    """Create a scan and the function that runs it"""
+    theta = BlockMotion("Theta", "deg")
+    if kind == "SimpleScan":
+        scan = SimpleScan(theta, np.linspace(-5, 5, points), bench_defaults)
+        return scan, lambda: scan.plot(frames=1)
+    if kind == "ProductScan":
+        rows, columns = _grid(points)
+        scan = ProductScan(
+            SimpleScan(BlockMotion("Two_Theta", "deg"),
+                       np.linspace(0, 1, rows), bench_defaults),
+            SimpleScan(theta, np.linspace(-5, 5, columns), bench_defaults))
+        scan.defaults = bench_defaults
+        return scan, lambda: scan.plot(frames=1)
+    if kind == "ContinuousScan":
+        genie.cset("Theta", -5.0)
+        speed = 10.0 / (points * CONTINUOUS_SAMPLE_SECONDS)
+        scan = ContinuousScan(theta, [ContinuousMove(-5.0, 5.0, speed)],
+                              bench_defaults)
+        return scan, lambda: scan.plot(
+            frames=1, update_freq=CONTINUOUS_SAMPLE_SECONDS)
+    for fit in FITS:
+        if kind == "fit {}".format(type(fit).__name__):
+            scan = SimpleScan(theta, np.linspace(-5, 5, points),
+                              bench_defaults)
+            return scan, lambda: scan.fit(fit, frames=1)
+    raise ValueError("Unknown benchmark {}".format(kind))
+
+
+def benchmark(kind, points, latencies=None, memory=True, plot=False):
+    """
+    Run a single benchmark
+
+    Parameters
+    ----------
+    kind
+        the name of the benchmark, i.e. SimpleScan, ProductScan,
+        ContinuousScan or "fit " followed by the name of a Fit class
+    points
+        the number of points to measure
+    latencies
+        the latency of each call, as for LatencyGenie
+    memory
+        whether to run the scan a second time to find its peak memory
+    plot
+        whether to draw the plots
+
+    Returns
+    -------
+    A dictionary of the results
+    """
+    # pylint: disable=too-many-locals
+    runs = [False, True] if memory else [False]
+    result = {"benchmark": kind, "points": points}
+    for traced in runs:
+        directory = tempfile.mkdtemp()
+        genie = LatencyGenie(latencies, script_dir=directory)
+        try:
+            with use_genie(genie), open(os.devnull, "w") as quiet, \
+                    redirect_stdout(quiet):
+                bench_defaults = BenchmarkDefaults(plot)
+                scan, run = _scan(kind, points, bench_defaults, genie)
+                if traced:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                try:
+                    run()
+                except RuntimeError as error:
+                    # A fit which fails is still timed
+                    result["error"] = str(error)
+                seconds = time.perf_counter() - started
+                if traced:
+                    result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    continue
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        measured = len(scan.timing) if scan.timing is not None else points
+        measured = max(measured, 1)
+        result.update(
+            measured=measured, seconds=seconds,
+            points_per_second=measured / seconds if seconds > 0 else np.inf,
+            overhead=(seconds - genie.injected) / measured,
+            latency=genie.injected / measured,
+            calls={name: count for name, count in genie.calls.items()
+                   if count})
+    return result
+
+
+def run_benchmarks(points=DEFAULT_POINTS, latencies=None, kinds=None,
+                   memory=True, plot=False):
+    """
+    Run the benchmarks for each size of scan
+
+    Parameters
+    ----------
+    points
+        the number of points in each size of scan
+    latencies
+        the latency of each call, as for LatencyGenie
+    kinds
+        the benchmarks to run; None for every scan and fit
+    memory
+        whether to find the peak memory of each benchmark
+    plot
+        whether to draw the plots
+
+    Returns
+    -------
+    A list of the results of each benchmark, as given by benchmark
+    """
+    # pylint: disable=too-many-arguments
+    if kinds is None:
+        kinds = benchmark_names()
+    return [benchmark(kind, size, latencies, memory, plot)
+            for kind in kinds for size in points]
+
+
+def benchmark_names():
+    """The names of all of the benchmarks"""
+    return ["SimpleScan", "ProductScan", "ContinuousScan"] + \
+        ["fit {}".format(type(fit).__name__) for fit in FITS]
+
+
+def report(results):
+    """
+    Lay out the results of the benchmarks as a table
+
+    Parameters
+    ----------
+    results
+        the results, as given by run_benchmarks
+
+    Returns
+    -------
+    The text of the table
+    """
+    lines = ["{:<28}{:>8}{:>10}{:>12}{:>16}{:>15}{:>12}".format(
+        "Benchmark", "Points", "Time (s)", "Points/s", "Overhead (ms)",
+        "Latency (ms)", "Peak (MiB)")]
+    row = "{:<28}{:>8}{:>10.3f}{:>12.1f}{:>16.3f}{:>15.3f}{:>12}"
+    for result in results:
+        peak = result.get("peak_memory")
+        lines.append(row.format(
+            result["benchmark"] + (" (failed)" if "error" in result else ""),
+            result["measured"], result["seconds"],
+            result["points_per_second"], 1000 * result["overhead"],
+            1000 * result["latency"],
+            "-" if peak is None else "{:.2f}".format(peak / 2.0 ** 20)))
+    return "\n".join(lines)
+
+
+def compare(results, baseline, margin=DEFAULT_MARGIN):
+    """
+    Find the benchmarks which have become slower, or use more memory,
+    than a baseline
+
+    Parameters
+    ----------
+    results
+        the results, as given by run_benchmarks
+    baseline
+        earlier results of the same benchmarks
+    margin
+        the factor by which a benchmark may be worse than its baseline
+
+    Returns
+    -------
+    A list describing each regression, which is empty if there are none
+    """
+    earlier = {(result["benchmark"], result["points"]): result
+               for result in baseline}
+    regressions = []
+    for result in results:
+        base = earlier.get((result["benchmark"], result["points"]))
+        if base is None:
+            continue
+        name = "{} with {} points".format(result["benchmark"],
+                                          result["points"])
+        if result["points_per_second"] * margin < base["points_per_second"]:
+            regressions.append(
+                "{} ran at {:.1f} points/s, down from {:.1f}".format(
+                    name, result["points_per_second"],
+                    base["points_per_second"]))
+        if result.get("peak_memory") and base.get("peak_memory") and \
+                result["peak_memory"] > margin * base["peak_memory"]:
+            regressions.append("{} used {} bytes, up from {}".format(
+                name, result["peak_memory"], base["peak_memory"]))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Run the benchmarks, taking the same arguments as the command line
+
+    Parameters
+    ----------
+    argv
+        the command line arguments; None for those of the process
+
+    Returns
+    -------
+    The results, as given by run_benchmarks, and a list of the
+    regressions from the baseline, which is empty without a baseline
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--points", type=int, nargs="+",
+                        default=list(DEFAULT_POINTS),
+                        help="the number of points in each size of scan")
+    parser.add_argument("--benchmark", nargs="+", choices=benchmark_names(),
+                        dest="kinds",
+                        help="the benchmarks to run, by default all of them")
+    for call in LATENCY_CALLS:
+        parser.add_argument("--" + call, type=float, default=0.0,
+                            help="the latency of {} in seconds".format(call))
+    parser.add_argument("--no-memory", action="store_false", dest="memory",
+                        help="do not measure the peak memory")
+    parser.add_argument("--plot", action="store_true", help="draw the plots")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline",
+                        help="compare the results with this JSON file")
+    parser.add_argument("--margin", type=float, default=DEFAULT_MARGIN,
+                        help="the factor by which a benchmark may be worse "
+                             "than the baseline")
+    args = parser.parse_args(argv)
+
+    latencies = {call: getattr(args, call) for call in LATENCY_CALLS
+                 if getattr(args, call)}
+    results = run_benchmarks(args.points, latencies, args.kinds, args.memory,
+                             args.plot)
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.margin)
+    return results, regressions
+
+
+if __name__ == "__main__":
+    _RESULTS, _REGRESSIONS = main()
+    print(report(_RESULTS))
+    for _REGRESSION in _REGRESSIONS:
+        print("Regression: {}".format(_REGRESSION))
+    sys.exit(1 if _REGRESSIONS else 0)
@@ -0,0 +1,262 @@
+"""
+The module saves the progress of a scan, so that an interrupted scan
+can carry on from where it stopped.
+
+While a scan runs, a checkpoint file next to its log holds the targets
+of every point, the number of points completed, the measurement
+arguments and the tolerance within which measured positions were
+merged into the same point.  The measurements themselves are already kept in the binary
+sidecar of the log.  If the scan is stopped, e.g. by Ctrl+C or by an
+IOC restart, the checkpoint also records the DAE run and period, so
+that the scan can be resumed in the same run without measuring any
+completed point again.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from .plan import ScanPlan
+from .scan_log import load_points, sidecar_path
+
+try:
+    # pylint: disable=import-error
+    from genie_python import genie as g
+except ImportError:
+    from .mocks import g
+
+#: Save the checkpoint when this many seconds have passed since the last save
+CHECKPOINT_SECONDS = 30.0
+
+# The motions of the checkpoints written in this session, so that scans
+# over motions which are not IBEX blocks can still be resumed
+_MOTIONS = {}
+
+
+def checkpoint_path(filename):
+    """
+    Get the name of the checkpoint file for a log file
+
+    Parameters
+    ----------
+    filename
+        the name of the text log file
+
+    Returns
+    -------
+    The name of the checkpoint file
+    """
+    return os.path.splitext(filename)[0] + ".checkpoint"
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _saved_arguments(kwargs):
+    """The measurement arguments which can be written to a checkpoint"""
+    return {key: value for key, value in kwargs.items()
+            if isinstance(value, (bool, int, float, str)) or value is None}
+
+
+class Checkpoint(object):
+    """
+    The progress of a scan, saved periodically while it runs.
+
+    Examples
+    --------
+    >>> checkpoint = Checkpoint("scan.dat", scan.compile(), {"frames": 50})
+    >>> checkpoint.advance(logfile)
+    >>> Checkpoint.load(checkpoint_path("scan.dat")).completed
+    1
+
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, log_file, plan, kwargs, completed=0,
+                 save_seconds=CHECKPOINT_SECONDS, position_tolerance=None):
+        """
+        Parameters
+        ----------
+        log_file
+            the name of the text log file of the scan
+        plan
+            the ScanPlan of the whole scan
+        kwargs
+            the measurement arguments of the scan
+        completed
+            the number of points already measured
+        save_seconds
+            the time between saves of the checkpoint
+        position_tolerance
+            the distance within which the scan merged measured positions
+            into the same point; None if it is not known
+        """
+        self.log_file = log_file
+        self.path = checkpoint_path(log_file)
+        self.plan = plan
+        self.kwargs = _saved_arguments(kwargs)
+        self.completed = completed
+        self.save_seconds = save_seconds
+        self.position_tolerance = position_tolerance
+        self.run_kept = False
+        self.period = None
+        self.periods = None
+        self.run_number = None
+        self._last_save = time.time()
+
+    def __repr__(self):
+        return "Checkpoint({}, {} of {} points)".format(
+            self.log_file, self.completed, len(self.plan))
+
+    @property
+    def remaining(self):
+        """The number of points still to measure"""
+        return len(self.plan) - self.completed
+
+    def advance(self, logfile):
+        """
+        Record that another point has been measured, saving the
+        checkpoint if enough time has passed since the last save.
+
+        Parameters
+        ----------
+        logfile
+            the ScanLog of the scan, which is flushed first so that the
+            sidecar holds every point that the checkpoint counts
+        """
+        self.completed += 1
+        if time.time() - self._last_save >= self.save_seconds:
+            self.save(logfile)
+
+    def keep_run(self, period, periods):
+        """
+        Record that the DAE run has been left paused for the scan to carry
+        on in
+
+        Parameters
+        ----------
+        period
+            the period that the next point should be counted in
+        periods
+            the number of periods in the run
+        """
+        self.run_kept = True
+        self.period = _as_int(period)
+        self.periods = _as_int(periods)
+        self.run_number = _as_int(g.get_runnumber())
+        self.save()
+
+    def save(self, logfile=None):
+        """
+        Write the checkpoint to disk.  The file is replaced in a single
+        step, so it is never left half written.
+
+        Parameters
+        ----------
+        logfile
+            the ScanLog of the scan to flush first; None if it has already
+            been flushed
+        """
+        if logfile is not None:
+            logfile.flush()
+        meta = {"log_file": self.log_file, "completed": self.completed,
+                "kwargs": self.kwargs, "run_kept": self.run_kept,
+                "period": self.period, "periods": self.periods,
+                "run_number": self.run_number,
+                "position_tolerance": self.position_tolerance,
+                "motions": [str(getattr(motion, "title", motion))
+                            for motion in self.plan.motions]}
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as handle:
+            np.savez(handle, targets=self.plan.targets,
+                     meta=np.array(json.dumps(meta)))
+        os.replace(temporary, self.path)
+        _MOTIONS[os.path.abspath(self.path)] = self.plan.motions
+        self._last_save = time.time()
+
+    def remove(self):
+        """
+        Delete the checkpoint once the scan has finished
+        """
+        _MOTIONS.pop(os.path.abspath(self.path), None)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def points(self):
+        """
+        Get the points measured before the scan was stopped
+
+        Returns
+        -------
+        The positions of the points and a list of their monoids
+        """
+        sidecar = sidecar_path(self.log_file)
+        if not os.path.exists(sidecar):
+            return np.empty(0), []
+        return load_points(sidecar)
+
+    @classmethod
+    def load(cls, path, get_motion=None):
+        """
+        Read a checkpoint from disk
+
+        Parameters
+        ----------
+        path
+            the name of the checkpoint file
+        get_motion
+            a function to find a motion from its title, for checkpoints
+            which were not written in this session
+
+        Returns
+        -------
+        The Checkpoint
+        """
+        with np.load(path, allow_pickle=False) as saved:
+            targets = saved["targets"]
+            meta = json.loads(str(saved["meta"]))
+        motions = _MOTIONS.get(os.path.abspath(path))
+        if motions is None:
+            if get_motion is None:
+                raise RuntimeError(
+                    "Cannot find the motions of the scan in {}".format(path))
+            motions = [get_motion(title) for title in meta["motions"]]
+        plan = ScanPlan(motions, [targets[name] for name in targets.dtype.names])
+        checkpoint = cls(meta["log_file"], plan, meta["kwargs"],
+                         completed=meta["completed"],
+                         position_tolerance=meta.get("position_tolerance"))
+        checkpoint.path = path
+        checkpoint.run_kept = meta["run_kept"]
+        checkpoint.period = meta["period"]
+        checkpoint.periods = meta["periods"]
+        checkpoint.run_number = meta["run_number"]
+        return checkpoint
+
+
+def latest_checkpoint(directory):
+    """
+    Find the most recent checkpoint in a directory
+
+    Parameters
+    ----------
+    directory
+        the directory holding the scan logs
+
+    Returns
+    -------
+    The name of the checkpoint file, or None if there are none
+    """
+    try:
+        names = [os.path.join(directory, name) for name in os.listdir(directory)
+                 if name.endswith(".checkpoint")]
+    except (OSError, TypeError):
+        return None
+    if not names:
+        return None
+    return max(names, key=os.path.getmtime)
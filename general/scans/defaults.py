@@ -17,8 +17,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from .plot_functions import PlotFunctions
-from .scans import SimpleScan, ReplayScan
+from .render import Renderer, BackgroundRenderer
+from .scans import SimpleScan, ReplayScan, ResumedScan
+from .checkpoint import Checkpoint, latest_checkpoint
 from .monoid import Average
+from .scan_log import load_points, sidecar_path
+from .timing import TIMING_DTYPE, recent_timing
 from .motion import get_motion
 from .util import get_points, TIME_KEYS
 
@@ -36,8 +40,15 @@ class Defaults(object):
     SINGLE_FIGURE = False
     _fig = None
     _axis = None
-    # default plot functions to use for generating graphs
+    # default plot functions to use for generating graphs; override with
+    # PlotFunctions(incremental=True) to update the plot in place on each point
     plot_functions = PlotFunctions()
+    # Largest number of plot updates per second when plotting on a background
+    # thread; None plots every point in the acquisition loop
+    RENDER_FPS = None
+    # The timing records of each point of the last scan to run, as a
+    # structured array with the fields of general.scans.timing.TIMING_DTYPE
+    last_timing = None
 
     @staticmethod
     @abstractmethod
@@ -97,6 +108,19 @@ class Defaults(object):
         """
         return (self._fig, self._axis)
 
+    def create_renderer(self):
+        """
+        Create the renderer that keeps the plot of the next scan up to date.
+
+        By default every point is plotted inside the acquisition loop.
+        Setting RENDER_FPS moves plotting onto a background thread that
+        redraws at no more than that many frames per second, which stops
+        a slow plotting backend from holding up the scan.
+        """
+        if self.RENDER_FPS:
+            return BackgroundRenderer(self.RENDER_FPS)
+        return Renderer()
+
     def scan(self, motion, start=None, stop=None, step=None, frames=None, save=False, **kwargs):
         """scan establishes the setup for performing a measurement scan.
 
@@ -162,6 +186,11 @@ class Defaults(object):
         kwargs
             various other options consistent with the scan library, common options are:
             fit - produce a fit using this type of fit e.g. Gaussian, CentreOfMass, TopHat
+            rel_err - Keep counting each point, in slices of the given count length, until the relative uncertainty
+                falls below this value
+            max_seconds - The longest time to count each point for when using rel_err
+            centre_err - Treat the points as a coarse grid and keep adding points until the uncertainty on the
+                centre of the fit is below this value.  Requires fit.
             before - A relative starting position for the scan.
             after - A relative ending position for the scan
             gaps - The number of steps to take
@@ -192,6 +221,7 @@ class Defaults(object):
         self.create_fig()
         plt.show()
         num_periods_cache = g.get_number_periods()
+        scn = None
         try:
             if start is not None:
                 kwargs["start"] = start
@@ -202,6 +232,9 @@ class Defaults(object):
             if frames is not None:
                 kwargs["frames"] = frames
             kwargs["save"] = save
+            centre_err = kwargs.pop("centre_err", None)
+            if centre_err is not None and "fit" not in kwargs:
+                raise RuntimeError("An adaptive scan needs a fit to find the centre. Please set fit.")
 
             motion = get_motion(motion)
 
@@ -213,10 +246,11 @@ class Defaults(object):
                     "trying to move a negative distance with positive "
                     "steps?")
 
-            for point in points:
-                motion.require(point)
+            motion.require(points)
 
             scn = SimpleScan(motion, points, self)
+            if centre_err is not None:
+                scn = scn.adaptive(kwargs["fit"], centre_err)
             if any([x in kwargs for x in
                     TIME_KEYS]):
                 if "fit" in kwargs:
@@ -224,6 +258,10 @@ class Defaults(object):
                 return scn.plot(**kwargs)
             return scn
         except KeyboardInterrupt:
+            if scn is not None and scn.checkpoint is not None and \
+                    scn.checkpoint.run_kept:
+                # The run was left paused for resume_scan to carry on in
+                raise KeyboardInterrupt
             if g.get_runstate() != "SETUP":
                 if save:
                     g.end()
@@ -377,7 +415,60 @@ class Defaults(object):
             return g.get_pv(unit_name)
         return ""
 
-    def last_scan(self, path=None, axis="replay"):
+    def timing_records(self):
+        """
+        Get the timing records of recent scans, which are used to predict
+        how long the next scan will take.  By default these are read from
+        the timing files next to the scan logs.
+
+        Override to share records between instruments or to fix the
+        overheads.
+
+        Returns
+        -------
+        A structured array with the fields of general.scans.timing.TIMING_DTYPE
+        """
+        try:
+            directory = os.path.dirname(self.log_file({}))
+        except TypeError:
+            return np.zeros(0, dtype=TIMING_DTYPE)
+        return recent_timing(directory)
+
+    def resume_scan(self, path=None, **kwargs):
+        """Carry on an interrupted scan from the first point that it had
+        not finished measuring.
+
+        If the scan was stopped part way through a DAE run, the run is
+        left paused and the scan carries on counting in it.  The points
+        already measured are kept and new points are added to the same
+        log file.
+
+        PARAMETERS
+        ----------
+        path
+            The checkpoint file of the scan.  If None, resume the most
+            recently interrupted scan
+        kwargs
+            The measurement arguments are those of the original scan.  A
+            fit cannot be saved, so must be given again, e.g. fit=Gaussian.
+            Any other argument given replaces the original value.
+
+        """
+        if path is None:
+            data_dir = os.path.dirname(self.log_file({}))
+            path = latest_checkpoint(data_dir)
+            if path is None:
+                raise ValueError("No interrupted scans in dir ({})".format(data_dir))
+        checkpoint = Checkpoint.load(path, get_motion)
+        print("Resuming {}".format(checkpoint))
+        arguments = dict(checkpoint.kwargs)
+        arguments.update(kwargs)
+        scan = ResumedScan(checkpoint, self)
+        if "fit" in arguments:
+            return scan.fit(**arguments)
+        return scan.plot(**arguments)
+
+    def last_scan(self, path=None, axis="replay", fit=None):
         """Load the last run scan and replay that scan
 
         PARAMETERS
@@ -403,8 +494,13 @@ class Defaults(object):
             base = infile.readline()
             axis = base.split("\t")[0]
             result = base.split("\t")[1]
-            xs, ys, errs = np.loadtxt(infile, unpack=True, encoding="utf-8")
-            ys = [Average((y / e)**2, y / e**2) for y, e in zip(ys, errs)]
+            if os.path.exists(sidecar_path(path)):
+                # The sidecar holds the raw totals and counts, so the
+                # replay is exact
+                xs, ys = load_points(sidecar_path(path))
+            else:
+                xs, ys, errs = np.loadtxt(infile, unpack=True, encoding="utf-8")
+                ys = [Average((y / e)**2, y / e**2) for y, e in zip(ys, errs)]
             scan = ReplayScan(xs, ys, axis, result, self)
             if fit is not None:
                 return scan.fit(fit=fit)
@@ -1,7 +1,11 @@
 """This module adds a helper class for detectors."""
 from collections import namedtuple
 from functools import wraps
-from .monoid import Average, MonoidList
+import time
+import numpy as np
+from .monoid import Average, AverageArray, MonoidList, PolarisationArray
+from .monitor import block_monitor
+from .timing import record, timed
 
 try:
     # pylint: disable=import-error
@@ -12,6 +16,53 @@ except ImportError:
 # Number of time to retry getting spectra if None is returned
 SPECTRA_RETRY_COUNT = 5
 
+# Longest time in seconds to keep counting a point for when counting to a
+# relative uncertainty without a max_seconds limit
+DEFAULT_MAX_COUNT_SECONDS = 3600
+
+# Functions to call the next time that a detector pauses the DAE
+_PAUSE_CALLBACKS = []
+
+
+def on_next_pause(callback):
+    """
+    Call a function once, as soon as a detector has finished counting and
+    paused the DAE.  This lets a scan start moving to its next point while
+    the detector is still reading out the spectra for the current one.
+
+    Parameters
+    ----------
+    callback: Function
+        function taking no arguments
+    """
+    _PAUSE_CALLBACKS.append(callback)
+
+
+def cancel_pause_callback(callback):
+    """
+    Stop a function registered with on_next_pause from being called
+
+    Parameters
+    ----------
+    callback: Function
+        the function that was registered
+
+    Returns
+    -------
+    True if the function was still waiting to be called
+    """
+    try:
+        _PAUSE_CALLBACKS.remove(callback)
+        return True
+    except ValueError:
+        return False
+
+
+def _paused():
+    """Run the functions waiting for the DAE to pause"""
+    while _PAUSE_CALLBACKS:
+        _PAUSE_CALLBACKS.pop(0)()
+
 
 def _resume_count_pause(frames=None, uamps=None, seconds=None, minutes=None, hours=None, **kwargs):
     """
@@ -31,28 +82,127 @@ def _resume_count_pause(frames=None, uamps=None, seconds=None, minutes=None, hou
     kwargs:
         extra arguments to allow for interesting calls, not used
     """
-    g.resume()
-    if frames is not None:
-        g.waitfor_frames(frames + g.get_frames())
-    elif uamps is not None:
-        g.waitfor_uamps(uamps + g.get_uamps())
-    elif seconds is not None or minutes is not None or hours is not None:
-        g.waitfor_time(hours=hours, minutes=minutes, seconds=seconds)
-    else:
+    if frames is None and uamps is None and seconds is None and minutes is None and hours is None:
         raise ValueError("No valid count length. User must define either number frames, current or time period")
 
-    g.pause()
+    with timed("resume"):
+        g.resume()
+    with timed("count"):
+        if frames is not None:
+            g.waitfor_frames(frames + g.get_frames())
+        elif uamps is not None:
+            g.waitfor_uamps(uamps + g.get_uamps())
+        else:
+            g.waitfor_time(hours=hours, minutes=minutes, seconds=seconds)
+    record("frames", frames)
+    record("uamps", uamps)
+
+    with timed("pause"):
+        g.pause()
+    _paused()
+
+
+def relative_error(value):
+    """
+    Find the relative uncertainty of a measurement.  For a MonoidList
+    the worst channel is used.
+
+    Parameters
+    ----------
+    value: Monoid
+        the measurement
+
+    Returns
+    -------
+    The uncertainty divided by the magnitude of the value, or infinity
+    if the value is zero
+    """
+    if isinstance(value, MonoidList):
+        magnitudes = np.abs(value.floats())
+        if not magnitudes.size:
+            return np.inf
+        with np.errstate(divide="ignore", invalid="ignore"):
+            errors = np.asarray(value.err(), dtype=float) / magnitudes
+        errors[(magnitudes == 0) | ~np.isfinite(magnitudes)] = np.inf
+        return float(np.max(errors))
+    magnitude = abs(float(value))
+    if magnitude == 0 or not np.isfinite(magnitude):
+        return np.inf
+    return float(value.err()) / magnitude
+
+
+def count_to_precision(f, acc, rel_err, max_seconds=None, **kwargs):
+    """
+    Repeat a detector measurement in short slices of counting until the
+    relative uncertainty of the result reaches a target, or a time limit
+    passes.
+
+    The detector must return the total measured so far in the current
+    period, as detectors that read spectra from the DAE do, so that
+    each slice adds to the counts of the last.  The count arguments
+    (e.g. frames) give the length of each slice.
+
+    Parameters
+    ----------
+    f: Function
+        the detector function
+    acc
+        the accumulator for the detector
+    rel_err: float
+        the relative uncertainty to count to
+    max_seconds: float
+        the longest time to count for; None for DEFAULT_MAX_COUNT_SECONDS
+    kwargs
+        the count arguments for each slice and any other detector arguments
+
+    Returns
+    -------
+    The accumulator and the measurement from the last slice
+    """
+    if max_seconds is None:
+        max_seconds = DEFAULT_MAX_COUNT_SECONDS
+    start = time.time()
+    # The DAE pauses after every slice, but only the last one ends the
+    # count, so hold back anything waiting for the pause until then
+    waiting = list(_PAUSE_CALLBACKS)
+    del _PAUSE_CALLBACKS[:]
+    try:
+        while True:
+            new_acc, value = f(acc, **kwargs)
+            if relative_error(value) <= rel_err or \
+                    time.time() - start >= max_seconds:
+                break
+    finally:
+        _PAUSE_CALLBACKS[:0] = waiting
+    _paused()
+    return new_acc, value
+
+
+def _check_no_precision(detector, kwargs):
+    """
+    Refuse to count to a relative uncertainty with a detector that cannot
+    do so, rather than silently counting each point once
+    """
+    if kwargs.get("rel_err") is not None:
+        raise ValueError(
+            "{} cannot count to a relative uncertainty; rel_err needs a detector "
+            "that counts in DAE periods".format(type(detector).__name__))
 
 
 class DetectorManager(object):
     """Manage routines for pulling data from the instrument"""
 
+    # Function to subscribe to new detector values, for detectors whose
+    # value can be followed through a monitor
+    monitor = None
+
     def __init__(self, f, unit="Intensity"):
         self._f = f
         self.scan = None
         self.unit = unit
 
     def __call__(self, scan, **kwargs):
+        _check_no_precision(self, kwargs)
         self.scan = scan
         return self
 
@@ -87,8 +237,10 @@ class BlockDetector(DetectorManager):
             unit = blockname
         self._f = lambda acc: (acc, get_block(self.blockname))
         DetectorManager.__init__(self, self._f, unit)
+        self.monitor = block_monitor(blockname)
 
     def __call__(self, scan, **kwargs):
+        _check_no_precision(self, kwargs)
         return self
 
     def __enter__(self):
@@ -124,6 +276,7 @@ class DaePeriods(DetectorManager):
         self.period_function = period_function
         self._scan = None
         self._kwargs = {}
+        self._period_count = None
         DetectorManager.__init__(self, f, unit)
 
     def __call__(self, scan, save, **kwargs):
@@ -134,6 +287,16 @@ class DaePeriods(DetectorManager):
         return self
 
     def __enter__(self):
+        resume = getattr(self._scan, "resume", None)
+        if resume is not None and resume.run_kept and \
+                g.get_runstate() == "PAUSED":
+            # Carry on counting in the run that the scan was stopped in
+            self._period_count = resume.periods or self.period_function(self._scan)
+            if resume.period is not None:
+                g.change_period(resume.period)
+            print("Carrying on in the paused run")
+            return self._counting(self._period_count)
+
         if g.get_runstate() != "SETUP":  # pragma: no cover
             raise RuntimeError("Cannot start scan while already in a run!" +
                                " Current state is: " + str(g.get_runstate()))
@@ -146,27 +309,45 @@ class DaePeriods(DetectorManager):
             title = "Scan"
         g.change_title(title)
         period_count = self.period_function(self._scan)
+        self._period_count = period_count
         g.change(nperiods=period_count)
         g.change(period=1)
         try:
             g.begin(paused=1)
-
-            @wraps(self._f)
-            def wrap(*args, **kwargs):
-                """Wrapped function to change periods"""
-                x = self._f(*args, **kwargs)
-                new_period = 1 + g.get_period()
-                if new_period <= period_count:
-                    g.change_period(new_period)
-                return x
-
-            return wrap
+            return self._counting(period_count)
         except Exception:
             if g.get_runstate() != "SETUP":  # pragma: no cover
                 self._end_or_abort()
             raise
 
+    def _counting(self, period_count):
+        """Wrap the detector function to move on to the next period after
+        each measurement"""
+        @wraps(self._f)
+        def wrap(*args, **kwargs):
+            """Wrapped function to change periods"""
+            if kwargs.get("rel_err") is not None:
+                x = count_to_precision(self._f, *args, **kwargs)
+            else:
+                x = self._f(*args, **kwargs)
+            new_period = 1 + g.get_period()
+            if new_period <= period_count:
+                g.change_period(new_period)
+            return x
+
+        return wrap
+
     def __exit__(self, typ, value, traceback):
+        checkpoint = getattr(self._scan, "checkpoint", None)
+        if typ is KeyboardInterrupt and checkpoint is not None:
+            # Leave the run paused, so that resume_scan can count the
+            # rest of the points in it
+            if g.get_runstate() == "RUNNING":
+                g.pause()
+            checkpoint.keep_run(g.get_period(), self._period_count)
+            print("The run has been left paused.  Call resume_scan() to carry on, "
+                  "or end it with g.end() or g.abort()")
+            return
         self._end_or_abort()
 
     def _end_or_abort(self):
@@ -227,6 +408,47 @@ def specific_spectra(spectra_list, preconfig=lambda: None):
     return inner
 
 
+def sliced_polarisation(spectra, up_period, down_period, slices):
+    """
+    Find the polarisation of a set of channels over some time of flight
+    slices, normalised to the monitor in spectrum 1.
+
+    Every channel shares the same monitor, so the channels are summed
+    before the slices are taken, rather than slicing each channel.
+
+    Parameters
+    ----------
+    spectra
+        the channels to combine
+    up_period
+        the period counted with the flipper on
+    down_period
+        the period counted with the flipper off
+    slices
+        the time of flight bins of each polarisation
+
+    Returns
+    -------
+    A PolarisationArray with a channel for each slice
+    """
+    mon_up = np.sum(g.get_spectrum(1, up_period)["signal"]) * 100.0
+    mon_down = np.sum(g.get_spectrum(1, down_period)["signal"]) * 100.0
+    ups = np.zeros(len(slices))
+    downs = np.zeros(len(slices))
+    channels = 0
+    spec_up = 0
+    spec_down = 0
+    for channel in spectra:
+        channels += 1
+        spec_up = spec_up + np.asarray(g.get_spectrum(channel, up_period)["signal"])
+        spec_down = spec_down + np.asarray(g.get_spectrum(channel, down_period)["signal"])
+    if channels:
+        ups += [np.sum(spec_up[slc]) * 100.0 for slc in slices]
+        downs += [np.sum(spec_down[slc]) * 100.0 for slc in slices]
+    return PolarisationArray(AverageArray(ups, channels * mon_up),
+                             AverageArray(downs, channels * mon_down))
+
+
 SpectraDefinition = namedtuple("SpectraDefintion", ["name", "spectra_number", "t_min", "t_max"])
 
 
@@ -254,6 +476,97 @@ def create_spectra_definition(spectra_number, t_min=None, t_max=None, name=None)
     return SpectraDefinition(name, spectra_number, t_min, t_max)
 
 
+def tof_weights(edges, t_min=None, t_max=None):
+    """
+    Find the fraction of each time of flight bin that lies within a
+    window, so that a spectrum can be integrated over the window with a
+    single dot product.  Bins which are only partly inside the window
+    are weighted by the part inside, assuming the counts are spread
+    evenly across the bin.
+
+    Parameters
+    ----------
+    edges: array
+        the edges of the time of flight bins, one more than the bins
+    t_min: float|None
+        the start of the window; None for as low as possible
+    t_max: float|None
+        the end of the window; None for as high as possible
+
+    Returns
+    -------
+    An array with the weight of each bin
+
+    Examples
+    --------
+    >>> tof_weights([0.0, 10.0, 20.0, 30.0], 5.0, 20.0)
+    array([0.5, 1. , 0. ])
+
+    """
+    edges = np.asarray(edges, dtype=float)
+    low = -np.inf if t_min is None else t_min
+    high = np.inf if t_max is None else t_max
+    starts = np.clip(edges[:-1], low, high)
+    ends = np.clip(edges[1:], low, high)
+    widths = np.diff(edges)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(widths > 0, (ends - starts) / widths, 0.0)
+
+
+def _bin_edges(time, bins):
+    """The edges of the time of flight bins, given either their edges or their centres"""
+    time = np.asarray(time, dtype=float)
+    if len(time) == bins + 1:
+        return time
+    if len(time) < 2:
+        return np.concatenate((time, time))
+    middles = (time[1:] + time[:-1]) / 2
+    return np.concatenate(([2 * time[0] - middles[0]], middles, [2 * time[-1] - middles[-1]]))
+
+
+def read_spectra(spectra, period):
+    """
+    Read several spectra from the DAE, as a spectra_reader of a
+    NormalisedIntensityDetector.
+
+    The DAE has no call to read many spectra at once, so each spectrum
+    is still read separately and no round trips to the DAE are saved.
+    Each call also returns the whole time of flight histogram, where
+    integrate_spectrum returns a single number, so this reader moves
+    more data than integrating each spectrum.  It is only worthwhile
+    when the DAE is local, or as a model for a reader of an instrument
+    which can fetch many spectra in one call.
+
+    Parameters
+    ----------
+    spectra: list[int]
+        the spectrum numbers to read
+    period: int
+        the period to read them from
+
+    Returns
+    -------
+    The edges of the time of flight bins and an array of counts, with a
+    row for each spectrum.  The row of a spectrum which could not be
+    read is NaN.
+    """
+    edges = None
+    signals = []
+    for spectrum in spectra:
+        spec = g.get_spectrum(spectrum, period, dist=False)
+        if spec is None:
+            signals.append(None)
+            continue
+        signal = np.asarray(spec["signal"], dtype=float)
+        if edges is None:
+            edges = _bin_edges(spec["time"], len(signal))
+        signals.append(signal)
+    if edges is None:
+        return np.zeros(2), np.full((len(spectra), 1), np.nan)
+    missing = np.full(len(edges) - 1, np.nan)
+    return edges, np.array([missing if signal is None else signal for signal in signals])
+
+
 class NormalisedIntensityDetector(DaePeriods):
     """
     Detector Manager to detect the normalised intensity of two spectra with optional time of flight ranges.
@@ -280,7 +593,7 @@ class NormalisedIntensityDetector(DaePeriods):
     """
 
     def __init__(self, pre_init=lambda: None, period_function=len, default_monitor="default_monitor",
-                 default_detector="default_detector", spectra_definitions=None):
+                 default_detector="default_detector", spectra_definitions=None, spectra_reader=None):
         """
         Initialiser.
 
@@ -299,6 +612,13 @@ class NormalisedIntensityDetector(DaePeriods):
             the name of the spectra that will be used as the monitor if not overriden in the scan
         spectra_definitions: list[SpectraDefinition]
             list of spectra definition. Use the method create_spectra_definition to create these
+        spectra_reader: Function|None
+            a function which takes a list of spectrum numbers and a period and reads all of those spectra in a
+            single call.  It returns the edges of the time of flight bins and a 2-D array of counts, with a row
+            for each spectrum and a row of NaN for any spectrum that could not be read.  The time of flight
+            windows are then integrated for every pixel at once and only the missing pixels are read again.
+            read_spectra reads them from the DAE one spectrum at a time, so it saves no round trips.  None
+            integrates each spectrum with a separate call to the DAE.
         """
         super(NormalisedIntensityDetector, self).__init__(self.detector_measurement, pre_init=pre_init,
                                                           period_function=period_function, unit="I/I_0")
@@ -313,6 +633,9 @@ class NormalisedIntensityDetector(DaePeriods):
                                     for spectra_definition in spectra_definitions}
         self.monitor = None  # type:SpectraDefinition
         self.detector = None  # type:SpectraDefinition
+        self.spectra_reader = spectra_reader
+        # The bin edges and weights of each time of flight window, kept between points
+        self._weights = {}
 
     def __call__(self, scan, mon=None, det=None, **kwargs):
         """
@@ -355,32 +678,81 @@ class NormalisedIntensityDetector(DaePeriods):
 
         det_spectra_range = self._get_detector_spectra_range(**kwargs)
 
-        for _ in range(SPECTRA_RETRY_COUNT):  # tries to get a non-None spectrum from the DAE
-            monitor_spec_sum = g.integrate_spectrum(self.monitor.spectra_number, g.get_period(),
-                                                    self.monitor.t_min, self.monitor.t_max)
-            detector_spec_sum = 0
-            for spectrum_num in det_spectra_range:
-                det_sum = g.integrate_spectrum(spectrum_num, g.get_period(),
-                                               self.detector.t_min, self.detector.t_max)
-                try:
-                    detector_spec_sum += det_sum
-                except TypeError:
-                    detector_spec_sum = None
-                    break
-            if monitor_spec_sum is None or detector_spec_sum is None:
-                print("Spectrum is zero, retrying")
-            else:
-                break
-
+        if self.spectra_reader is None:
+            detector_spec_sum, monitor_spec_sum = self._integrate_each_spectrum(det_spectra_range)
         else:
-            detector_spec_sum = 0
-            monitor_spec_sum = 0
+            detector_spec_sum, monitor_spec_sum = self._integrate_spectra_together(det_spectra_range)
 
         print("Measuring (det {}/mon {}: {}/{})".format(self.detector.spectra_number, self.monitor.spectra_number,
                                                         detector_spec_sum, monitor_spec_sum))
 
         return acc, Average(detector_spec_sum, monitor_spec_sum)
 
+    def _integrate_each_spectrum(self, det_spectra_range):
+        """
+        Integrate the monitor and each detector pixel with separate calls to the DAE, reading again only those
+        which came back as None.
+
+        Args:
+            det_spectra_range: the spectrum numbers of the detector pixels
+
+        Returns: the detector and monitor sums; both 0 if some spectra could not be read
+        """
+        period = g.get_period()
+        monitor_spec_sum = None
+        det_sums = {spectrum_num: None for spectrum_num in det_spectra_range}
+        for _ in range(SPECTRA_RETRY_COUNT):  # tries to get a non-None spectrum from the DAE
+            if monitor_spec_sum is None:
+                monitor_spec_sum = g.integrate_spectrum(self.monitor.spectra_number, period,
+                                                        self.monitor.t_min, self.monitor.t_max)
+            for spectrum_num in det_spectra_range:
+                if det_sums[spectrum_num] is None:
+                    det_sums[spectrum_num] = g.integrate_spectrum(spectrum_num, period,
+                                                                  self.detector.t_min, self.detector.t_max)
+            if monitor_spec_sum is not None and all(det_sum is not None for det_sum in det_sums.values()):
+                return sum(det_sums[spectrum_num] for spectrum_num in det_spectra_range), monitor_spec_sum
+            print("Spectrum is zero, retrying")
+        return 0, 0
+
+    def _window_weights(self, edges, spectra):
+        """The weights of each time of flight bin for the window of a spectra definition"""
+        window = (spectra.t_min, spectra.t_max)
+        cached = self._weights.get(window)
+        if cached is None or not np.array_equal(cached[0], edges):
+            cached = (edges, tof_weights(edges, spectra.t_min, spectra.t_max))
+            self._weights[window] = cached
+        return cached[1]
+
+    def _integrate_spectra_together(self, det_spectra_range):
+        """
+        Read the monitor and every detector pixel with the spectra reader and integrate their time of flight
+        windows at once, reading again only the pixels which were missing.
+
+        Args:
+            det_spectra_range: the spectrum numbers of the detector pixels
+
+        Returns: the detector and monitor sums; both 0 if some spectra could not be read
+        """
+        period = g.get_period()
+        # The monitor is the first row
+        spectra = np.array([self.monitor.spectra_number] + list(det_spectra_range))
+        sums = np.full(len(spectra), np.nan)
+        missing = np.arange(len(spectra))
+        for _ in range(SPECTRA_RETRY_COUNT):  # tries to read every spectrum from the DAE
+            edges, signal = self.spectra_reader(list(spectra[missing]), period)
+            edges = np.asarray(edges, dtype=float)
+            signal = np.asarray(signal, dtype=float)
+            integrals = signal.dot(self._window_weights(edges, self.detector))
+            if missing[0] == 0:
+                integrals[0] = signal[0].dot(self._window_weights(edges, self.monitor))
+            integrals[np.isnan(signal).any(axis=1)] = np.nan
+            sums[missing] = integrals
+            missing = np.flatnonzero(np.isnan(sums))
+            if not missing.size:
+                return np.sum(sums[1:]), sums[0]
+            print("Spectrum is zero, retrying")
+        return 0, 0
+
     def _get_detector_spectra_range(self, **kwargs):
         """
         Returns a range of spectrum numbers (=detector pixels) as appropriate for the submitted arguments.
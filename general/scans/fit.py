@@ -4,6 +4,7 @@ for fitting routines.  It also contains implementations of some common
 fits (i.e. Linear and Gaussian).
 
 """
+import threading
 import traceback
 from abc import ABCMeta, abstractmethod
 import warnings
@@ -58,6 +59,56 @@ class Fit(object):
         """Find the quality of a fit for a data set"""
         return np.mean(((self.get_y(x, params) - y) / err)**2)
 
+    def centre(self, params):
+        """
+        Get the centre of the feature found by the fit, or None if the
+        fit does not find a centre.
+
+        Parameters
+        ==========
+        params
+          The fit parameters
+        """
+        # pylint: disable=unused-argument
+        return None
+
+    def centre_err(self, x, y, err, params):
+        """
+        Get the uncertainty on the centre of the fit.  Fits which cannot
+        estimate it return infinity.
+
+        Parameters
+        ==========
+        x
+          The x positions of the data
+        y
+          The y values of the data
+        err
+          The uncertainty on the y values
+        params
+          The fit parameters
+        """
+        # pylint: disable=unused-argument
+        return np.inf
+
+    def centre_sensitivity(self, x, params, step):
+        """
+        Find how strongly the model at each position depends on the
+        centre of the fit, i.e. how much a measurement there would pin
+        the centre down.  Fits without a model for this return None.
+
+        Parameters
+        ==========
+        x
+          The positions to test
+        params
+          The fit parameters
+        step
+          The distance to move the centre by at each position
+        """
+        # pylint: disable=unused-argument
+        return None
+
     def title(self, params):
         """
         Give the title of the fit.
@@ -70,15 +121,96 @@ class Fit(object):
         # pylint: disable=unused-argument
         return self._title
 
-    def fit_plot_action(self):
+    def _live_fit(self, x, values, errs, old_params):
+        """
+        Fit the data measured so far and work out the fit lines to plot
+
+        Parameters
+        ----------
+        x : Array of Float
+          The x positions measured thus far
+        values : Array of Float
+          The values measured thus far, with one row per data series
+          if there is more than one
+        errs : Array of Float
+          The uncertainties of the values
+        old_params : None or tuple
+          The previous fit, which is kept if it describes the data better
+
+        Returns
+        -------
+        The fit parameters and a list of the lines to plot.  Each line is
+        the index of its data series (None for a single series), its x and
+        y values and its label.
+
+        Raises
+        ------
+        RuntimeError
+          If the fit of a single series fails
+        """
+        points_x = np.array(x)
+        plot_x = np.linspace(np.min(points_x), np.max(points_x), 1000)
+
+        if len(values.shape) > 1:
+            params = []
+            lines = []
+            for index, value in enumerate(values):
+                try:
+                    params.append(self.fit(points_x, value, errs))
+                except RuntimeError:
+                    params.append(None)
+                    continue
+                lines.append((index, plot_x, self.get_y(plot_x, params[-1]),
+                              "{} fit".format(self.title(params[-1]))))
+            return params, lines
+
+        params = self.fit(points_x, values, errs)
+        chi_sq = self.fit_quality(points_x, values, errs, params)
+        if old_params is not None:
+            old_chi = self.fit_quality(points_x, values, errs, old_params)
+            if chi_sq > old_chi:
+                params = old_params
+        fit_y = self.get_y(plot_x, params)
+        return params, [(None, plot_x, fit_y, "{} fit".format(self.title(params)))]
+
+    @staticmethod
+    def _draw_fit(plot_functions, lines):
+        """
+        Plot the lines of a fit
+
+        Parameters
+        ----------
+        plot_functions : general.scans.plot_functions.PlotFunctions
+          plot_functions which allows items to be plotted
+        lines
+          the lines to plot, as given by _live_fit
+        """
+        for index, plot_x, fit_y, label in lines:
+            if index is None:
+                plot_functions.plot_fit(plot_x, fit_y, label)
+            else:
+                plot_functions.plot_fit_series(index, plot_x, fit_y, label)
+
+    def fit_plot_action(self, background=False):
         """
         Create a function to be called in a plotting loop
         to live fit the data
 
+        Parameters
+        ----------
+        background
+          If True, fit on a worker thread so that slow fits do not hold
+          up the scan.  The plot then shows the most recent fit to have
+          finished, and the action has a finish method that waits for the
+          fit of the final data.
+
         Returns
         -------
         A function to call in the plotting loop
         """
+        if background:
+            return BackgroundFitAction(self)
+
         def action(x, y, plot_functions, old_params):
             """Fit and plot the data within the plotting loop
 
@@ -103,34 +235,12 @@ class Fit(object):
             try:
                 if len(x) < self.degree:
                     return None
-                points_x = np.array(x)
-                plot_x = np.linspace(np.min(points_x), np.max(points_x), 1000)
-                values = np.array(y.values())
-                errs = np.array(y.err())
-
-                if len(values.shape) > 1:
-                    params = []
-                    for value in values:
-                        try:
-                            params.append(self.fit(points_x, value, errs))
-                        except RuntimeError:
-                            params.append(None)
-                            continue
-                        fit_y = self.get_y(plot_x, params[-1])
-                        plot_functions.plot_fit(plot_x, fit_y, "{} fit".format(self.title(params[-1])))
-                else:
-                    try:
-                        params = self.fit(points_x, values, errs)
-                    except RuntimeError:
-                        return None
-                    chi_sq = self.fit_quality(points_x, values, errs, params)
-                    if old_params is not None:
-                        old_chi = self.fit_quality(points_x, values, errs, old_params)
-                        if chi_sq > old_chi:
-                            chi_sq = old_chi
-                            params = old_params
-                    fit_y = self.get_y(plot_x, params)
-                    plot_functions.plot_fit(plot_x, fit_y, "{} fit".format(self.title(params)))
+                try:
+                    params, lines = self._live_fit(x, np.array(y.values()),
+                                                   np.array(y.err()), old_params)
+                except RuntimeError:
+                    return None
+                self._draw_fit(plot_functions, lines)
 
             except Exception as ex:
                 traceback.print_exc()
@@ -140,6 +250,172 @@ class Fit(object):
         return action
 
 
+class BackgroundFitAction(object):
+    """
+    A live fit action which fits on a worker thread.
+
+    Each call hands the latest data to the worker and plots the most
+    recent fit to have finished, so acquisition never waits for a fit.
+    Only the newest data waits to be fitted: data that arrives while the
+    worker is busy replaces any data still waiting, and the stale fit is
+    never run.
+    """
+
+    def __init__(self, fit):
+        """
+        Parameters
+        ----------
+        fit
+            the Fit to perform
+        """
+        self.fit = fit
+        self.superseded = 0
+        self._condition = threading.Condition()
+        self._pending = None
+        self._finished = None
+        self._thread = None
+        # The stop flag of the current worker.  Each worker has its own,
+        # so that a cancelled worker still busy with a fit can never take
+        # the data meant for the worker that replaced it.
+        self._stopping = None
+
+    def __call__(self, x, y, plot_functions, old_params):
+        """Fit and plot the data within the plotting loop
+
+        Parameters
+        ----------
+        x : Array of Float
+          The x positions measured thus far
+        y : Array of Float
+          The y positions measured thus far
+        plot_functions : general.scans.plot_functions.PlotFunctions
+          plot_functions which allows items to be plotted
+        old_params : None or tuple
+          The previous result of the action
+
+        Returns
+        -------
+        The parameters of the most recent fit to finish, or old_params if
+        no fit has finished yet
+        """
+        if len(x) >= self.fit.degree:
+            self.submit(x, np.array(y.values()), np.array(y.err()))
+        with self._condition:
+            finished = self._finished
+        if finished is None:
+            return old_params
+        params, lines = finished
+        self._draw(plot_functions, lines)
+        return params
+
+    def _draw(self, plot_functions, lines):
+        """Plot a finished fit, reporting rather than raising any error so
+        that a plotting problem cannot stop the scan"""
+        try:
+            self.fit._draw_fit(plot_functions, lines)  # pylint: disable=protected-access
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            print("No fit plotted because of above error please report it.")
+
+    def submit(self, x, values, errs):
+        """
+        Queue data to be fitted, replacing any data still waiting
+
+        Parameters
+        ----------
+        x
+            the positions of the points
+        values
+            the values of the points
+        errs
+            the uncertainties of the values
+        """
+        job = (np.array(x, dtype=float), np.array(values), np.array(errs))
+        with self._condition:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = job
+            if self._thread is None:
+                self._stopping = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stopping,),
+                                                name="ScanFit")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self, stopping):
+        while True:
+            with self._condition:
+                while self._pending is None and not stopping.is_set():
+                    self._condition.wait()
+                if self._pending is None or self._stopping is not stopping:
+                    return
+                (x, values, errs), self._pending = self._pending, None
+                previous = self._finished
+            try:
+                # pylint: disable=protected-access
+                result = self.fit._live_fit(x, values, errs,
+                                            None if previous is None else previous[0])
+            except RuntimeError:
+                result = (None, [])
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                print("No fit performed because of above error please report it.")
+                continue
+            with self._condition:
+                if self._stopping is stopping:
+                    self._finished = result
+
+    def finish(self, plot_functions=None):
+        """
+        Wait for the fit of the latest data and stop the worker
+
+        Parameters
+        ----------
+        plot_functions : general.scans.plot_functions.PlotFunctions
+          if given, the final fit is plotted with these
+
+        Returns
+        -------
+        The parameters of the final fit; None if no fit was possible
+        """
+        self._stop()
+        if self._finished is None:
+            return None
+        params, lines = self._finished
+        if plot_functions is not None:
+            self._draw(plot_functions, lines)
+            plot_functions.draw()
+        return params
+
+    def cancel(self):
+        """
+        Stop the worker without fitting any data still waiting, e.g. when
+        the scan has been interrupted.  A fit which has already started
+        is left to finish on its own, but its result is discarded.
+        """
+        with self._condition:
+            self._pending = None
+        self._stop(wait=False)
+
+    def _stop(self, wait=True):
+        with self._condition:
+            thread, stopping = self._thread, self._stopping
+            if stopping is not None:
+                stopping.set()
+            self._condition.notify_all()
+            if not wait:
+                self._thread = None
+                self._stopping = None
+        if wait and thread is not None:
+            # The worker fits any data still waiting before it stops
+            thread.join()
+            with self._condition:
+                if self._stopping is stopping:
+                    self._thread = None
+                    self._stopping = None
+
+
 class PolyFit(Fit):
     """
     A fitting class for polynomials
@@ -194,8 +470,9 @@ class ExactFit(Fit):
     def title(self, _):
         return "Exact Points"
 
-    def fit_plot_action(self):
-        def action(x, y, _):
+    def fit_plot_action(self, background=False):
+        # pylint: disable=unused-argument
+        def action(x, y, _, __=None):
             """Perform no actual plotting action and simply pass on the data
  points.
 
@@ -296,6 +573,29 @@ class CurveFit(Fit):
     def get_y(self, x, fit):
         return self._model(x, *fit[0])
 
+    def centre(self, params):
+        return params[0][0]
+
+    def centre_err(self, x, y, err, params):
+        variance = params[1][0, 0]
+        if not np.isfinite(variance) or variance < 0:
+            return np.inf
+        return np.sqrt(variance)
+
+    def centre_sensitivity(self, x, params, step):
+        centre, rest = params[0][0], list(params[0][1:])
+        x = np.asarray(x, dtype=float)
+        step = np.broadcast_to(np.asarray(step, dtype=float), x.shape)
+        sensitivity = np.empty(x.shape)
+        # Some models only accept a single centre, so shift it one
+        # position at a time
+        for index, (position, shift) in enumerate(zip(x, step)):
+            position = np.array([position])
+            higher = self._model(position, centre + shift / 2, *rest)[0]
+            lower = self._model(position, centre - shift / 2, *rest)[0]
+            sensitivity[index] = np.abs(higher - lower) / shift
+        return sensitivity
+
 
 class GaussianFit(CurveFit):
     """
@@ -603,14 +903,30 @@ class CentreOfMassFit(Fit):
     def get_y(self, x, fit):
         return np.zeros(len(x))
 
+    def centre(self, params):
+        return params[0]
+
+    def centre_err(self, x, y, err, params):
+        # Propagate the uncertainty on each point through the weighted
+        # mean, taking the background as fixed
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        err = np.asarray(err, dtype=float)
+        weights = y - np.min(y)
+        total = np.sum(weights)
+        if len(x) < 2 or total <= 0 or not np.isfinite(params[0]):
+            return np.inf
+        return np.sqrt(np.sum(((x - params[0]) / total * err)**2))
+
     def title(self, params):
         return "Centre of mass = {}".format(smart_number_format(params[0]))
 
     def readable(self, fit):
         return {"Centre_of_mass": fit[0]}
 
-    def fit_plot_action(self):
-        def action(x, y, axis, _):
+    def fit_plot_action(self, background=False):
+        # pylint: disable=unused-argument
+        def action(x, y, plot_functions, _):
             """Fit and plot the data within the plotting loop
 
             Parameters
@@ -619,7 +935,8 @@ class CentreOfMassFit(Fit):
               The x positions measured thus far
             y : Array of Float
               The y positions measured thus far
-            axis : the display axis
+            plot_functions : general.scans.plot_functions.PlotFunctions
+              plot_functions which allows items to be plotted
 
             Returns
             -------
@@ -631,9 +948,7 @@ class CentreOfMassFit(Fit):
             values = np.array(y.values())
             errs = np.array(y.err())
             params = self.fit(x, values, errs)
-            axis.axvline(x=params[0])
-            axis.legend([self.title(params)], bbox_to_anchor=(0, 1.02, 1, 0.2), loc="lower left", mode="expand",
-                          borderaxespad=0, ncol=3)
+            plot_functions.plot_vertical_fit_line(params[0], self.title(params))
 
             return params
         return action
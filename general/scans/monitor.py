@@ -0,0 +1,197 @@
+"""
+The module lets scans follow values that change on their own, such as
+the position of a moving axis, by subscribing to updates rather than
+polling for them.
+
+Updates from a channel access monitor are pushed into a SampleBuffer
+with the time that they arrived.  A continuous scan then consumes the
+samples at its own pace, and can find the position of the axis at the
+moment that any other sample was taken.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+try:
+    # pylint: disable=import-error
+    from genie_python import genie as g
+    from genie_python.genie_cachannel_wrapper import CaChannelWrapper
+except ImportError:
+    from .mocks import g
+    CaChannelWrapper = None
+
+#: The number of samples held by a SampleBuffer
+DEFAULT_CAPACITY = 4096
+
+#: The shortest time in seconds between samples read directly, rather
+#: than through a monitor.  A Galil updates its position every 40 ms.
+MIN_SAMPLE_INTERVAL = 0.04
+
+
+class SampleBuffer(object):
+    """
+    A fixed size ring buffer of timestamped samples, which can be
+    filled from a monitor thread while a scan reads it.
+
+    Once the buffer is full the oldest samples are overwritten, so its
+    memory never grows however long a scan runs.
+
+    Examples
+    --------
+    >>> samples = SampleBuffer()
+    >>> samples.push(1.0, timestamp=10.0)
+    >>> samples.push(3.0, timestamp=12.0)
+    >>> samples.at(11.0)
+    2.0
+
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = np.empty(capacity)
+        self._values = np.empty(capacity)
+        self._written = 0
+        self._read = 0
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def push(self, value, timestamp=None):
+        """
+        Add a sample to the buffer
+
+        Parameters
+        ----------
+        value
+            the value of the sample
+        timestamp
+            the time the sample was taken; None for now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._condition:
+            index = self._written % self.capacity
+            self._times[index] = timestamp
+            self._values[index] = value
+            self._written += 1
+            self._condition.notify_all()
+
+    def _window(self, start):
+        """The indices of the samples written since start, oldest first"""
+        start = max(start, self._written - self.capacity)
+        return np.arange(start, self._written) % self.capacity
+
+    def wait(self, timeout=None):
+        """
+        Wait until there are samples which have not been drained
+
+        Parameters
+        ----------
+        timeout
+            the longest time to wait in seconds; None to wait forever
+
+        Returns
+        -------
+        True if there are new samples
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._written > self._read, timeout)
+
+    def drain(self):
+        """
+        Take the samples which have arrived since the last drain.  If more
+        samples arrived than the buffer holds, only the newest are kept.
+
+        Returns
+        -------
+        The times and the values of the samples, oldest first
+        """
+        with self._condition:
+            window = self._window(self._read)
+            self._read = self._written
+            return self._times[window], self._values[window]
+
+    def latest(self):
+        """
+        Get the value of the newest sample, or None if there are none
+        """
+        with self._condition:
+            if not self._written:
+                return None
+            return self._values[(self._written - 1) % self.capacity]
+
+    def at(self, timestamp):
+        """
+        Find the value at a given time, interpolating between the samples
+        either side of it.  Times outside the buffer take the value of the
+        nearest sample.
+
+        Parameters
+        ----------
+        timestamp
+            the time, in the same units as the sample timestamps
+
+        Returns
+        -------
+        The value at that time, or None if the buffer is empty
+        """
+        with self._condition:
+            if not self._written:
+                return None
+            window = self._window(0)
+            return float(np.interp(timestamp, self._times[window],
+                                   self._values[window]))
+
+
+def block_monitor(block):
+    """
+    Create a function that subscribes to updates of an IBEX block
+    through a channel access monitor.
+
+    Parameters
+    ----------
+    block
+        the name of the block
+
+    Returns
+    -------
+    A function taking a callback for each new value and returning a
+    function that cancels the subscription, or None if channel access
+    monitors are not available
+    """
+    if CaChannelWrapper is None:
+        return None
+
+    def monitor(callback):
+        """Call back with each new value of the block"""
+        unsubscribe = CaChannelWrapper.add_monitor(
+            g.adv.get_pv_from_block(block),
+            lambda value, *_: callback(value))
+        return unsubscribe if callable(unsubscribe) else lambda: None
+    return monitor
+
+
+def watch(source, samples):
+    """
+    Push the updates of a source into a sample buffer.
+
+    Parameters
+    ----------
+    source
+        an object with a monitor attribute, as created by block_monitor
+    samples
+        the SampleBuffer to fill
+
+    Returns
+    -------
+    A function that stops watching, or None if the source cannot be
+    monitored
+    """
+    monitor = getattr(source, "monitor", None)
+    if monitor is None:
+        return None
+    return monitor(samples.push)
@@ -19,7 +19,16 @@ class Monoid(object):
     """
     The Monoid base class enforces the two laws: There must be a zero
     operation and a combining function (add).
+
+    As with numbers, ``x += y`` binds x to a new monoid and leaves any
+    other reference to the old value unchanged.  A monoid which is
+    owned by a single accumulator, e.g. one made by copy(), may instead
+    be combined in place with add_in_place, to avoid allocating a new
+    monoid for every measurement.
     """
+
+    __slots__ = ()
+
     @staticmethod
     @abstractmethod
     def zero():
@@ -42,6 +51,27 @@ class Monoid(object):
     def __radd__(self, x):
         return self + x
 
+    def add_in_place(self, x):
+        """
+        Combine a value into this monoid, changing it rather than
+        allocating a new monoid where possible.  Only call this on a
+        monoid which nothing else refers to, such as one made by copy().
+
+        Parameters
+        ----------
+        x
+            the value to combine; it is never changed
+
+        Returns
+        -------
+        The combined monoid, which may not be this one
+        """
+        return self + x
+
+    def copy(self):
+        """Return an independent copy of the monoid"""
+        return self + 0
+
     def pure(self, x):
         """Turn a number into a member of this monoid"""
         return self.__class__(x)
@@ -60,6 +90,8 @@ class Average(Monoid):
     This monoid calculates the average of its values, e.g. detector count/monitor count
     """
 
+    __slots__ = ("total", "count")
+
     def __init__(self, x, count=1):
         self.total = x
         self.count = count
@@ -77,6 +109,15 @@ class Average(Monoid):
             self.total + y.total,
             self.count + y.count)
 
+    def add_in_place(self, y):
+        y = self.upgrade(y)
+        self.total += y.total
+        self.count += y.count
+        return self
+
+    def copy(self):
+        return self.__class__(self.total, self.count)
+
     @staticmethod
     def zero():
         return Average(0, 0)
@@ -115,6 +156,12 @@ class Exact(Average):
     A monoid representing an exact measurement.
     """
 
+    __slots__ = ()
+
+    def add_in_place(self, y):
+        # Combining gives an Average, as with +
+        return self + y
+
     def err(self):
         return 0
 
@@ -124,6 +171,8 @@ class Sum(Monoid):
     This monoid calculates the sum total of the values presented
     """
 
+    __slots__ = ("total",)
+
     def __init__(self, x):
         self.total = x
 
@@ -134,6 +183,14 @@ class Sum(Monoid):
         y = self.upgrade(y)
         return Sum(self.total + y.total)
 
+    def add_in_place(self, y):
+        y = self.upgrade(y)
+        self.total += y.total
+        return self
+
+    def copy(self):
+        return Sum(self.total)
+
     @staticmethod
     def zero():
         return Sum(0)
@@ -148,19 +205,49 @@ class Sum(Monoid):
         return "Sum({})".format(self.total)
 
 
+def _copy(x):
+    """Copy a monoid, or the plain number held in its place"""
+    if isinstance(x, Monoid):
+        return x.copy()
+    return x
+
+
+def accumulate(total, x):
+    """
+    Combine a value into a running total which nothing else refers to,
+    in place where the total is a monoid.
+
+    Parameters
+    ----------
+    total
+        the monoid or number owned by the caller
+    x
+        the value to combine; it is never changed
+
+    Returns
+    -------
+    The new total
+    """
+    if isinstance(total, Monoid):
+        return total.add_in_place(x)
+    return total + x
+
+
 class Polarisation(Monoid):
     """
     This monoid calculates the polarisation from the total of all of
     the up and down counts.
     """
 
+    __slots__ = ("ups", "downs")
+
     def __init__(self, ups, downs=0):
         self.ups = ups
         self.downs = downs
 
     def __float__(self):
         if float(self.ups) + float(self.downs) == 0:
-            return 0
+            return 0.0
         return (float(self.ups) - float(self.downs)) / \
             (float(self.ups) + float(self.downs))
 
@@ -170,6 +257,17 @@ class Polarisation(Monoid):
             self.ups + y.ups,
             self.downs + y.downs)
 
+    def add_in_place(self, y):
+        # The ups and downs of y are never changed, but those of self
+        # belong to it and may be Monoids which are combined in place
+        y = self.upgrade(y)
+        self.ups = accumulate(self.ups, y.ups)
+        self.downs = accumulate(self.downs, y.downs)
+        return self
+
+    def copy(self):
+        return Polarisation(_copy(self.ups), _copy(self.downs))
+
     def err(self):
         if float(self.ups) + float(self.downs) == 0:
             return 0.0
@@ -220,6 +318,16 @@ class MonoidList(Monoid):
             y = self.zero()
         return MonoidList([a + b for a, b in zip(self.values, y)])
 
+    def add_in_place(self, y):
+        if isinstance(y, (int, float)) and y == 0:
+            return self
+        for index, b in enumerate(y):
+            self.values[index] = accumulate(self.values[index], b)
+        return self
+
+    def copy(self):
+        return MonoidList([_copy(x) for x in self.values])
+
     def __str__(self):
         return "[{}]".format(
             ", ".join([str(x) for x in self]))
@@ -235,6 +343,10 @@ class MonoidList(Monoid):
     def err(self):
         return [x.err() for x in self.values]
 
+    def floats(self):
+        """Return the value of every channel as an array"""
+        return np.array([float(x) for x in self.values])
+
     def min(self):
         """Return the smallest value"""
         lowest = self.values[0]
@@ -252,18 +364,612 @@ class MonoidList(Monoid):
         return best
 
 
+def _as_array(x):
+    """Turn a number or sequence into an array of floats"""
+    return np.array(x, dtype=float, ndmin=1)
+
+
+class MonoidArray(MonoidList):
+    """
+    A MonoidList whose channels are held as NumPy arrays, rather than
+    as a separate monoid for each channel.  Combining arrays, taking
+    their values and propagating their errors are done for every
+    channel at once.
+
+    Iterating over the array, or indexing it, gives the equivalent
+    scalar monoid of each channel.
+
+    Since the number of channels is not known to the class, the static
+    zero() is an array without channels, which combines with an array
+    of any length as the identity.  zero_like() gives the zero with the
+    same channels as an existing array.
+    """
+
+    #: The scalar monoid of a single channel
+    scalar = None
+
+    def __len__(self):
+        return len(self.floats())
+
+    @abstractmethod
+    def __getitem__(self, index):
+        pass
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def values(self):
+        """The scalar monoid of each channel"""
+        return self.to_monoids()
+
+    def to_monoids(self):
+        """
+        Convert the array into the scalar monoids of its channels
+
+        Returns
+        -------
+        A list with a scalar monoid for each channel
+        """
+        return list(self)
+
+    @classmethod
+    @abstractmethod
+    def from_monoids(cls, monoids):
+        """
+        Build an array from the scalar monoids of each channel
+
+        Parameters
+        ----------
+        monoids
+            a list of scalar monoids or a MonoidList
+
+        Returns
+        -------
+        The array monoid
+        """
+
+    @abstractmethod
+    def zero_like(self):
+        """
+        The zero element with the same channels as this array
+        """
+
+    def upgrade(self, x):
+        if isinstance(x, (int, float)) and x == 0:
+            return self.zero_like()
+        if isinstance(x, self.__class__):
+            if len(x) == 0 and len(self):
+                return self.zero_like()
+            return x
+        if isinstance(x, MonoidList):
+            return self.from_monoids(x.values)
+        raise TypeError("Cannot combine {} with {}".format(
+            self.__class__.__name__, type(x).__name__))
+
+    def _pair(self, y):
+        """
+        Upgrade the other side of an addition, widening this array
+        first if it is the channel-less zero
+        """
+        y = self.upgrade(y)
+        if len(self) == 0 and len(y):
+            return y.zero_like(), y
+        return self, y
+
+    def min(self):
+        return self[int(np.nanargmin(self.floats()))]
+
+    def max(self):
+        return self[int(np.nanargmax(self.floats()))]
+
+    def __str__(self):
+        return "[{}]".format(", ".join([str(x) for x in self.floats()]))
+
+
+class AverageArray(MonoidArray):
+    """
+    An Average for each channel, with the totals and counts held in
+    arrays.
+
+    Examples
+    --------
+    >>> AverageArray([10, 20], [5, 5]).floats()
+    array([2., 4.])
+
+    """
+
+    scalar = Average
+
+    def __init__(self, totals, counts=1):
+        self.totals = _as_array(totals)
+        self.counts = np.broadcast_to(_as_array(counts),
+                                      self.totals.shape).copy()
+
+    def __len__(self):
+        return len(self.totals)
+
+    def __getitem__(self, index):
+        return Average(self.totals[index], self.counts[index])
+
+    def __add__(self, y):
+        x, y = self._pair(y)
+        return AverageArray(x.totals + y.totals, x.counts + y.counts)
+
+    def add_in_place(self, y):
+        y = self.upgrade(y)
+        if len(self) == 0:
+            return y.copy()
+        self.totals += y.totals
+        self.counts += y.counts
+        return self
+
+    def copy(self):
+        return AverageArray(self.totals, self.counts)
+
+    @staticmethod
+    def zero():
+        return AverageArray([], [])
+
+    def zero_like(self):
+        return AverageArray(np.zeros_like(self.totals),
+                            np.zeros_like(self.counts))
+
+    def floats(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = self.totals / self.counts
+        values[self.counts == 0] = np.nan
+        values[(self.counts == 0) & (self.totals == 0)] = 0.0
+        return values
+
+    def err(self):
+        """
+        Calculates the error in the average count of every channel, as
+        in Average.err
+
+        Returns
+        -------
+        An array of the errors
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            errs = np.sqrt(self.totals**2 / self.counts**2
+                           * (1 / self.totals + 1 / self.counts))
+        errs[self.counts == 0] = np.nan
+        errs[self.totals == 0] = 0.0
+        return errs
+
+    @classmethod
+    def from_monoids(cls, monoids):
+        monoids = list(monoids)
+        for x in monoids:
+            if type(x) is not Average:  # pylint: disable=unidiomatic-typecheck
+                raise TypeError("Cannot put {!r} in an AverageArray".format(x))
+        return cls([x.total for x in monoids], [x.count for x in monoids])
+
+    def __repr__(self):
+        return "AverageArray({!r}, {!r})".format(self.totals, self.counts)
+
+
+class SumArray(MonoidArray):
+    """
+    A Sum for each channel, with the totals held in an array.
+
+    Examples
+    --------
+    >>> SumArray([4, 9]).err()
+    array([2., 3.])
+
+    """
+
+    scalar = Sum
+
+    def __init__(self, totals):
+        self.totals = _as_array(totals)
+
+    def __len__(self):
+        return len(self.totals)
+
+    def __getitem__(self, index):
+        return Sum(self.totals[index])
+
+    def __add__(self, y):
+        x, y = self._pair(y)
+        return SumArray(x.totals + y.totals)
+
+    def add_in_place(self, y):
+        y = self.upgrade(y)
+        if len(self) == 0:
+            return y.copy()
+        self.totals += y.totals
+        return self
+
+    def copy(self):
+        return SumArray(self.totals)
+
+    @staticmethod
+    def zero():
+        return SumArray([])
+
+    def zero_like(self):
+        return SumArray(np.zeros_like(self.totals))
+
+    def floats(self):
+        return self.totals.copy()
+
+    def err(self):
+        return np.sqrt(self.totals)
+
+    @classmethod
+    def from_monoids(cls, monoids):
+        monoids = list(monoids)
+        for x in monoids:
+            if not isinstance(x, Sum):
+                raise TypeError("Cannot put {!r} in a SumArray".format(x))
+        return cls([x.total for x in monoids])
+
+    def __repr__(self):
+        return "SumArray({!r})".format(self.totals)
+
+
+def _zeros(x):
+    """The zero of the ups or downs of a PolarisationArray"""
+    if isinstance(x, MonoidArray):
+        return x.zero_like()
+    return np.zeros_like(x)
+
+
+def _parts(x):
+    """The values and errors of the ups or downs of a PolarisationArray"""
+    if isinstance(x, MonoidArray):
+        return x.floats(), x.err()
+    return x, np.sqrt(x)
+
+
+class PolarisationArray(MonoidArray):
+    """
+    A Polarisation for each channel.  The ups and downs are either
+    arrays of raw counts or AverageArrays, just as the ups and downs of
+    a Polarisation can be numbers or Averages.
+
+    Examples
+    --------
+    >>> PolarisationArray([30, 10], [10, 30]).floats()
+    array([ 0.5, -0.5])
+
+    """
+
+    scalar = Polarisation
+
+    def __init__(self, ups, downs=0):
+        if not isinstance(ups, MonoidArray):
+            ups = _as_array(ups)
+        if not isinstance(downs, MonoidArray):
+            downs = np.broadcast_to(_as_array(downs), (len(ups),)).copy()
+        self.ups = ups
+        self.downs = downs
+
+    def __len__(self):
+        return len(self.ups)
+
+    def __getitem__(self, index):
+        return Polarisation(self.ups[index], self.downs[index])
+
+    def __add__(self, y):
+        x, y = self._pair(y)
+        return PolarisationArray(x.ups + y.ups, x.downs + y.downs)
+
+    def add_in_place(self, y):
+        y = self.upgrade(y)
+        if len(self) == 0:
+            return y.copy()
+        self.ups = accumulate(self.ups, y.ups)
+        self.downs = accumulate(self.downs, y.downs)
+        return self
+
+    def copy(self):
+        return PolarisationArray(_copy(self.ups), _copy(self.downs))
+
+    @staticmethod
+    def zero():
+        return PolarisationArray([], [])
+
+    def zero_like(self):
+        return PolarisationArray(_zeros(self.ups), _zeros(self.downs))
+
+    def floats(self):
+        ups, _ = _parts(self.ups)
+        downs, _ = _parts(self.downs)
+        total = ups + downs
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = (ups - downs) / total
+        values[total == 0] = 0.0
+        return values
+
+    def err(self):
+        """
+        Calculates the error in the polarisation of every channel, as
+        in Polarisation.err
+
+        Returns
+        -------
+        An array of the errors
+        """
+        ups, up_err = _parts(self.ups)
+        downs, down_err = _parts(self.downs)
+        total = ups + downs
+        noise = np.sqrt(down_err**2 + up_err**2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            errs = np.where(
+                ups == downs, noise / total,
+                self.floats() * noise * np.sqrt((ups - downs)**-2.0
+                                                + total**-2.0))
+        errs[total == 0] = 0.0
+        return errs
+
+    @classmethod
+    def from_monoids(cls, monoids):
+        monoids = list(monoids)
+        for x in monoids:
+            if not isinstance(x, Polarisation):
+                raise TypeError(
+                    "Cannot put {!r} in a PolarisationArray".format(x))
+        return cls(_gather([x.ups for x in monoids]),
+                   _gather([x.downs for x in monoids]))
+
+    def __repr__(self):
+        return "PolarisationArray({!r}, {!r})".format(self.ups, self.downs)
+
+
+def _gather(parts):
+    """Collect the ups or downs of some Polarisations into an array"""
+    if parts and all(type(x) is Average for x in parts):  # pylint: disable=unidiomatic-typecheck
+        return AverageArray.from_monoids(parts)
+    if any(isinstance(x, Monoid) for x in parts):
+        raise TypeError("Cannot put {!r} in a PolarisationArray".format(parts))
+    return _as_array(parts)
+
+
+def monoid_array(monoids):
+    """
+    Convert a list of scalar monoids into the matching array monoid
+
+    Parameters
+    ----------
+    monoids
+        a list of Averages, Sums or Polarisations, or a MonoidList of them
+
+    Returns
+    -------
+    An AverageArray, SumArray or PolarisationArray
+    """
+    if isinstance(monoids, MonoidArray):
+        return monoids
+    if isinstance(monoids, MonoidList):
+        monoids = monoids.values
+    monoids = list(monoids)
+    for kind in (AverageArray, SumArray, PolarisationArray):
+        if monoids and type(monoids[0]) is kind.scalar:  # pylint: disable=unidiomatic-typecheck
+            return kind.from_monoids(monoids)
+    raise TypeError("No array monoid for {!r}".format(monoids[:1]))
+
+
+def point_bounds(values, errors):
+    """
+    Find the largest value plus error and the smallest value minus
+    error of each point.  Channels which are NaN are ignored.
+
+    Parameters
+    ----------
+    values
+        the value of each point, with a column for each channel of a
+        MonoidList
+    errors
+        the matching uncertainties
+
+    Returns
+    -------
+    The upper and lower bounds of each point
+    """
+    values = np.asarray(values, dtype=float)
+    errors = np.asarray(errors, dtype=float)
+    upper = values + errors
+    lower = values - errors
+    if upper.ndim > 1:
+        upper = np.fmax.reduce(upper, axis=1)
+        lower = np.fmin.reduce(lower, axis=1)
+    return upper, lower
+
+
+def _extreme(index, value, best_index, best, better):
+    """
+    Update the most extreme point with a new bound for one point
+
+    Returns
+    -------
+    The index and bound of the most extreme point, or None if the
+    extreme point has moved back and every point must be checked
+    """
+    if index == best_index:
+        if value == best or better(value, best):
+            return index, value
+        return None
+    if np.isnan(value):
+        return best_index, best
+    if best_index is None or better(value, best):
+        return index, value
+    return best_index, best
+
+
+class RunningBounds(object):
+    """
+    The largest value plus error and the smallest value minus error of
+    a set of points, kept up to date as points are added or changed.
+    Every point is only checked again when the extreme point itself
+    moves back towards the others.
+
+    Examples
+    --------
+    >>> bounds = RunningBounds(lambda: (np.array([3.0]), np.array([1.0])))
+    >>> bounds.max()
+    3.0
+    >>> bounds.update(1, 5.0, 2.0)
+    >>> (bounds.min(), bounds.max())
+    (1.0, 5.0)
+
+    """
+
+    def __init__(self, rescan):
+        """
+        Parameters
+        ----------
+        rescan
+            a function giving the upper and lower bounds of every point
+        """
+        self._rescan = rescan
+        self._stale = True
+        self._high = (None, np.nan)
+        self._low = (None, np.nan)
+
+    def copy(self, rescan):
+        """
+        Copy the bounds for another set of points that matches this one
+
+        Parameters
+        ----------
+        rescan
+            a function giving the bounds of every point of the copy
+        """
+        bounds = RunningBounds(rescan)
+        # pylint: disable=protected-access
+        bounds._stale = self._stale
+        bounds._high = self._high
+        bounds._low = self._low
+        return bounds
+
+    def invalidate(self):
+        """
+        Check every point on the next query, e.g. after points have been
+        removed or reordered
+        """
+        self._stale = True
+
+    def update(self, index, upper, lower):
+        """
+        Record the new bounds of a single point
+
+        Parameters
+        ----------
+        index
+            the index of the point
+        upper
+            the value plus error of the point
+        lower
+            the value minus error of the point
+        """
+        if self._stale:
+            return
+        high = _extreme(index, upper, self._high[0], self._high[1], np.greater)
+        low = _extreme(index, lower, self._low[0], self._low[1], np.less)
+        if high is None or low is None:
+            self._stale = True
+            return
+        self._high = high
+        self._low = low
+
+    def _refresh(self):
+        if not self._stale:
+            return
+        upper, lower = self._rescan()
+        self._high = (None, np.nan)
+        self._low = (None, np.nan)
+        if np.any(~np.isnan(upper)):
+            index = int(np.nanargmax(upper))
+            self._high = (index, float(upper[index]))
+        if np.any(~np.isnan(lower)):
+            index = int(np.nanargmin(lower))
+            self._low = (index, float(lower[index]))
+        self._stale = False
+
+    def max(self):
+        """The largest value plus error, or NaN if there are no values"""
+        self._refresh()
+        return self._high[1]
+
+    def min(self):
+        """The smallest value minus error, or NaN if there are no values"""
+        self._refresh()
+        return self._low[1]
+
+
+def _invalidating(name):
+    """Wrap a list method so that it resets the bounds of the list"""
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._bounds.invalidate()  # pylint: disable=protected-access
+        return result
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
 class ListOfMonoids(list):
     """
     A modified list class with special helpers for handlings
     lists of Monoids
+
+    The list keeps running bounds for max() and min(), which are
+    updated when points are appended or set, e.g. by ``ys[i] += value``.
+    A monoid changed in place without being set again in the list is
+    not noticed.
     """
 
+    def __init__(self, *args):
+        super(ListOfMonoids, self).__init__(*args)
+        self._bounds = RunningBounds(self._point_bounds)
+
+    def _point_bounds(self):
+        if not self:
+            return np.empty(0), np.empty(0)
+        return point_bounds(np.array(self.values()).T, np.array(self.err()).T)
+
+    def _update_bounds(self, index):
+        value = self[index]
+        if isinstance(value, MonoidList):
+            upper, lower = point_bounds([value.floats()], [value.err()])
+        else:
+            upper, lower = point_bounds([float(value)], [value.err()])
+        self._bounds.update(index, upper[0], lower[0])
+
+    def append(self, value):
+        super(ListOfMonoids, self).append(value)
+        self._update_bounds(len(self) - 1)
+
+    def __setitem__(self, index, value):
+        super(ListOfMonoids, self).__setitem__(index, value)
+        if isinstance(index, slice):
+            self._bounds.invalidate()
+        else:
+            self._update_bounds(index % len(self))
+
+    __delitem__ = _invalidating("__delitem__")
+    __iadd__ = _invalidating("__iadd__")
+    __imul__ = _invalidating("__imul__")
+    extend = _invalidating("extend")
+    insert = _invalidating("insert")
+    pop = _invalidating("pop")
+    remove = _invalidating("remove")
+    reverse = _invalidating("reverse")
+    sort = _invalidating("sort")
+
     def values(self):
         """
         Get the numerical values from the List
         """
         if isinstance(self[0], MonoidList):
-            return np.array([[float(v) for v in y] for y in self]).T
+            return np.array([y.floats() for y in self]).T
         return [float(y) for y in self]
 
     def err(self):
@@ -278,12 +984,10 @@ class ListOfMonoids(list):
         """
         Find the largest value in the list, including for uncertainty
         """
-        return np.nanmax(np.array(self.values()) +
-                         np.array(self.err()))
+        return self._bounds.max()
 
     def min(self):
         """
         Find the smallest value in the list, including for uncertainty
         """
-        return np.nanmin(np.array(self.values()) -
-                         np.array(self.err()))
+        return self._bounds.min()
@@ -15,8 +15,11 @@ try:
 except ImportError:
     from .mocks import g
 
+import numpy as np
 from six import text_type
 
+from .monitor import block_monitor
+
 
 class Motion(object):
     # pylint: disable=too-many-instance-attributes
@@ -26,7 +29,9 @@ class Motion(object):
     parameter causes the position to update.
 
     We can also define getters and setters for velocity of the motor,
-    and a getter for the tolerance of the motor.
+    and a getter for the tolerance of the motor.  A monitor function,
+    as made by general.scans.monitor.block_monitor, lets scans follow
+    the position without polling it.
 
     Example:
     Assume that we have some motion object Foo
@@ -41,7 +46,8 @@ class Motion(object):
 
     def __init__(self, getter, setter, title, low=None, high=None,
                  velocity_getter=None, velocity_setter=None,
-                 tolerance_getter=None, unit=None):
+                 tolerance_getter=None, unit=None, monitor=None):
+        # pylint: disable=too-many-arguments
         self.getter = getter
         self.setter = setter
         self.title = title
@@ -54,6 +60,8 @@ class Motion(object):
 
         self._tolerance_getter = tolerance_getter
 
+        self.monitor = monitor
+
     def __call__(self, x=None):
         if x is None:
             return self.getter()
@@ -81,7 +89,8 @@ class Motion(object):
         Parameters
         ==========
         x
-          The desired position for the motor
+          The desired position for the motor, or an array of positions
+          which are all checked at once
 
         Returns
         =======
@@ -90,23 +99,30 @@ class Motion(object):
 
         The boolean represents whether the possition can be reached
         The string is an error message explaining why the position is
-        unreachable.
+        unreachable.  For an array, the message gives the position
+        furthest beyond the limit.
 
         """
-        if self.low is not None and x < self.low:
+        positions = np.asarray(x, dtype=float)
+        if positions.ndim:
+            lowest = positions.min() if positions.size else None
+            highest = positions.max() if positions.size else None
+        else:
+            lowest = highest = x
+        if self.low is not None and lowest is not None and lowest < self.low:
             return (False,
                     "Position {} is below lower limit {} of motor {}".format(
-                        x, self.low, self.title))
-        if self.high is not None and x > self.high:
+                        lowest, self.low, self.title))
+        if self.high is not None and highest is not None and highest > self.high:
             return (False,
                     "Position {} is above upper limit {} of motor {}".format(
-                        x, self.high, self.title))
+                        highest, self.high, self.title))
 
         return True, "Position is Accessible"
 
     def require(self, x):
-        """Requires that the given position is accessible.  If not, an
-        exception is thrown
+        """Requires that the given position, or array of positions, is
+        accessible.  If not, an exception is thrown
 
         """
         success, msg = self.accessible(x)
@@ -158,6 +174,29 @@ class Motion(object):
         return self._tolerance_getter()
 
 
+def wait_for_axes(motions):
+    """Wait once for a group of axes which were all set moving together.
+
+    Each axis that is an IBEX block is waited for by name, so the wait
+    ends as soon as every axis of the group has finished, whatever else
+    is moving on the beamline.  If any axis is not a block, all motion
+    is waited for instead.
+
+    Parameters
+    ----------
+    motions
+      The motions which were sent new targets.  Nothing is waited for
+      if this is empty.
+    """
+    if not motions:
+        return
+    blocks = [getattr(motion, "block", None) for motion in motions]
+    if all(blocks):
+        g.waitfor_move(*blocks)
+    else:
+        g.waitfor_move()
+
+
 class BlockMotion(Motion):
     """
 
@@ -180,6 +219,7 @@ class BlockMotion(Motion):
                 block = new_name[0]
             else:
                 raise RuntimeError("Unknown block {}.".format(block))
+        self.block = block
         Motion.__init__(self,
                         lambda: g.cget(block)["value"],
                         lambda x: g.cset(block, x),
@@ -193,7 +233,8 @@ class BlockMotion(Motion):
                         velocity_setter=lambda vel: g.set_pv(
                             "CS:SB:{}.VELO".format(block), vel, is_local=True),
                         tolerance_getter=lambda: g.get_pv(
-                            "CS:SB:{}.RDBD".format(block), is_local=True),)
+                            "CS:SB:{}.RDBD".format(block), is_local=True),
+                        monitor=block_monitor(block))
 
 
 def pv_motion(pv_str, name):
@@ -0,0 +1,280 @@
+"""
+The module compiles a scan into a flat plan of its points.
+
+A composite scan, such as the sum or product of two scans, produces
+its points through nested generators and finds its length and range by
+recursing through the scans that it is built from.  A ScanPlan instead
+holds the target of every axis at every point in one structured array,
+with one field for each axis, and works out the length and the range
+of each axis once.  Stepping through the points or asking for the
+range then takes the same time however the scan was built.
+
+An axis which a point does not move, e.g. in the sum of scans over
+different motors, has a NaN target at that point.  Axes are told apart
+by the block they move, or by their title, so separate motion objects
+for the same block share an axis.
+"""
+
+import numpy as np
+
+
+def _axis_key(motion):
+    """The name which identifies the axis that a motion moves"""
+    block = getattr(motion, "block", None)
+    if block is not None:
+        return block
+    return getattr(motion, "title", motion)
+
+
+def _not_a_number(motion, value):
+    """The error for a target which cannot be planned"""
+    return ValueError("Cannot plan the target {!r} of {}, as it is not a "
+                      "number".format(value, _axis_key(motion)))
+
+
+def _as_targets(motion, values):
+    """The targets of an axis as an array of floats"""
+    try:
+        return np.asarray(values, dtype=float)
+    except ValueError:
+        for value in values:
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                raise _not_a_number(motion, value)
+        raise
+
+
+def _unique(motions):
+    """The motions which move different axes, keeping the first of each"""
+    unique = []
+    keys = []
+    for motion in motions:
+        if _axis_key(motion) not in keys:
+            keys.append(_axis_key(motion))
+            unique.append(motion)
+    return unique
+
+
+def _field_names(motions):
+    """Unique names for the fields of the targets, based on the titles
+    of the motions"""
+    names = []
+    for motion in motions:
+        base = str(getattr(motion, "title", "axis"))
+        name, copy = base, 1
+        while name in names:
+            copy += 1
+            name = "{}_{}".format(base, copy)
+        names.append(name)
+    return names
+
+
+class ScanPlan(object):
+    """
+    The points of a scan, compiled into a structured array of the target
+    of each axis.
+
+    Examples
+    --------
+    >>> plan = ScanPlan.single(theta, [0, 1, 2]).product(
+    ...     ScanPlan.single(two_theta, [5, 6]))
+    >>> len(plan)
+    6
+    >>> plan.min()
+    (0.0, 5.0)
+
+    """
+
+    def __init__(self, motions, columns):
+        """
+        Parameters
+        ----------
+        motions
+            the motion of each axis
+        columns
+            the targets of each axis, as arrays of the same length
+        """
+        self.motions = list(motions)
+        self._keys = [_axis_key(motion) for motion in self.motions]
+        names = _field_names(self.motions)
+        length = len(columns[0]) if columns else 0
+        self.targets = np.empty(length, dtype=[(name, "<f8") for name in names])
+        for name, column in zip(names, columns):
+            self.targets[name] = column
+        self._columns = [self.targets[name] for name in names]
+        self._length = length
+        with np.errstate(invalid="ignore"):
+            self.low = np.array([np.nanmin(column) if np.any(np.isfinite(column))
+                                 else np.nan for column in self._columns])
+            self.high = np.array([np.nanmax(column) if np.any(np.isfinite(column))
+                                  else np.nan for column in self._columns])
+
+    @classmethod
+    def single(cls, motion, values):
+        """
+        Create the plan of a scan along a single axis
+
+        Parameters
+        ----------
+        motion
+            the motion to scan
+        values
+            the targets of the motion
+        """
+        return cls([motion], [_as_targets(motion, values)])
+
+    @classmethod
+    def from_points(cls, points):
+        """
+        Create a plan from a list of points, each a list of (motion,
+        target) pairs, as produced by the setpoints method of a scan
+        """
+        motions = _unique(motion for point in points for motion, _ in point)
+        keys = [_axis_key(motion) for motion in motions]
+        columns = np.full((len(motions), len(points)), np.nan)
+        for index, point in enumerate(points):
+            for motion, target in point:
+                try:
+                    columns[keys.index(_axis_key(motion)), index] = target
+                except ValueError:
+                    raise _not_a_number(motion, target)
+        return cls(motions, list(columns))
+
+    def _targets_of(self, motion):
+        """The targets of a motion, or NaN if the plan does not move it"""
+        key = _axis_key(motion)
+        if key in self._keys:
+            return self._columns[self._keys.index(key)]
+        return np.full(self._length, np.nan)
+
+    @staticmethod
+    def _take(parts):
+        """
+        Combine the rows of several plans into a new plan.  Each part is a
+        plan and the indices of its rows to use, and all of the parts must
+        select the same number of rows.  Where more than one part moves an
+        axis, the last one sets the target.
+        """
+        motions = _unique(motion for plan, _ in parts for motion in plan.motions)
+        columns = []
+        for motion in motions:
+            column = np.full(len(parts[0][1]), np.nan)
+            for plan, rows in parts:
+                # pylint: disable=protected-access
+                selected = plan._targets_of(motion)[rows]
+                moved = ~np.isnan(selected)
+                column[moved] = selected[moved]
+            columns.append(column)
+        return ScanPlan(motions, columns)
+
+    def concatenate(self, other):
+        """
+        Create the plan which runs this plan and then another, as for a
+        SumScan.
+        """
+        motions = _unique(self.motions + other.motions)
+        # pylint: disable=protected-access
+        return ScanPlan(motions, [np.concatenate([self._targets_of(motion),
+                                                  other._targets_of(motion)])
+                                  for motion in motions])
+
+    def product(self, inner, serpentine=False):
+        """
+        Create the plan which runs every point of an inner plan at every
+        point of this plan, as for a ProductScan.
+
+        Parameters
+        ----------
+        inner
+            the plan to run at each point of this one
+        serpentine
+            if True, run the inner plan backwards on every other point
+        """
+        rows, columns = len(self), len(inner)
+        outer_rows = np.repeat(np.arange(rows), columns)
+        inner_rows = np.tile(np.arange(columns), rows)
+        if serpentine:
+            odd = outer_rows % 2 == 1
+            inner_rows[odd] = columns - 1 - inner_rows[odd]
+        return self._take([(self, outer_rows), (inner, inner_rows)])
+
+    def parallel(self, other):
+        """
+        Create the plan which runs this plan alongside another, as for a
+        ParallelScan.  The plan stops when the shorter plan ends.
+        """
+        rows = np.arange(min(len(self), len(other)))
+        return self._take([(self, rows), (other, rows)])
+
+    @property
+    def reverse(self):
+        """The plan which visits the same points in the opposite order"""
+        return ScanPlan(self.motions, [column[::-1] for column in self._columns])
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        return [(motion, column[index])
+                for motion, column in zip(self.motions, self._columns)
+                if not np.isnan(column[index])]
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __repr__(self):
+        return "ScanPlan({} points, {})".format(
+            self._length, ", ".join(self.targets.dtype.names))
+
+    def column(self, motion):
+        """
+        Get the targets of an axis at every point
+
+        Parameters
+        ----------
+        motion
+            the motion of the axis
+
+        Returns
+        -------
+        An array of the targets, which is NaN where the axis does not move
+        """
+        if _axis_key(motion) not in self._keys:
+            raise KeyError("{} is not an axis of the plan".format(motion))
+        return self._targets_of(motion)
+
+    def min(self):
+        """
+        Find the smallest target of each axis.  A single axis plan gives
+        a number, otherwise there is one entry for each axis.
+        """
+        if len(self.low) == 1:
+            return self.low[0]
+        return tuple(self.low)
+
+    def max(self):
+        """
+        Find the largest target of each axis.  A single axis plan gives
+        a number, otherwise there is one entry for each axis.
+        """
+        if len(self.high) == 1:
+            return self.high[0]
+        return tuple(self.high)
+
+    def validate(self):
+        """
+        Check that every axis can reach all of its targets, before any
+        of them are moved.
+
+        Raises
+        ------
+        RuntimeError
+            if a target is outside the limits of its motion
+        """
+        for motion, column in zip(self.motions, self._columns):
+            require = getattr(motion, "require", None)
+            if require is not None:
+                require(column[~np.isnan(column)])
+        return self
@@ -0,0 +1,152 @@
+"""
+The module plans the order in which a scan visits its points, so that
+the motors spend as little time as possible travelling between them.
+
+A point is a list of (motion, target) pairs, as produced by the
+setpoints method of a scan.  All of the axes of a point are moved
+together, so the time taken to reach a point is set by the slowest
+axis, i.e. the largest distance over velocity.  Reordering the points
+never changes where they are measured, so plots and fits of a planned
+scan match those of the original.
+"""
+
+import numpy as np
+
+#: The velocity assumed for a motion that cannot report one
+DEFAULT_VELOCITY = 1.0
+
+
+def axis_velocity(motion):
+    """
+    Get the velocity of a motion, falling back to DEFAULT_VELOCITY if
+    the motion has no usable velocity
+
+    Parameters
+    ----------
+    motion
+        the motion to get the velocity of
+
+    Returns
+    -------
+    The velocity as a positive float
+    """
+    try:
+        velocity = float(motion.velocity)
+    except (AttributeError, TypeError, ValueError):
+        return DEFAULT_VELOCITY
+    if not np.isfinite(velocity) or velocity <= 0:
+        return DEFAULT_VELOCITY
+    return velocity
+
+
+def serpentine(outer, inner):
+    """
+    Combine the points of two scans so that the inner scan runs in
+    alternating directions, rather than returning to its start after
+    each step of the outer scan.
+
+    Parameters
+    ----------
+    outer
+        the points of the outer scan
+    inner
+        the points of the inner scan
+
+    Returns
+    -------
+    A generator of the combined points
+    """
+    inner = list(inner)
+    for row, i in enumerate(outer):
+        for j in (inner[::-1] if row % 2 else inner):
+            yield i + j
+
+
+def _route_time(targets, velocities, start, order):
+    """The time taken to travel from start through the targets in order"""
+    route = targets[order]
+    if start is not None:
+        route = np.vstack([start, route])
+    if len(route) < 2:
+        return 0.0
+    return np.sum(np.max(np.abs(np.diff(route, axis=0)) / velocities, axis=1))
+
+
+def _nearest_first(targets, velocities, start):
+    """Order the targets by always travelling to the quickest one to
+    reach next."""
+    remaining = np.ones(len(targets), dtype=bool)
+    order = np.empty(len(targets), dtype=int)
+    current = targets[0] if start is None else start
+    for step in range(len(targets)):
+        times = np.max(np.abs(targets - current) / velocities, axis=1)
+        times[~remaining] = np.inf
+        index = int(np.argmin(times))
+        order[step] = index
+        remaining[index] = False
+        current = targets[index]
+    return order
+
+
+def travel_order(points, start=None):
+    """
+    Find an order for the points which keeps the travel time short.
+
+    The route that always heads for the quickest point to reach next is
+    compared with the original order and its reverse, and the fastest
+    of the three is used, so planning never makes a scan slower.
+
+    Parameters
+    ----------
+    points
+        a list of points, each a list of (motion, target) pairs
+    start
+        the current positions of the axes, in the order that they
+        appear in the points, or None to start from the first point
+
+    Returns
+    -------
+    A list of the indices of the points in the order to visit them
+    """
+    if not points:
+        return []
+    axes = [motion for motion, _ in points[0]]
+    # Points which do not all move the same axes cannot be compared
+    if any(len(point) != len(axes) or
+           any(motion is not axis for (motion, _), axis in zip(point, axes))
+           for point in points):
+        return list(range(len(points)))
+    targets = np.array([[target for _, target in point] for point in points],
+                       dtype=float)
+    velocities = np.array([axis_velocity(motion) for motion in axes])
+    if start is not None:
+        start = np.asarray(start, dtype=float)
+
+    original = np.arange(len(points))
+    candidates = [original, original[::-1],
+                  _nearest_first(targets, velocities, start)]
+    times = [_route_time(targets, velocities, start, order)
+             for order in candidates]
+    return [int(x) for x in candidates[int(np.argmin(times))]]
+
+
+def current_position(points):
+    """
+    Read the current position of the axes moved by the points
+
+    Parameters
+    ----------
+    points
+        a list of points, each a list of (motion, target) pairs
+
+    Returns
+    -------
+    A list of the positions of the axes of the first point, or None if
+    they cannot be read
+    """
+    if not points:
+        return None
+    try:
+        return [float(motion()) for motion, _ in points[0]]
+    except (TypeError, ValueError):
+        return None
@@ -21,7 +21,8 @@ class PlotFunctions:
     Encapsulate some of the interactions and setting for creating matplotlib graphs
     """
 
-    def __init__(self, data_marker_size=3, markers="dosp+xv^<>", color_cycle=None, fit_colour="orange"):
+    def __init__(self, data_marker_size=3, markers="dosp+xv^<>", color_cycle=None, fit_colour="orange",
+                 incremental=False):
         """
         Initialise plot functions with defaults plotting
 
@@ -35,6 +36,10 @@ class PlotFunctions:
             list of colours to use
         fit_colour
             colour for a fit to the data
+        incremental
+            if True create the data and fit artists once per scan and update their data in place on each
+            point, rather than clearing the axis and plotting everything again. The scan loop is then
+            responsible for calling draw once per point.
         """
         self.data_marker_size = data_marker_size
         if color_cycle is None:
@@ -46,9 +51,14 @@ class PlotFunctions:
             self.color_cycle = color_cycle
         self.data_markers = markers
         self.fit_colour = fit_colour
+        self.incremental = incremental
 
         self._fig = None
         self._axis = None
+        # artists kept between points when plotting incrementally
+        self._data_series = {}
+        self._fit_lines = {}
+        self._vertical_line = None
 
     def set_figure_and_axis(self, figure, axis):
         """
@@ -63,6 +73,15 @@ class PlotFunctions:
         """
         self._fig = figure
         self._axis = axis
+        self._forget_artists()
+
+    def _forget_artists(self):
+        """
+        Forget any artists kept for incremental plotting so that the next plot creates them afresh.
+        """
+        self._data_series = {}
+        self._fit_lines = {}
+        self._vertical_line = None
 
     def plot_data_with_errors(self, xs, ys):
         """
@@ -82,15 +101,60 @@ class PlotFunctions:
 
         if ys is not None and len(ys) > 0:
             if isinstance(ys[0], MonoidList):
-                for y, err, color, marker in zip(ys.values(), ys.err(),
-                                                 self.color_cycle, self.data_markers):
-                    self._axis.errorbar(xs, y, yerr=err, fmt="", color=color,
-                                        marker=marker, markersize=self.data_marker_size, linestyle="None")
+                for index, (y, err, color, marker) in enumerate(zip(ys.values(), ys.err(),
+                                                                    self.color_cycle, self.data_markers)):
+                    self._plot_series(index, xs, y, err, color, marker)
             else:
-                self._axis.errorbar(xs, ys.values(), yerr=ys.err(), color=self.color_cycle[0],
-                                    marker=self.data_markers[0], markersize=self.data_marker_size, linestyle="None")
+                self._plot_series(0, xs, ys.values(), ys.err(), self.color_cycle[0], self.data_markers[0])
 
-        self.draw()
+        self._draw_unless_incremental()
+
+    def _plot_series(self, index, xs, ys, errs, color, marker):
+        """
+        Plot a single data series with error bars. When plotting incrementally the errorbar artists for the
+        series are only created once and afterwards have their data replaced.
+
+        Parameters
+        ----------
+        index
+            index of the series in the plot
+        xs
+            x coordinates
+        ys
+            y values
+        errs
+            uncertainty on the y values
+        color
+            colour of the series
+        marker
+            marker of the series
+        """
+        container = self._data_series.get(index) if self.incremental else None
+        if container is None:
+            container = self._axis.errorbar(xs, ys, yerr=errs, fmt="", color=color, marker=marker,
+                                            markersize=self.data_marker_size, linestyle="None")
+            if self.incremental:
+                self._data_series[index] = container
+            return
+
+        data_line, _, bar_line_collections = container.lines
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        errs = np.asarray(errs, dtype=float)
+        data_line.set_data(xs, ys)
+        segments = np.empty((len(xs), 2, 2))
+        segments[:, :, 0] = xs[:, np.newaxis]
+        segments[:, 0, 1] = ys - errs
+        segments[:, 1, 1] = ys + errs
+        for bar_lines in bar_line_collections:
+            bar_lines.set_segments(segments)
+
+    def _draw_unless_incremental(self):
+        """
+        Draw the plot, unless plotting incrementally in which case the scan loop draws once per point.
+        """
+        if not self.incremental:
+            self.draw()
 
     def _plot_range(self, points):
         """
@@ -157,7 +221,13 @@ class PlotFunctions:
         y_unit
             unit of y axis
         """
+        if self.incremental and self._data_series:
+            # The artists are already in place so only the range can have changed
+            self._set_x_range(x_min, x_max)
+            return
+
         self._axis.clear()
+        self._forget_artists()
         full_x_label = self._create_axis_title(x_label, x_unit)
 
         if full_x_label is not None:
@@ -168,14 +238,27 @@ class PlotFunctions:
         full_y_label = self._create_axis_title(y_label, y_unit)
         if full_y_label is not None:
             self._axis.set_ylabel(full_y_label)
+        self._set_x_range(x_min, x_max)
+        # Adjust plot so that x-axis is not cut off
+        self._fig.subplots_adjust(bottom=0.225)
+        self._draw_unless_incremental()
+
+    def _set_x_range(self, x_min, x_max):
+        """
+        Set the x range of the plot with a little space either side
+
+        Parameters
+        ----------
+        x_min
+            minimum x value
+        x_max
+            maximum x value
+        """
         if isinstance(x_min, tuple):
             x_min = x_min[0]
             x_max = x_max[0]
         range_min, range_max = self._add_space_to_range(x_min, x_max)
         self._axis.set_xlim(range_min, range_max)
-        # Adjust plot so that x-axis is not cut off
-        self._fig.subplots_adjust(bottom=0.225)
-        self.draw()
 
     def _create_axis_title(self, label, unit):
         """
@@ -235,10 +318,35 @@ class PlotFunctions:
         fit_label
             label for the fit
         """
-        self._axis.plot(plot_x, fit_y, "-", label=fit_label, color=self.fit_colour)
+        self.plot_fit_series(0, plot_x, fit_y, fit_label)
+
+    def plot_fit_series(self, index, plot_x, fit_y, fit_label):
+        """
+        Plot the fit line of one data series. When plotting incrementally the line for the series is
+        reused and only its data and label are replaced.
+
+        Parameters
+        ----------
+        index
+            index of the data series that was fitted
+        plot_x
+            x values
+        fit_y
+            y fit values
+        fit_label
+            label for the fit
+        """
+        line = self._fit_lines.get(index) if self.incremental else None
+        if line is None:
+            lines = self._axis.plot(plot_x, fit_y, "-", label=fit_label, color=self.fit_colour)
+            if self.incremental:
+                self._fit_lines[index] = lines[0]
+        else:
+            line.set_data(plot_x, fit_y)
+            line.set_label(fit_label)
         self._axis.legend(bbox_to_anchor=(0, 1.02, 1, 0.2), loc="lower left", mode="expand", borderaxespad=0, ncol=3)
 
-        self.draw()
+        self._draw_unless_incremental()
 
     def plot_vertical_fit_line(self, x_pos, fit_label):
         """
@@ -251,8 +359,11 @@ class PlotFunctions:
         fit_label
             label for the fit line
         """
-        self._axis.axvline(x=x_pos, color=self.fit_colour)
+        if self.incremental and self._vertical_line is not None:
+            self._vertical_line.set_xdata([x_pos, x_pos])
+        else:
+            self._vertical_line = self._axis.axvline(x=x_pos, color=self.fit_colour)
         self._axis.legend([fit_label], bbox_to_anchor=(0, 1.02, 1, 0.2), loc="lower left", mode="expand",
                           borderaxespad=0, ncol=3)
 
-        self.draw()
+        self._draw_unless_incremental()
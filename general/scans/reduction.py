@@ -0,0 +1,157 @@
+"""
+The module combines large collections of monoids, such as the
+measurements of every pixel, period or time slice of a run.
+
+Since monoids are associative, a collection can be cut into chunks
+which are folded independently and the partial results then combined
+in pairs, level by level, until a single monoid remains.  The chunks
+and the pairs are handed to a pool of threads or processes, so that
+post-processing whole runs can make use of every core.
+
+Within a chunk, collections of a single monoid type are combined with
+NumPy, rather than by adding the monoids one at a time.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numbers
+
+import numpy as np
+
+from .monoid import (Average, AverageArray, Monoid, MonoidList, Polarisation,
+                     PolarisationArray, Sum, SumArray, accumulate)
+
+#: The number of monoids folded by each task of a parallel reduction
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def _copy(x):
+    if isinstance(x, Monoid):
+        return x.copy()
+    return x
+
+
+def _total(values):
+    """Sum a list of numbers with NumPy"""
+    return np.asarray(values).sum(axis=0)
+
+
+def _same_length(arrays):
+    return len(set(len(x) for x in arrays)) == 1
+
+
+def _vectorised(monoids):
+    """
+    Combine a list of monoids of a single type with NumPy
+
+    Returns
+    -------
+    The combined monoid, or None if the list cannot be combined this way
+    """
+    # pylint: disable=too-many-return-statements
+    kind = type(monoids[0])
+    if any(type(x) is not kind for x in monoids):  # pylint: disable=unidiomatic-typecheck
+        return None
+    if issubclass(kind, numbers.Number):
+        return _total(monoids).item()
+    if kind is Average:
+        return Average(_total([x.total for x in monoids]).item(),
+                       _total([x.count for x in monoids]).item())
+    if kind is Sum:
+        return Sum(_total([x.total for x in monoids]).item())
+    if kind is Polarisation:
+        return Polarisation(fold([x.ups for x in monoids]),
+                            fold([x.downs for x in monoids]))
+    if kind is MonoidList:
+        if not _same_length([x.values for x in monoids]):
+            return None
+        return MonoidList([fold(list(channel))
+                           for channel in zip(*[x.values for x in monoids])])
+    if not _same_length(monoids):
+        return None
+    if kind is AverageArray:
+        return AverageArray(_total([x.totals for x in monoids]),
+                            _total([x.counts for x in monoids]))
+    if kind is SumArray:
+        return SumArray(_total([x.totals for x in monoids]))
+    if kind is PolarisationArray:
+        return PolarisationArray(fold([x.ups for x in monoids]),
+                                 fold([x.downs for x in monoids]))
+    return None
+
+
+def fold(monoids):
+    """
+    Combine a collection of monoids on the current thread.  None of the
+    monoids are changed.
+
+    Parameters
+    ----------
+    monoids
+        the monoids to combine
+
+    Returns
+    -------
+    The combined monoid, or 0 if there were no monoids
+
+    Examples
+    --------
+    >>> fold([Average(1, 2), Average(3, 4)])
+    Average(4, count=6)
+
+    """
+    monoids = list(monoids)
+    if not monoids:
+        return 0
+    total = _vectorised(monoids)
+    if total is not None:
+        return total
+    total = _copy(monoids[0])
+    for x in monoids[1:]:
+        total = accumulate(total, x)
+    return total
+
+
+def combine(monoids, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+            processes=False):
+    """
+    Combine a collection of monoids by a tree reduction across a pool
+    of workers.  None of the monoids are changed.
+
+    Parameters
+    ----------
+    monoids
+        the monoids to combine
+    workers
+        the size of the pool.  None uses the default of the executor,
+        while 1 folds everything on the current thread.
+    chunk_size
+        the number of monoids folded by each task
+    processes
+        use a pool of processes instead of threads.  The monoids must
+        then be picklable and, on Windows, the call must be made from
+        within an ``if __name__ == "__main__"`` block.
+
+    Returns
+    -------
+    The combined monoid, or 0 if there were no monoids
+
+    Examples
+    --------
+    >>> combine([Sum(x) for x in range(10000)], chunk_size=1000)
+    Sum(49995000)
+
+    """
+    monoids = list(monoids)
+    if workers == 1 or len(monoids) <= chunk_size:
+        return fold(monoids)
+    chunk_size = max(1, chunk_size)
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        partials = list(pool.map(
+            fold, [monoids[start:start + chunk_size]
+                   for start in range(0, len(monoids), chunk_size)]))
+        while len(partials) > 1:
+            partials = list(pool.map(
+                fold, [partials[start:start + 2]
+                       for start in range(0, len(partials), 2)]))
+    return partials[0]
@@ -0,0 +1,171 @@
+"""
+The module holds the renderers that bring the plot of a scan up to
+date as points are measured.
+
+A scan hands every plot update to a renderer.  The plain Renderer
+performs the update straight away, inside the acquisition loop.  The
+BackgroundRenderer instead keeps only the most recent update and
+performs it on its own thread at no more than a fixed frame rate, so
+that a slow matplotlib backend cannot hold up motor moves or the DAE.
+
+Submitting an update only passes the renderer a reference to the data.
+The background thread copies the data when it picks the update up, so
+the copy is made once for each frame drawn rather than for every
+point.  The scan therefore changes submitted data inside the
+renderer's changing() block, so that a copy is never taken half way
+through a change.
+
+The background renderer is intended for non-interactive backends,
+such as the IBEX web backend, which can safely be drawn from a thread
+other than the main one.
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from .monoid import Monoid
+
+
+def _snapshot(data):
+    """Copy data so that the acquisition can carry on changing it"""
+    if hasattr(data, "snapshot"):
+        return data.snapshot()
+    if isinstance(data, np.ndarray):
+        copy = data.copy()
+        if data.dtype == object:
+            # The cells are combined in place, so they need copying too
+            for index, x in np.ndenumerate(data):
+                if isinstance(x, Monoid):
+                    copy[index] = x.copy()
+        return copy
+    if isinstance(data, tuple):
+        return tuple(_snapshot(x) for x in data)
+    return data
+
+
+class Renderer(object):
+    """
+    Perform plot updates as soon as they are submitted.
+
+    An update is a function that takes the scan data and the result of
+    the previous update, and returns the new result (e.g. the latest
+    fit parameters).  The result of the final update is available from
+    the result attribute once the renderer has been closed.
+    """
+
+    def __init__(self):
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback_):
+        self.close()
+
+    def submit(self, update, data):
+        """
+        Submit a plot update
+
+        Parameters
+        ----------
+        update
+            function taking the data and the previous result and returning the new result
+        data
+            the data to plot
+        """
+        self.result = update(data, self.result)
+
+    @contextmanager
+    def changing(self):
+        """
+        Context for changing data which has been submitted.  The plain
+        renderer has already drawn it, so there is nothing to wait for.
+        """
+        yield
+
+    def close(self):
+        """
+        Finish any outstanding plotting
+
+        Returns
+        -------
+        The result of the last update
+        """
+        return self.result
+
+
+class BackgroundRenderer(Renderer):
+    """
+    Perform plot updates on a background thread at a limited frame rate.
+
+    Submitting an update never waits for drawing.  Only the most recent
+    update is kept, so updates that arrive faster than they can be
+    drawn are coalesced and the data is always plotted in its latest
+    state.  The last update submitted is always drawn before the
+    renderer closes.
+    """
+
+    def __init__(self, max_fps=5.0):
+        """
+        Parameters
+        ----------
+        max_fps
+            the largest number of plot updates to perform each second
+        """
+        Renderer.__init__(self)
+        self.min_interval = 1.0 / max_fps
+        self._condition = threading.Condition()
+        # Held while the scan changes the data and while it is copied
+        self._lock = threading.Lock()
+        self._pending = None
+        self._closing = False
+        self._thread = threading.Thread(target=self._run,
+                                        name="ScanRenderer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, update, data):
+        with self._condition:
+            self._pending = (update, data)
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closing:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                (update, data), self._pending = self._pending, None
+            started = time.time()
+            try:
+                with self._lock:
+                    data = _snapshot(data)
+                self.result = update(data, self.result)
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                print("Plot update failed because of above error, "
+                      "the scan will continue.")
+            remaining = self.min_interval - (time.time() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    @contextmanager
+    def changing(self):
+        """
+        Context for changing data which has been submitted.  It waits
+        for any copy of the data being taken on the background thread.
+        """
+        with self._lock:
+            yield
+
+    def close(self):
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        return self.result
@@ -0,0 +1,513 @@
+"""
+The module holds the ScanData container used to collect the results
+of a scan as it runs.
+
+Rather than keeping a list of monoids and rebuilding lists of floats
+every time that a plot or a fit needs them, ScanData keeps the
+positions, the raw totals and counts, and the derived values and
+uncertainties of every point in NumPy arrays.  These are only updated
+for the point that has just been measured, so reading them back is
+free.
+
+BinnedData instead folds the samples of a continuous scan into a fixed
+set of position bins, so that its size does not grow with the length
+of the scan.  CycleHistory keeps the values of the most recent cycles
+of a scan that repeats forever.
+"""
+
+import numpy as np
+
+from .monoid import (Exact, Monoid, MonoidList, RunningBounds, accumulate,
+                     point_bounds)
+
+#: The number of points allocated for a new ScanData
+INITIAL_CAPACITY = 64
+
+#: The number of cycles of a repeated scan kept by a CycleHistory
+DEFAULT_CYCLE_HISTORY = 50
+
+
+class ScanData(object):
+    """
+    A columnar store for the points of a scan.
+
+    The store behaves like the ListOfMonoids it replaces, so that fits
+    and plots can call values() and err() on it, but these return views
+    onto cached arrays instead of building new lists.  Arrays grow by
+    doubling, so appending a point is amortised constant time.
+
+    Examples
+    --------
+    >>> data = ScanData()
+    >>> data.append(0.1, Average(4, 2))
+    0
+    >>> data.accumulate(0, Average(2, 1))
+    >>> data.values()
+    array([2.])
+
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._size = 0
+        self._capacity = max(1, capacity)
+        self._channels = None
+        self._monoids = []
+        # Whether each monoid belongs to this store alone, so that it can
+        # be combined in place
+        self._owned = []
+        self._positions = np.empty(self._capacity)
+        self._totals = np.empty(self._capacity)
+        self._counts = np.empty(self._capacity)
+        self._values = None
+        self._errors = None
+        self._bounds = RunningBounds(self._point_bounds)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        return self._monoids[index]
+
+    def __iter__(self):
+        return iter(self._monoids)
+
+    def __repr__(self):
+        return "ScanData({} points)".format(self._size)
+
+    def _allocate(self, value):
+        """Create the value and error columns to suit the first point"""
+        if isinstance(value, MonoidList):
+            self._channels = len(value.floats())
+            shape = (self._capacity, self._channels)
+        else:
+            self._channels = 0
+            shape = (self._capacity,)
+        self._values = np.empty(shape)
+        self._errors = np.empty(shape)
+
+    def _grow(self):
+        """Double the capacity of every column"""
+        self._capacity *= 2
+        for name in ("_positions", "_totals", "_counts", "_values",
+                     "_errors"):
+            old = getattr(self, name)
+            new = np.empty((self._capacity,) + old.shape[1:])
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _refresh(self, index):
+        """Update the cached columns for a single point"""
+        value = self._monoids[index]
+        self._totals[index] = getattr(value, "total", np.nan)
+        self._counts[index] = getattr(value, "count", np.nan)
+        if self._channels:
+            self._values[index] = value.floats()
+            self._errors[index] = value.err()
+        else:
+            self._values[index] = float(value)
+            self._errors[index] = value.err()
+        upper, lower = point_bounds(self._values[index:index + 1],
+                                    self._errors[index:index + 1])
+        self._bounds.update(index, upper[0], lower[0])
+
+    def _point_bounds(self):
+        if self._values is None:
+            return np.empty(0), np.empty(0)
+        return point_bounds(self._values[:self._size],
+                            self._errors[:self._size])
+
+    def append(self, position, value):
+        """
+        Add a new point to the end of the scan
+
+        Parameters
+        ----------
+        position
+            the position of the point
+        value
+            the monoid measured at that position
+
+        Returns
+        -------
+        The index of the new point
+        """
+        if self._values is None:
+            self._allocate(value)
+        if self._size == self._capacity:
+            self._grow()
+        index = self._size
+        self._positions[index] = position
+        self._monoids.append(value)
+        self._owned.append(False)
+        self._size += 1
+        self._refresh(index)
+        return index
+
+    def accumulate(self, index, value):
+        """
+        Combine a new measurement into an existing point
+
+        Parameters
+        ----------
+        index
+            the index of the point
+        value
+            the monoid to add to that point
+        """
+        if not self._owned[index]:
+            # The monoid may still be held by the detector or a snapshot,
+            # so it is copied before the first change
+            monoid = self._monoids[index]
+            if isinstance(monoid, Monoid):
+                self._monoids[index] = monoid.copy()
+            self._owned[index] = True
+        self._monoids[index] = accumulate(self._monoids[index], value)
+        self._refresh(index)
+
+    def snapshot(self):
+        """
+        Copy the points measured so far, so that they can be read while
+        the scan carries on adding points to this store.
+        """
+        copy = ScanData(capacity=self._size)
+        if not self._size:
+            return copy
+        copy._size = self._size  # pylint: disable=protected-access
+        copy._channels = self._channels  # pylint: disable=protected-access
+        copy._monoids = list(self._monoids)  # pylint: disable=protected-access
+        copy._owned = [False] * self._size  # pylint: disable=protected-access
+        copy._bounds = self._bounds.copy(copy._point_bounds)  # pylint: disable=protected-access
+        self._owned = [False] * self._size
+        for name in ("_positions", "_totals", "_counts", "_values",
+                     "_errors"):
+            column = getattr(self, name)
+            if column is not None:
+                setattr(copy, name, column[:self._size].copy())
+        return copy
+
+    def positions(self):
+        """
+        Get the positions of the points
+        """
+        return self._positions[:self._size]
+
+    def totals(self):
+        """
+        Get the raw totals of the points, or NaN where the monoid has none
+        """
+        return self._totals[:self._size]
+
+    def counts(self):
+        """
+        Get the raw counts of the points, or NaN where the monoid has none
+        """
+        return self._counts[:self._size]
+
+    def values(self):
+        """
+        Get the numerical values of the points.  For a MonoidList
+        there is one row for each channel.
+        """
+        if self._values is None:
+            return np.empty(0)
+        return self._values[:self._size].T
+
+    def err(self):
+        """
+        Get the uncertainty values of the points.  For a MonoidList
+        there is one row for each channel.
+        """
+        if self._errors is None:
+            return np.empty(0)
+        return self._errors[:self._size].T
+
+    def max(self):
+        """
+        Find the largest value in the store, including for uncertainty.
+        The bound is kept up to date as points are added, so this does
+        not look at every point.
+        """
+        return self._bounds.max()
+
+    def min(self):
+        """
+        Find the smallest value in the store, including for uncertainty.
+        The bound is kept up to date as points are added, so this does
+        not look at every point.
+        """
+        return self._bounds.min()
+
+
+class BinnedData(object):
+    """
+    Fixed position bins for the samples of a continuous scan.
+
+    Samples taken while moving forwards and backwards are kept in
+    separate bins, so that backlash shows up as two offset curves rather
+    than blurring a single one.  Each bin behaves like a MonoidList of
+    the forward and backward Exact averages, so plots and fits draw the
+    two directions as separate series.  Only bins which have received a
+    sample are reported.
+
+    Examples
+    --------
+    >>> data = BinnedData(0, 10, 5)
+    >>> data.add(0.5, Exact(2), forwards=True)
+    0
+    >>> data.add(0.7, Exact(4), forwards=True)
+    0
+    >>> data.values()
+    array([[ 3.],
+           [nan]])
+
+    """
+
+    #: The rows of the forward and backward bins
+    FORWARDS, BACKWARDS = 0, 1
+
+    def __init__(self, low, high, bins):
+        """
+        Parameters
+        ----------
+        low
+            the lowest position to bin
+        high
+            the highest position to bin
+        bins
+            the number of bins
+        """
+        self.edges = np.linspace(low, high, int(bins) + 1)
+        self.centres = (self.edges[:-1] + self.edges[1:]) / 2
+        self._totals = np.zeros((2, int(bins)))
+        self._counts = np.zeros((2, int(bins)))
+
+    @classmethod
+    def with_width(cls, low, high, width):
+        """
+        Create bins of at most a given width covering a range
+
+        Parameters
+        ----------
+        low
+            the lowest position to bin
+        high
+            the highest position to bin
+        width
+            the largest width of a bin
+        """
+        return cls(low, high, max(1, int(np.ceil((high - low) / width))))
+
+    def _used(self):
+        """The indices of the bins which hold a sample"""
+        return np.flatnonzero(self._counts.sum(axis=0))
+
+    def __len__(self):
+        return len(self._used())
+
+    def __getitem__(self, index):
+        column = self._used()[index]
+        return MonoidList([Exact(self._totals[row, column], self._counts[row, column])
+                           for row in (self.FORWARDS, self.BACKWARDS)])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return "BinnedData({} bins)".format(len(self.centres))
+
+    def add(self, position, value, forwards=True):
+        """
+        Fold a sample into the bin holding its position
+
+        Parameters
+        ----------
+        position
+            the position of the axis when the sample was taken
+        value
+            the Exact or Average monoid measured
+        forwards
+            whether the axis was moving towards higher positions
+
+        Returns
+        -------
+        The index of the bin, or None if the position is outside the bins
+        """
+        column = np.searchsorted(self.edges, position, side="right") - 1
+        if position == self.edges[-1]:
+            column -= 1
+        if column < 0 or column >= len(self.centres):
+            return None
+        row = self.FORWARDS if forwards else self.BACKWARDS
+        self._totals[row, column] += value.total
+        self._counts[row, column] += value.count
+        return int(column)
+
+    def snapshot(self):
+        """
+        Copy the bins, so that they can be read while the scan carries on
+        adding samples to this store.
+        """
+        copy = BinnedData(self.edges[0], self.edges[-1], len(self.centres))
+        copy._totals = self._totals.copy()  # pylint: disable=protected-access
+        copy._counts = self._counts.copy()  # pylint: disable=protected-access
+        return copy
+
+    def positions(self):
+        """
+        Get the centres of the bins which hold a sample
+        """
+        return self.centres[self._used()]
+
+    def counts(self):
+        """
+        Get the counts of the bins which hold a sample, one row for each
+        direction
+        """
+        return self._counts[:, self._used()]
+
+    def values(self):
+        """
+        Get the mean value of the bins which hold a sample, one row for
+        each direction.  Directions without a sample in a bin are NaN.
+        """
+        used = self._used()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self._counts[:, used] > 0,
+                            self._totals[:, used] / self._counts[:, used], np.nan)
+
+    def err(self):
+        """
+        Get the uncertainty values of the bins, which are exact
+        """
+        return np.zeros((2, len(self)))
+
+    def max(self):
+        """
+        Find the largest value in the store, including for uncertainty
+        """
+        return np.nanmax(self.values() + self.err())
+
+    def min(self):
+        """
+        Find the smallest value in the store, including for uncertainty
+        """
+        return np.nanmin(self.values() - self.err())
+
+
+class CycleHistory(object):
+    """
+    A rotating record of the value of every point in each of the most
+    recent cycles of a repeated scan.
+
+    The scan data folds every cycle into the same points, which shows
+    the combined statistics but hides any drift between cycles.  The
+    history keeps the value that each point had within a single cycle,
+    for a fixed number of cycles, so that trends can still be seen
+    while the memory used does not grow with the length of the run.
+
+    Examples
+    --------
+    >>> history = CycleHistory(2, cycles=3)
+    >>> history.record(0, Average(4, 2))
+    >>> history.record(1, Average(6, 2))
+    >>> history.end_cycle()
+    >>> history.values()
+    array([[2., 3.]])
+
+    """
+
+    def __init__(self, points, cycles=DEFAULT_CYCLE_HISTORY):
+        """
+        Parameters
+        ----------
+        points
+            the number of points in each cycle
+        cycles
+            the number of cycles to keep
+        """
+        self.points = points
+        self.capacity = max(1, cycles)
+        self.completed = 0
+        self._values = None
+        self._errors = None
+
+    def __len__(self):
+        return min(self.completed, self.capacity)
+
+    def __repr__(self):
+        return "CycleHistory({} of {} cycles)".format(len(self), self.completed)
+
+    def _allocate(self, value):
+        """Create the rows to suit the first value, with a spare row for
+        the cycle in progress"""
+        shape = (self.capacity + 1, self.points)
+        if isinstance(value, MonoidList):
+            shape += (len(value.floats()),)
+        self._values = np.full(shape, np.nan)
+        self._errors = np.full(shape, np.nan)
+
+    def record(self, point, value):
+        """
+        Record the value of a point within the current cycle
+
+        Parameters
+        ----------
+        point
+            the index of the point within the cycle
+        value
+            the monoid measured in this cycle
+        """
+        if self._values is None:
+            self._allocate(value)
+        row = self.completed % (self.capacity + 1)
+        if isinstance(value, MonoidList):
+            self._values[row, point] = value.floats()
+        else:
+            self._values[row, point] = float(value)
+        self._errors[row, point] = value.err()
+
+    def end_cycle(self):
+        """
+        Finish the current cycle, so that the next one overwrites the
+        oldest cycle kept
+        """
+        self.completed += 1
+        if self._values is not None:
+            row = self.completed % (self.capacity + 1)
+            self._values[row] = np.nan
+            self._errors[row] = np.nan
+
+    def _order(self):
+        """The rows of the completed cycles kept, oldest first"""
+        first = max(0, self.completed - self.capacity)
+        return np.arange(first, self.completed) % (self.capacity + 1)
+
+    def values(self):
+        """
+        Get the value of each point in each completed cycle kept, with one
+        row for each cycle, oldest first
+        """
+        if self._values is None:
+            return np.empty((0, self.points))
+        return self._values[self._order()]
+
+    def err(self):
+        """
+        Get the uncertainty of each point in each completed cycle kept,
+        with one row for each cycle, oldest first
+        """
+        if self._errors is None:
+            return np.empty((0, self.points))
+        return self._errors[self._order()]
+
+    def trend(self):
+        """
+        Get the mean value over the points of each completed cycle kept,
+        oldest first, to show drift from one cycle to the next
+        """
+        values = self.values()
+        if not values.size:
+            return np.empty(0)
+        with np.errstate(invalid="ignore"):
+            return np.nanmean(values.reshape(len(values), -1), axis=1)
@@ -0,0 +1,231 @@
+"""
+The module holds the writer for the log files of scans.
+
+Each scan produces a tab separated text log for people to read.  Next
+to it, a binary sidecar file holds the raw totals and counts of every
+measurement as a fixed size record, so that a scan can be replayed
+exactly and large logs can be memory mapped rather than parsed.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from .monoid import Average, Exact
+
+#: The layout of a record in the binary sidecar
+SIDECAR_DTYPE = np.dtype([("position", "<f8"), ("total", "<f8"),
+                          ("count", "<f8"), ("value", "<f8"),
+                          ("error", "<f8")])
+
+#: Flush the log after this many buffered rows
+FLUSH_ROWS = 100
+
+#: Flush the log when this many seconds have passed since the last flush
+FLUSH_SECONDS = 5.0
+
+
+def sidecar_path(filename):
+    """
+    Get the name of the binary sidecar for a log file
+
+    Parameters
+    ----------
+    filename
+        the name of the text log file
+
+    Returns
+    -------
+    The name of the sidecar file
+    """
+    return os.path.splitext(filename)[0] + ".bin"
+
+
+def load_sidecar(filename):
+    """
+    Load the records of a binary sidecar without reading the whole file
+
+    Parameters
+    ----------
+    filename
+        the name of the sidecar file
+
+    Returns
+    -------
+    A structured array with the fields of SIDECAR_DTYPE
+    """
+    if os.path.getsize(filename) == 0:
+        return np.zeros(0, dtype=SIDECAR_DTYPE)
+    return np.memmap(filename, dtype=SIDECAR_DTYPE, mode="r")
+
+
+def load_points(filename):
+    """
+    Rebuild the points of a scan from its binary sidecar.
+
+    Measurements taken at the same position are combined, so the
+    monoids match the ones accumulated during the original scan.
+
+    Parameters
+    ----------
+    filename
+        the name of the sidecar file
+
+    Returns
+    -------
+    The positions of the points, in the order that they were first
+    measured, and a list with the monoid for each point
+    """
+    records = load_sidecar(filename)
+    positions, first, inverse = np.unique(
+        records["position"], return_index=True, return_inverse=True)
+    raw = np.isfinite(records["total"]) & np.isfinite(records["count"])
+    # Measurements without raw totals can only be approximated from their
+    # value and uncertainty, as in the text log
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals = np.where(raw, records["total"],
+                          (records["value"] / records["error"])**2)
+        counts = np.where(raw, records["count"],
+                          records["value"] / records["error"]**2)
+    size = len(positions)
+    totals = np.bincount(inverse, weights=totals, minlength=size)
+    counts = np.bincount(inverse, weights=counts, minlength=size)
+    exact = np.bincount(inverse, weights=records["error"] != 0,
+                        minlength=size) == 0
+
+    order = np.argsort(first)
+    ys = [Exact(totals[i], counts[i]) if exact[i] else
+          Average(totals[i], counts[i]) for i in order]
+    return positions[order], ys
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ScanLog(object):
+    """
+    A buffered writer for the log file of a scan.
+
+    Text written to the log and measurements recorded in the sidecar
+    are held in memory and written out together once enough rows have
+    built up, once enough time has passed, or when the log is closed.
+    The log is always flushed on leaving the context, including when
+    a scan is interrupted.
+
+    Examples
+    --------
+    >>> with ScanLog("scan.dat") as log:
+    ...     log.write("Theta (deg)\\tIntensity\\tUncertainty\\n")
+    ...     log.write("0.1\\t2.0\\t1.0\\n")
+    ...     log.record(0.1, Average(4, 2))
+
+    """
+
+    def __init__(self, filename, flush_rows=FLUSH_ROWS,
+                 flush_seconds=FLUSH_SECONDS, sidecar=True, append=False):
+        # pylint: disable=too-many-arguments
+        """
+        Parameters
+        ----------
+        filename
+            the name of the text log file
+        flush_rows
+            the number of buffered text rows that triggers a flush
+        flush_seconds
+            the time in seconds after the last flush that triggers a flush
+        sidecar
+            whether to write the binary sidecar alongside the text log
+        append
+            whether to add to the end of existing files, e.g. when a scan
+            is resumed, rather than replacing them
+        """
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.sidecar = sidecar
+        self.append = append
+        self._text = []
+        self._records = []
+        self._last_flush = time.time()
+        self._logfile = None
+        self._sidecar = None
+
+    def __enter__(self):
+        self._logfile = open(self.filename, "a" if self.append else "w")
+        if self.sidecar:
+            self._sidecar = open(sidecar_path(self.filename),
+                                 "ab" if self.append else "wb")
+        self._last_flush = time.time()
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def write(self, text):
+        """
+        Add text to the log file
+
+        Parameters
+        ----------
+        text
+            the text to write
+        """
+        self._text.append(text)
+        self._flush_if_due()
+
+    def record(self, position, measurement):
+        """
+        Add a raw measurement to the binary sidecar
+
+        Parameters
+        ----------
+        position
+            the position of the point the measurement belongs to
+        measurement
+            the monoid that was measured
+        """
+        if self._sidecar is None:
+            return
+        self._records.append((
+            position,
+            _as_float(getattr(measurement, "total", np.nan)),
+            _as_float(getattr(measurement, "count", np.nan)),
+            _as_float(measurement),
+            _as_float(measurement.err())))
+        self._flush_if_due()
+
+    def _flush_if_due(self):
+        if len(self._text) >= self.flush_rows or \
+                len(self._records) >= self.flush_rows or \
+                time.time() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Write any buffered text and measurements to disk
+        """
+        if self._logfile is not None and self._text:
+            self._logfile.write("".join(self._text))
+            self._logfile.flush()
+        self._text = []
+        if self._sidecar is not None and self._records:
+            np.array(self._records, dtype=SIDECAR_DTYPE).tofile(self._sidecar)
+            self._sidecar.flush()
+        self._records = []
+        self._last_flush = time.time()
+
+    def close(self):
+        """
+        Flush the log and close the files
+        """
+        self.flush()
+        for handle in (self._logfile, self._sidecar):
+            if handle is not None:
+                handle.close()
+        self._logfile = None
+        self._sidecar = None
@@ -10,6 +10,7 @@ treated as private.
 """
 from __future__ import absolute_import, print_function
 
+import itertools
 import pdb
 from typing import TYPE_CHECKING
 
@@ -29,8 +30,17 @@ import matplotlib.pyplot as plt
 if TYPE_CHECKING:
     from .defaults import Defaults
 from .monoid import ListOfMonoids, Monoid, Average, Exact
-from .detector import DetectorManager
+from .scan_data import ScanData, BinnedData, CycleHistory, DEFAULT_CYCLE_HISTORY
+from .scan_log import ScanLog
+from .checkpoint import Checkpoint
+from .plan import ScanPlan
+from .planner import serpentine, travel_order, current_position
+from .monitor import SampleBuffer, MIN_SAMPLE_INTERVAL, watch
+from .timing import PointTimer, ScanTimeModel, timed, travel_times
+from .motion import wait_for_axes
+from .detector import DetectorManager, on_next_pause, cancel_pause_callback
 from .fit import Fit, ExactFit
+from .util import PositionIndex, DEFAULT_POSITION_TOLERANCE
 from pathlib import Path
 import os
 
@@ -66,6 +76,59 @@ def _plot_range(array):
             high + 0.05 * diff)
 
 
+def _issue_setpoints(setpoints, previous=None):
+    """Send every axis to its target for a point, skipping axes which are
+    already at the target they had for the previous point.  Every move is
+    started before any of them is waited for, so the axes move together.
+
+    Returns the motions which were sent a new target."""
+    previous = previous or []
+    moved = []
+    with timed("issue"):
+        for motion, target in setpoints:
+            if not any(motion is old_motion and target == old_target
+                       for old_motion, old_target in previous):
+                motion(target)
+                moved.append(motion)
+    return moved
+
+
+def _read_back(setpoints):
+    """Read the position of every axis of a point."""
+    dic = OrderedDict()
+    for motion, _ in setpoints:
+        dic[(motion.title, motion.unit)] = motion()
+    return dic
+
+
+def _move_through(points, skip_unchanged=True):
+    """Move to each point in turn, yielding the positions read back once
+    every axis has arrived.  Unless skip_unchanged is False, axes whose
+    target is the same as at the last point are left alone."""
+    previous = None
+    for point in points:
+        wait_for_axes(_issue_setpoints(point, previous if skip_unchanged else None))
+        yield _read_back(point)
+        previous = point
+
+
+def _finish_action(action, plot_functions, result):
+    """Wait for an action which works in the background, such as a live
+    fit on a worker thread, and get its final result.  Other actions
+    leave the result of the last plot update unchanged."""
+    finish = getattr(action, "finish", None)
+    if finish is None:
+        return result
+    return finish(plot_functions)
+
+
+def _cancel_action(action):
+    """Stop the background work of an action when a scan is interrupted"""
+    cancel = getattr(action, "cancel", None)
+    if cancel is not None:
+        cancel()
+
+
 def estimate(seconds=None, minutes=None, hours=None,
              uamps=None, frames=None, **_):
     """Estimate takes a measurement specification and predicts how long
@@ -102,6 +165,13 @@ class Scan(object):
 
     defaults: 'Defaults'
     defaults = None
+    _plan_cache = None
+    # The progress of the last run of the scan, if it was interrupted
+    checkpoint = None
+    # The checkpoint that the scan carries on from, if it is resuming
+    resume = None
+    # The timing records of each point of the last run of the scan
+    timing = None
 
     def _normalise_detector(self, detector):
         if not detector:
@@ -156,7 +226,102 @@ class Scan(object):
         """
         return self + self.reverse
 
-    def plot(self, detector=None, save=None, action=None, **kwargs):
+    @property
+    def planned(self):
+        """
+        Run the same points as the scan, but in the order that keeps
+        the time spent moving the motors to a minimum.
+        """
+        return PlannedScan(self)
+
+    def position_tolerance(self):
+        """The distance within which two measured positions are treated
+        as the same point of the scan."""
+        return DEFAULT_POSITION_TOLERANCE
+
+    def positions(self):
+        """The positions that a single axis scan will visit, in order."""
+        raise TypeError("{} does not visit a fixed set of positions".format(
+            self.__class__.__name__))
+
+    def setpoints(self):
+        """Iterate over the points of the scan without moving anything.
+        Each point is a list of (motion, target) pairs, one for each
+        axis of the scan."""
+        raise TypeError("{} does not visit a fixed set of points".format(
+            self.__class__.__name__))
+
+    def _plan(self):
+        """Flatten the scan into a ScanPlan without checking the limits of
+        the motions.  Composite scans combine the plans of their parts."""
+        return ScanPlan.from_points(list(self.setpoints()))
+
+    def _cached_plan(self):
+        """The plan of the scan, made on first use, or None if the scan
+        does not visit a fixed set of points or has targets which are not
+        numbers."""
+        if self._plan_cache is None:
+            try:
+                self._plan_cache = self._plan()
+            except (TypeError, ValueError):
+                return None
+        return self._plan_cache
+
+    def compile(self):
+        """
+        Flatten the scan into a ScanPlan holding the target of every axis
+        at every point, so that the points and the range of the scan can
+        be read without walking through the scans that it is built from.
+
+        The targets of each axis are checked against the limits of its
+        motion all at once, so a scan which would leave the limits fails
+        before anything is moved.
+
+        Raises
+        ------
+        TypeError
+            if the scan does not visit a fixed set of points
+        ValueError
+            if a target is not a number
+        RuntimeError
+            if a target is outside the limits of its motion
+        """
+        return self._plan().validate()
+
+    def pipelined(self):
+        """Iterate over the scan like __iter__, but start moving to the
+        next point as soon as the detector pauses the DAE, rather than
+        after the measurement has been read out and plotted.
+
+        Detectors that do not pause through the standard counting
+        routine simply move once the measurement is complete, as
+        in a normal scan.
+        """
+        points = iter(self.setpoints())
+        current = next(points, None)
+        moving = _issue_setpoints(current) if current is not None else []
+        while current is not None:
+            wait_for_axes(moving)
+            upcoming = next(points, None)
+            started = []
+
+            def start_next_move(upcoming=upcoming, current=current,
+                                started=started):
+                """Move to the next point while the detector reads out"""
+                started.append(_issue_setpoints(upcoming, current))
+
+            if upcoming is not None:
+                on_next_pause(start_next_move)
+            try:
+                yield _read_back(current)
+            finally:
+                cancel_pause_callback(start_next_move)
+            if upcoming is not None and not started:
+                started.append(_issue_setpoints(upcoming, current))
+            moving = started[0] if started else []
+            current = upcoming
+
+    def plot(self, detector=None, save=None, action=None, pipeline=False, **kwargs):
         """
         Run over the scan and perform a simple measurement at each position.
         The measurement parameter can be used to set what type of measurement
@@ -168,6 +333,8 @@ class Scan(object):
         detector: detector or detector manager to use to take the measurement
         save: name of file to save plot to; None don't save
         action: extra action to take every measurement, e.g. fit the points and plot then
+        pipeline: if True, start the move to the next point as soon as the detector pauses
+            rather than after the point has been read out and plotted
         kwargs: extra kw args
 
         Returns
@@ -182,12 +349,19 @@ class Scan(object):
         fig, axis = self.defaults.get_fig()
         plot_functions.set_figure_and_axis(fig, axis)
 
-        xs = []
-        ys = ListOfMonoids()
+        data = ScanData()
+        fold = self._point_folder()
+        resume = self.resume
+        if resume is not None:
+            for position, value in zip(*resume.points()):
+                fold(data, position, value)
 
         acc = None
         action_remainder = None
-        log_filename = self.defaults.log_file(self.log_file_info())
+        if resume is not None:
+            log_filename = resume.log_file
+        else:
+            log_filename = self.defaults.log_file(self.log_file_info())
 
         path = Path(log_filename)
         log_path = path.parent
@@ -196,35 +370,59 @@ class Scan(object):
 
         if path_exists:
             print("Writing data to: {}".format(log_path))
-            with open(log_filename, "w") as logfile, \
-                    detector(self, save=save, **kwargs) as detect:
-                for x in self:
-                    # FIXME: Handle multidimensional plots
-                    ((label, unit), position) = next(iter(x.items()))
-
-                    # perform measurement
-                    acc, value = detect(acc, **kwargs)
-
-                    if isinstance(value, float):
-                        value = Average(value)
-                    if not xs:
-                        logfile.write(
-                            "{} ({})\t{}\tUncertainty\n".format(
-                                label, unit, detector.unit))
-                    if position in xs:
-                        ys[xs.index(position)] += value
-                    else:
-                        xs.append(position)
-                        ys.append(value)
-                    logfile.write("{}\t{}\t{}\n".format(xs[-1], str(ys[-1]),
-                                                        str(ys[-1].err())))
-
-                    plot_functions.setup_plot(self.min(), self.max(), label, unit, y_unit=detector.unit)
-                    plot_functions.plot_data_with_errors(xs, ys)
-                    if action:
-                        action_remainder = action(xs, ys, plot_functions, action_remainder)
-                    plot_functions.draw()
-
+            update = None
+            checkpoint = resume or self._new_checkpoint(log_filename, dict(kwargs, save=save))
+            self.checkpoint = None
+            timer = PointTimer()
+            completed = False
+            try:
+                with ScanLog(log_filename, append=resume is not None) as logfile, timer, \
+                        detector(self, save=save, **kwargs) as detect, \
+                        self.defaults.create_renderer() as renderer:
+                    try:
+                        for x in timer.points(self._points(data, pipeline)):
+                            # FIXME: Handle multidimensional plots
+                            ((label, unit), position) = next(iter(x.items()))
+
+                            # perform measurement
+                            with timer.measuring():
+                                acc, value = detect(acc, **kwargs)
+
+                            with timed("plot"):
+                                if isinstance(value, float):
+                                    value = Average(value)
+                                if not data:
+                                    logfile.write(
+                                        "{} ({})\t{}\tUncertainty\n".format(
+                                            label, unit, detector.unit))
+                                with renderer.changing():
+                                    point = fold(data, position, value)
+                                logfile.write("{}\t{}\t{}\n".format(data.positions()[point], str(data[point]),
+                                                                    str(data[point].err())))
+                                logfile.record(data.positions()[point], value)
+                                if checkpoint is not None:
+                                    checkpoint.advance(logfile)
+
+                                if update is None:
+                                    update = self._plot_update(plot_functions, action, label, unit, detector.unit)
+                                renderer.submit(update, data)
+                    except BaseException:
+                        _cancel_action(action)
+                        if checkpoint is not None:
+                            # Keep the progress so that resume_scan can carry on
+                            checkpoint.save(logfile)
+                            self.checkpoint = checkpoint
+                            print("Scan stopped after {} of {} points; call resume_scan() to carry on".format(
+                                checkpoint.completed, len(checkpoint.plan)))
+                        raise
+                completed = True
+            finally:
+                self._report_timing(timer, log_filename, append=resume is not None,
+                                    completed=completed)
+            if checkpoint is not None:
+                checkpoint.remove()
+
+            action_remainder = _finish_action(action, plot_functions, renderer.result)
             plot_functions.save(save)
 
         else:
@@ -237,6 +435,77 @@ class Scan(object):
 
         return action_remainder
 
+    def _report_timing(self, timer, log_filename, append=False, model=True,
+                       completed=True):
+        """Keep the timing records of the points measured, write them to
+        the text timing log and print a summary, whether the scan has
+        completed or was stopped.  Unless model is False, the records are
+        also written to the timing file, from which the time of later
+        scans is predicted.  The log itself is left holding only data, so
+        that a resumed scan can carry on adding to it."""
+        if model:
+            plan = self._cached_plan()
+            if plan is not None:
+                timer.set_travel(travel_times(plan))
+        self.timing = timer.records
+        if self.defaults is not None:
+            self.defaults.last_timing = self.timing
+        if len(timer):
+            timer.save_table(log_filename, append=append)
+            if model:
+                timer.save(log_filename, append=append)
+        if not completed:
+            print("Scan stopped; timing of the points measured so far")
+        print(timer.summary())
+
+    def _new_checkpoint(self, log_filename, kwargs):
+        """Create the checkpoint which records the progress of the scan,
+        or None if the scan cannot be resumed."""
+        plan = self._cached_plan()
+        if plan is None:
+            return None
+        return Checkpoint(log_filename, plan, kwargs,
+                          position_tolerance=self.position_tolerance())
+
+    def _point_folder(self):
+        """Create the function which adds each measurement to the data,
+        combining measurements taken at the same position.  It returns
+        the index of the point that the measurement went into."""
+        positions = PositionIndex(self.position_tolerance())
+
+        def fold(data, position, value):
+            """Add a measurement to the point at its position"""
+            point = positions.index(position)
+            if point is None:
+                positions.add(position)
+                return data.append(position, value)
+            data.accumulate(point, value)
+            return point
+        return fold
+
+    def _points(self, data, pipeline=False):
+        # pylint: disable=unused-argument
+        """The points for plot to measure.  The data measured so far is
+        passed in, so that a scan can choose its next point from it."""
+        return self.pipelined() if pipeline else iter(self)
+
+    def _plot_update(self, plot_functions, action, label, unit, y_unit):
+        # pylint: disable=too-many-arguments
+        """Create the update that brings the plot up to date with the
+        data measured so far."""
+        low, high = self.min(), self.max()
+
+        def update(data, action_remainder):
+            """Plot the data and run the action on it"""
+            plot_functions.setup_plot(low, high, label, unit, y_unit=y_unit)
+            plot_functions.plot_data_with_errors(data.positions(), data)
+            if action:
+                with timed("fit"):
+                    action_remainder = action(data.positions(), data, plot_functions, action_remainder)
+            plot_functions.draw()
+            return action_remainder
+        return update
+
     def measure(self, title, measure=None, **kwargs):  # pragma: no cover
         """Perform a full measurement at each position indicated by the scan.
         The title parameter gives the run's title and allows for
@@ -264,7 +533,7 @@ class Scan(object):
             raise TypeError("Cannot fit with {}. Perhaps you meant to call it"
                             " as a function?".format(fit))
 
-        result = self.plot(action=fit.fit_plot_action(), **kwargs)
+        result = self.plot(action=fit.fit_plot_action(background=True), **kwargs)
 
         if result is None:
             raise RuntimeError(
@@ -293,8 +562,22 @@ class Scan(object):
         keyword, if set to true, prevents the printing of the expected
         time of completion.
 
+        The time to move between the points, in the order that the scan
+        visits them, is worked out from the velocity of each axis.  The
+        overheads of each point are taken from the timing records of
+        recent scans (see Defaults.timing_records).
+
         """
-        total = len(self) * (pad + estimate(**kwargs))
+        try:
+            points = self.setpoints()
+        except TypeError:
+            # Scans without a fixed set of points, e.g. continuous scans
+            points = None
+        if points is None:
+            total = len(self) * (pad + estimate(**kwargs))
+        else:
+            model = ScanTimeModel(self.defaults.timing_records())
+            total = model.scan_time(points, pad=pad, **kwargs)
         # We can't test the time printing code since the result would
         # always change.
         if time:  # pragma: no cover
@@ -348,9 +631,34 @@ class SimpleScan(Scan):
     def max(self):
         return self.values.max()
 
+    def position_tolerance(self):
+        """The deadband of the motor, limited to half of the smallest step
+        so that neighbouring points of the scan are never merged."""
+        try:
+            tolerance = float(self.action.tolerance)
+        except (AttributeError, TypeError, ValueError):
+            tolerance = DEFAULT_POSITION_TOLERANCE
+        if not np.isfinite(tolerance) or tolerance <= 0:
+            tolerance = DEFAULT_POSITION_TOLERANCE
+        steps = np.abs(np.diff(np.unique(np.asarray(self.values, dtype=float))))
+        if steps.size:
+            tolerance = min(tolerance, 0.5 * steps.min())
+        return tolerance
+
+    def positions(self):
+        return np.asarray(self.values, dtype=float)
+
+    def setpoints(self):
+        for i in self.values:
+            yield [(self.action, i)]
+
+    def _plan(self):
+        return ScanPlan.single(self.action, self.values)
+
     def __iter__(self):
         for i in self.values:
-            self.action(i)
+            with timed("issue"):
+                self.action(i)
             g.waitfor_move()
             dic = OrderedDict()
             dic[(self.name, self.action.unit)] = self.action()
@@ -359,6 +667,19 @@ class SimpleScan(Scan):
     def __len__(self):
         return len(self.values)
 
+    def adaptive(self, fit, target, max_points=None, min_step=None):
+        """
+        Use this scan as a coarse grid for an AdaptiveScan
+
+        Parameters
+        ----------
+        fit: the fit that finds the centre
+        target: the uncertainty on the centre at which to stop
+        max_points: the most points to measure, by default twice the coarse grid
+        min_step: the closest that new points are placed, by default an eighth of the coarse step
+        """
+        return AdaptiveScan(self, fit, target, max_points, min_step)
+
     def __repr__(self):
         return "SimpleScan({}, {}, {})".format(self.action.title.upper(),
                                                repr(self.values),
@@ -432,9 +753,24 @@ class ContinuousScan(Scan):
         return ForeverContinuousScan(self.motion, self.moves, self.defaults)
 
     def plot(self, detector=None, save=None, action=None,
-             update_freq=1.0, **kwargs):
-        """Run over a continuous range, plotting every update_freq seconds"""
-        # pylint: disable=arguments-differ
+             update_freq=1.0, events=False, bins=None, bin_width=None,
+             **kwargs):
+        """Run over a continuous range, plotting every update_freq seconds
+
+        If events is set, the position of the axis is followed through a
+        monitor and held in a timestamped buffer, rather than polled.
+        Each detector value is then placed at the position the axis had
+        when it was measured.  Detectors that can be monitored too have
+        every update kept, up to the rate the IOC publishes them, while
+        the plot is still only refreshed every update_freq seconds.
+
+        If either bins (a number of bins) or bin_width is given, samples
+        are averaged into fixed position bins between the ends of the
+        scan as they arrive, with separate bins for each direction of
+        travel.  Memory use and drawing time then depend on the number
+        of bins rather than on how long the scan runs.
+        """
+        # pylint: disable=arguments-differ, too-many-locals, too-many-arguments
         warnings.simplefilter("ignore", UserWarning)
 
         detector = self._normalise_detector(detector)
@@ -442,60 +778,147 @@ class ContinuousScan(Scan):
         plot_functions = self.defaults.plot_functions
         plot_functions.set_figure_and_axis(fig, axis)
 
-        xs = []
-        ys = ListOfMonoids()
+        if bins is not None:
+            data = BinnedData(self.min(), self.max(), bins)
+        elif bin_width is not None:
+            data = BinnedData.with_width(self.min(), self.max(), bin_width)
+        else:
+            data = ScanData()
 
         acc = None
-        action_remainder = None  # store the result of an action on the points
-
-        with open(self.defaults.log_file(self.log_file_info()), "w") as logfile, \
-                detector(self, save=save, **kwargs) as detect:
-
-            for move in self:
-                # Set initial motor position to correct value.
-                if abs(self.motion() - move.start) > self.motion.tolerance:
-                    self.motion(move.start)
-                    while abs(self.motion() - move.start) > \
-                            self.motion.tolerance:
-                        time.sleep(update_freq)
-
-                with temporarily_change_motor_speed(self.motion,
-                                                    move.speed):
-
-                    self.motion(move.stop)
-
-                    while abs(self.motion() - move.stop) > \
-                            self.motion.tolerance:
-
-                        position = self.motion()
+        # Each batch of samples is timed as a point, as is the move to the
+        # start of each sweep
+        timer = PointTimer()
+
+        def update(data, action_remainder):
+            """Plot the data and run the action on it"""
+            plot_functions.setup_plot(self.min(), self.max())
+            plot_functions.plot_data_with_errors(data.positions(), data)
+
+            if action:
+                with timed("fit"):
+                    action_remainder = action(data.positions(), data, axis, action_remainder)
+            plot_functions.draw()
+            return action_remainder
+
+        def polled(detect, stop, tolerance):
+            """Read the position and the detector every update_freq seconds"""
+            nonlocal acc
+            while abs(self.motion() - stop) > tolerance:
+                timer.start_point()
+                position = self.motion()
+                with timer.measuring():
+                    acc, value = detect(acc, **kwargs)
+                yield [(position, value)]
+
+                # If we plot in a tight loop, matplotlib can't keep
+                # up. Taking data at 5Hz during the move seems the
+                # right balance of "continuous" and "pragmatic"
+                #
+                # Note: a galil's MAX update frequency is 40ms so
+                # there is no benefit in making this number smaller
+                # than 0.04
+                time.sleep(update_freq)
+
+        def monitored(detect, stop, tolerance, positions, values):
+            """Match detector values to the monitored position"""
+            nonlocal acc
+            while True:
+                latest = positions.latest()
+                if latest is not None and abs(latest - stop) <= tolerance:
+                    return
+                timer.start_point()
+                if values is None:
+                    started = time.time()
+                    with timer.measuring():
                         acc, value = detect(acc, **kwargs)
-                        value = Exact(value)
-
-                        xs.append(position)
-                        ys.append(value)
-
-                        logfile.write("{}\t{}\n".format(xs[-1],
-                                                        str(ys[-1])))
-
-                        plot_functions.setup_plot(self.min(), self.max())
-                        plot_functions.plot_data_with_errors(xs, ys)
-
-                        if action:
-                            action_remainder = action(xs, ys, axis, action_remainder)
-                        plot_functions.draw()
-
-                        # If we plot in a tight loop, matplotlib can't keep
-                        # up. Taking data at 5Hz during the move seems the
-                        # right balance of "continuous" and "pragmatic"
-                        #
-                        # Note: a galil's MAX update frequency is 40ms so
-                        # there is no benefit in making this number smaller
-                        # than 0.04
-                        time.sleep(update_freq)
+                    times, samples = [(started + time.time()) / 2], [value]
+                    # Do not read a fast detector faster than the axis updates
+                    time.sleep(max(0.0, MIN_SAMPLE_INTERVAL - (time.time() - started)))
+                else:
+                    # The buffer keeps every value while we wait
+                    time.sleep(update_freq)
+                    times, samples = values.drain()
+                yield [(positions.at(t), value) for t, value in zip(times, samples)]
 
+        log_filename = self.defaults.log_file(self.log_file_info())
+        completed = False
+        try:
+            with ScanLog(log_filename) as logfile, timer, \
+                    detector(self, save=save, **kwargs) as detect, \
+                    self.defaults.create_renderer() as renderer:
+
+                positions = values = None
+                subscriptions = []
+                if events:
+                    positions = SampleBuffer()
+                    subscriptions.append(watch(self.motion, positions))
+                    if subscriptions[0] is None:
+                        print("Cannot monitor {}, polling it instead".format(self.motion.title))
+                        positions = None
+                    else:
+                        values = SampleBuffer()
+                        subscriptions.append(watch(detector, values))
+                        if subscriptions[1] is None:
+                            values = None
+
+                try:
+                    for move in self:
+                        # Read the deadband once, rather than for every sample
+                        tolerance = self.motion.tolerance
+
+                        # Set initial motor position to correct value.
+                        timer.start_point()
+                        with timed("move"):
+                            if abs(self.motion() - move.start) > tolerance:
+                                with timed("issue"):
+                                    self.motion(move.start)
+                                while abs(self.motion() - move.start) > tolerance:
+                                    time.sleep(update_freq)
+
+                        with temporarily_change_motor_speed(self.motion,
+                                                            move.speed):
+
+                            self.motion(move.stop)
+
+                            if positions is None:
+                                batches = polled(detect, move.stop, tolerance)
+                            else:
+                                batches = monitored(detect, move.stop, tolerance,
+                                                    positions, values)
+                            for batch in batches:
+                                with timed("plot"):
+                                    for position, value in batch:
+                                        value = Exact(value)
+                                        with renderer.changing():
+                                            if isinstance(data, BinnedData):
+                                                data.add(position, value,
+                                                         forwards=move.stop > move.start)
+                                            else:
+                                                data.append(position, value)
+
+                                        logfile.write("{}\t{}\n".format(position,
+                                                                        str(value)))
+                                        logfile.record(position, value)
+
+                                    if batch:
+                                        renderer.submit(update, data)
+                except BaseException:
+                    _cancel_action(action)
+                    raise
+                finally:
+                    for unsubscribe in subscriptions:
+                        if unsubscribe is not None:
+                            unsubscribe()
+            completed = True
+        finally:
+            self._report_timing(timer, log_filename, model=False,
+                                completed=completed)
+
+        result = _finish_action(action, plot_functions, renderer.result)
         plot_functions.save(save)
 
-        return action_remainder
+        return result
 
     def map(self, func):
         # The mapping function translates positions. What do we do about speed?
@@ -562,12 +985,20 @@ class SumScan(Scan):
         self.defaults = self.first.defaults
 
     def __iter__(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            for i in _move_through(plan.validate(), skip_unchanged=False):
+                yield i
+            return
         for i in self.first:
             yield i
         for i in self.second:
             yield i
 
     def __len__(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return len(plan)
         return len(self.first) + len(self.second)
 
     def __repr__(self):
@@ -587,30 +1018,78 @@ class SumScan(Scan):
         return SumScan(self.second.reverse, self.first.reverse)
 
     def min(self):
+        plan = self._cached_plan()
+        if plan is not None and len(plan.motions) == 1:
+            return plan.min()
         return min(self.first.min(), self.second.min())
 
     def max(self):
+        plan = self._cached_plan()
+        if plan is not None and len(plan.motions) == 1:
+            return plan.max()
         return max(self.first.max(), self.second.max())
 
+    def position_tolerance(self):
+        return min(self.first.position_tolerance(),
+                   self.second.position_tolerance())
+
+    def positions(self):
+        return np.hstack([self.first.positions(), self.second.positions()])
+
+    def setpoints(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return iter(plan)
+        return itertools.chain(self.first.setpoints(), self.second.setpoints())
+
+    def _plan(self):
+        return self.first._plan().concatenate(self.second._plan())  # pylint: disable=protected-access
+
 
 class ProductScan(Scan):
     """ProductScan performs every possible combination of the positions of
     its two constituent scans."""
 
-    def __init__(self, outer, inner):
+    def __init__(self, outer, inner, serpentine=False):
         self.outer = outer
         self.inner = inner
+        self.serpentine = serpentine
         self.defaults = self.outer.defaults
 
     def __iter__(self):
-        for i in self.outer:
-            for j in self.inner:
+        plan = self._cached_plan()
+        if plan is not None:
+            # The outer axes only move at the start of each row
+            for i in _move_through(plan.validate()):
+                yield i
+            return
+        for row, i in enumerate(self.outer):
+            inner = self.inner.reverse if self.serpentine and row % 2 else self.inner
+            for j in inner:
                 yield merge_dicts(i, j)
 
+    def setpoints(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return iter(plan)
+        if self.serpentine:
+            return serpentine(self.outer.setpoints(), self.inner.setpoints())
+        return (i + j for i in self.outer.setpoints()
+                for j in self.inner.setpoints())
+
+    def _plan(self):
+        # pylint: disable=protected-access
+        return self.outer._plan().product(self.inner._plan(), self.serpentine)
+
     def __len__(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return len(plan)
         return len(self.outer) * len(self.inner)
 
     def __repr__(self):
+        if self.serpentine:
+            return "({} * {}).planned".format(self.outer, self.inner)
         return "{} * {}".format(self.outer, self.inner)
 
     def map(self, func):
@@ -619,24 +1098,46 @@ class ProductScan(Scan):
 
         """
         return ProductScan(self.outer.map(func),
-                           self.inner.map(func))
+                           self.inner.map(func), self.serpentine)
 
     @property
     def reverse(self):
         """Creates a new scan that runs in the opposite direction"""
-        return ProductScan(self.outer.reverse, self.inner.reverse)
+        return ProductScan(self.outer.reverse, self.inner.reverse,
+                           self.serpentine)
+
+    @property
+    def planned(self):
+        """
+        Run the inner scan forwards and backwards on alternate steps of
+        the outer scan, rather than returning it to its start each time.
+        """
+        return ProductScan(self.outer, self.inner, serpentine=True)
 
     def min(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return plan.min()
         return (self.outer.min(), self.inner.min())
 
     def max(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return plan.max()
         return (self.outer.max(), self.inner.max())
 
     def plot(self, detector=None, save=None,
-             action=None, **kwargs):
-        # pylint: disable=too-many-locals
+             action=None, redraw_every=1, pipeline=False, **kwargs):
+        # pylint: disable=too-many-locals, arguments-differ
         """An overloading of Scan.plot to handle multidimensional
-        scans."""
+        scans.
+
+        The grid of cells is allocated up front from the positions of
+        the outer and inner scans and a single colour mesh is updated
+        in place as points arrive.  The redraw_every parameter can be
+        used to only redraw the mesh every N points on large grids.
+        The pipeline parameter behaves as for Scan.plot.
+        """
         warnings.simplefilter("ignore", UserWarning)
 
         if g and g.get_runstate() != "SETUP":
@@ -647,76 +1148,160 @@ class ProductScan(Scan):
 
         fig, axis = self.defaults.get_fig()
 
-        xs = []
-        ys = []
-
-        values = []
-        for _ in range(len(self.outer)):
-            values.append([np.nan] * len(self.inner))
-
-        acc = action_remainder = None
-        with open(self.defaults.log_file(self.log_file_info()), "w") as logfile, \
-                detector(self, save) as detect:
-            for x in self:
-                acc, value = detect(acc, **kwargs)
-
-                keys = list(x.keys())
-                keys[1] = keys[1]
-                keys[0] = keys[0]
-                y = x[keys[0]]
-                x = x[keys[1]]
-                if isinstance(value, float):
-                    value = Average(value)
-                if x not in xs:
-                    xs.append(x)
-                if y not in ys:
-                    ys.append(y)
-                if isinstance(values[ys.index(y)][xs.index(x)], Monoid):
-                    values[ys.index(y)][xs.index(x)] += value
-                else:
-                    values[ys.index(y)][xs.index(x)] = value
-                logfile.write(
-                    "{}\t{}\n".format(xs[-1], str(values[-1])))
-                axis.clear()
-                axis.set_xlabel("{} ({})".format(keys[1][0], keys[1][1]))
-                axis.set_ylabel("{} ({})".format(keys[0][0], keys[0][1]))
-                miny, minx = self.min()
-                maxy, maxx = self.max()
-                rng = [1.05 * minx - 0.05 * maxx,
-                       1.05 * maxx - 0.05 * minx]
-                axis.set_xlim(rng[0], rng[1])
-                rng = [1.05 * miny - 0.05 * maxy,
-                       1.05 * maxy - 0.05 * miny]
-                axis.set_ylim(rng[0], rng[1])
-                axis.pcolor(
-                    self._estimate_locations(xs, len(self.inner),
-                                             minx, maxx),
-                    self._estimate_locations(ys, len(self.outer),
-                                             miny, maxy),
-                    np.array([[float(z) for z in row]
-                              for row in values]))
-                if action:
-                    action_remainder = action(xs, values,
-                                              axis)
-                plt.draw()
+        rows, outer_axes = _GridAxis.of(self.outer)
+        columns, _ = _GridAxis.of(self.inner)
+        cells = np.empty((len(rows), len(columns)), dtype=object)
+        grid = np.full((len(rows), len(columns)), np.nan)
+        update = None
+
+        acc = None
+        log_filename = self.defaults.log_file(self.log_file_info())
+        timer = PointTimer()
+        completed = False
+        try:
+            # The sidecar holds one position per record, so only the text log
+            # is kept for two dimensional scans
+            with ScanLog(log_filename, sidecar=False) as logfile, timer, \
+                    detector(self, save=save, **kwargs) as detect, \
+                    self.defaults.create_renderer() as renderer:
+                count = 0
+                points = self.pipelined() if pipeline else self
+                for count, x in enumerate(timer.points(points), 1):
+                    with timer.measuring():
+                        acc, value = detect(acc, **kwargs)
+
+                    with timed("plot"):
+                        # The cells are indexed by the first axis of each sub-scan
+                        keys = list(x.keys())
+                        keys = [keys[0], keys[outer_axes]]
+                        if isinstance(value, float):
+                            value = Average(value)
+                        row = rows.locate(x[keys[0]])
+                        column = columns.locate(x[keys[1]])
+                        with renderer.changing():
+                            if isinstance(cells[row, column], Monoid):
+                                cells[row, column] = cells[row, column].add_in_place(value)
+                            else:
+                                # Copied, as the cell is then combined in place
+                                cells[row, column] = value.copy() if isinstance(value, Monoid) else value
+                            grid[row, column] = float(cells[row, column])
+                        if count == 1:
+                            logfile.write("{} ({})\t{} ({})\t{}\tUncertainty\n".format(
+                                keys[0][0], keys[0][1], keys[1][0], keys[1][1],
+                                detector.unit))
+                        logfile.write("{}\t{}\t{}\t{}\n".format(
+                            x[keys[0]], x[keys[1]], str(cells[row, column]),
+                            str(cells[row, column].err())))
+
+                        if update is None:
+                            update = self._mesh_update(axis, rows, columns, keys,
+                                                       action)
+                        if count % redraw_every == 0:
+                            renderer.submit(update, (cells, grid))
+                if update is not None and count % redraw_every != 0:
+                    renderer.submit(update, (cells, grid))
+            completed = True
+        except BaseException:
+            _cancel_action(action)
+            raise
+        finally:
+            self._report_timing(timer, log_filename, completed=completed)
+        # The action was handed the axis in place of the plot functions
+        result = _finish_action(action, axis, renderer.result)
         if save:
             fig.savefig(save)
 
-        return action_remainder
+        return result
 
     @staticmethod
-    def _estimate_locations(xs, size, low, high):
-        xs = np.array(xs)
-        steps = xs[1:] - xs[:-1]
-        if len(xs) >= 2:
-            deltax = np.mean(steps)
-        else:
-            deltax = (high - low) / float(size)
+    def _mesh_update(axis, rows, columns, keys, action):
+        # pylint: disable=too-many-arguments
+        """Create the update that pushes the latest cell values into the
+        colour mesh and redraws it.  The mesh itself is only created on
+        the first update."""
+        mesh = []
+
+        def update(data, action_remainder):
+            """Update the mesh and run the action on the cells"""
+            cells, grid = data
+            if not mesh:
+                axis.clear()
+                axis.set_xlabel("{} ({})".format(keys[1][0], keys[1][1]))
+                axis.set_ylabel("{} ({})".format(keys[0][0], keys[0][1]))
+                mesh.append(axis.pcolormesh(columns.edges(), rows.edges(),
+                                            np.ma.masked_invalid(grid)))
+            mesh[0].set_array(np.ma.masked_invalid(grid).ravel())
+            if np.isfinite(grid).any():
+                mesh[0].set_clim(np.nanmin(grid), np.nanmax(grid))
+            if action:
+                with timed("fit"):
+                    action_remainder = action(columns.centres, cells, axis,
+                                              action_remainder)
+            plt.draw()
+            return action_remainder
+        return update
+
+
+class _GridAxis(object):
+    """One axis of the cell grid of a two dimensional scan.
+
+    The cell centres are the distinct positions of the scan along this
+    axis, so a measured position can be turned into a cell index
+    directly rather than by searching the positions seen so far.
+    """
+
+    def __init__(self, positions, tolerance):
+        centres = np.unique(np.asarray(positions, dtype=float))
+        if centres.size:
+            # linspace and arange can produce positions a rounding
+            # error apart, which are the same cell
+            keep = np.hstack([[True], np.diff(centres) > tolerance])
+            centres = centres[keep]
+        self.centres = centres
+        self._index = PositionIndex(tolerance)
+        for centre in centres:
+            self._index.add(centre)
+
+    @classmethod
+    def of(cls, scan):
+        """The grid axis along a scan, and the number of axes it moves.
+
+        Scans which do not visit a fixed set of positions along a single
+        axis, such as a ParallelScan, are gridded on the setpoints of
+        their first axis.
+        """
+        try:
+            return cls(scan.positions(), scan.position_tolerance()), 1
+        except TypeError:
+            points = list(scan.setpoints())
+        return (cls([point[0][1] for point in points], scan.position_tolerance()),
+                len(points[0]) if points else 1)
 
-        first = np.array([xs[0]] - deltax / 2)
-        remainder = size + 1 - len(xs)
-        end = np.linspace(xs[-1] + deltax / 2, high, remainder)[1:]
-        return np.hstack([first, xs + deltax / 2, end])
+    def __len__(self):
+        return len(self.centres)
+
+    def locate(self, position):
+        """Find the index of the cell containing position"""
+        if len(self.centres) == 1:
+            return 0
+        idx = self._index.index(position)
+        if idx is None:
+            # The motor stopped outside of its deadband, so take the
+            # nearest cell
+            idx = int(np.clip(np.searchsorted(self.centres, position),
+                              1, len(self.centres) - 1))
+            if position - self.centres[idx - 1] < \
+                    self.centres[idx] - position:
+                idx -= 1
+        return idx
+
+    def edges(self):
+        """The boundaries of the cells, for use with pcolormesh"""
+        if len(self.centres) == 1:
+            return np.array([self.centres[0] - 0.5, self.centres[0] + 0.5])
+        middles = (self.centres[1:] + self.centres[:-1]) / 2
+        return np.hstack([[2 * self.centres[0] - middles[0]], middles,
+                          [2 * self.centres[-1] - middles[-1]]])
 
 
 class ParallelScan(Scan):
@@ -729,13 +1314,31 @@ class ParallelScan(Scan):
         self.defaults = self.first.defaults
 
     def __iter__(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            for x in _move_through(plan.validate(), skip_unchanged=False):
+                yield x
+            return
         for x, y in six.moves.zip(self.first, self.second):
             yield merge_dicts(x, y)
 
+    def setpoints(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return iter(plan)
+        return (x + y for x, y in six.moves.zip(self.first.setpoints(),
+                                                self.second.setpoints()))
+
+    def _plan(self):
+        return self.first._plan().parallel(self.second._plan())  # pylint: disable=protected-access
+
     def __repr__(self):
         return "{} & {}".format(self.first, self.second)
 
     def __len__(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return len(plan)
         return min(len(self.first), len(self.second))
 
     def map(self, func):
@@ -752,11 +1355,242 @@ class ParallelScan(Scan):
         return ParallelScan(self.first.reverse, self.second.reverse)
 
     def min(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return plan.min()
         return (self.first.min(), self.second.min())
 
     def max(self):
+        plan = self._cached_plan()
+        if plan is not None:
+            return plan.max()
         return (self.first.max(), self.second.max())
 
+    def position_tolerance(self):
+        # Points are plotted against the position of the first scan
+        return self.first.position_tolerance()
+
+
+class PlannedScan(Scan):
+    """PlannedScan visits the points of another scan in the order that
+    takes the least time to travel between them, based on the distance
+    and velocity of each motion.  Every point is still measured at its
+    true position."""
+
+    def __init__(self, scan):
+        self.scan = scan
+        self.defaults = scan.defaults
+
+    def setpoints(self):
+        points = list(self.scan.setpoints())
+        order = travel_order(points, current_position(points))
+        for index in order:
+            yield points[index]
+
+    def __iter__(self):
+        return _move_through(self.setpoints())
+
+    def __len__(self):
+        return len(self.scan)
+
+    def __repr__(self):
+        return "({}).planned".format(self.scan)
+
+    def map(self, func):
+        return PlannedScan(self.scan.map(func))
+
+    @property
+    def reverse(self):
+        return PlannedScan(self.scan.reverse)
+
+    @property
+    def planned(self):
+        return self
+
+    def min(self):
+        return self.scan.min()
+
+    def max(self):
+        return self.scan.max()
+
+    def position_tolerance(self):
+        return self.scan.position_tolerance()
+
+    def positions(self):
+        return self.scan.positions()
+
+    def log_file_info(self):
+        return self.scan.log_file_info()
+
+
+class ResumedScan(Scan):
+    """ResumedScan carries on an interrupted scan from the first point
+    that it had not finished measuring.  The points measured before the
+    interruption are loaded from the sidecar of the original log, and
+    new measurements are added to the same log."""
+
+    def __init__(self, checkpoint, defaults):
+        self.resume = checkpoint
+        self.defaults = defaults
+        self._start = checkpoint.completed
+
+    def setpoints(self):
+        plan = self.resume.plan
+        return (plan[index] for index in range(self._start, len(plan)))
+
+    def __iter__(self):
+        return _move_through(self.setpoints())
+
+    def __len__(self):
+        return len(self.resume.plan) - self._start
+
+    def __repr__(self):
+        return "ResumedScan({})".format(self.resume)
+
+    def map(self, func):
+        raise TypeError("A resumed scan cannot be changed")
+
+    @property
+    def reverse(self):
+        raise TypeError("A resumed scan cannot be changed")
+
+    def min(self):
+        return self.resume.plan.min()
+
+    def max(self):
+        return self.resume.plan.max()
+
+    def position_tolerance(self):
+        # Merge new points with the loaded ones as the original scan did
+        if self.resume.position_tolerance is None:
+            return Scan.position_tolerance(self)
+        return self.resume.position_tolerance
+
+    def positions(self):
+        plan = self.resume.plan
+        if len(plan.motions) != 1:
+            return Scan.positions(self)
+        return plan.column(plan.motions[0])
+
+
+class AdaptiveScan(Scan):
+    """AdaptiveScan measures a coarse scan and then keeps adding points
+    where they best pin down the centre found by a fit, until the
+    uncertainty on the centre falls below a target.
+
+    New points are placed halfway between measured points.  Where the
+    fit has a model, the gap whose midpoint is most sensitive to the
+    centre of the model is split.  Otherwise the gaps with the most
+    signal above background are split first.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, scan, fit, target, max_points=None, min_step=None):
+        self.scan = scan
+        self.action = scan.action
+        self.name = scan.name
+        self.defaults = scan.defaults
+        self.centre_fit = fit
+        self.target = target
+        if max_points is None:
+            max_points = 2 * len(scan)
+        self.max_points = max_points
+        if min_step is None:
+            steps = np.diff(np.unique(scan.positions()))
+            min_step = steps.min() / 8 if steps.size else 0.0
+        self.min_step = min_step
+
+    def __iter__(self):
+        return iter(self.scan)
+
+    def _points(self, data, pipeline=False):
+        # The next point depends on the last measurement, so the move
+        # cannot be pipelined
+        for x in self.scan:
+            yield x
+        while len(data) < self.max_points:
+            position = self.next_position(data.positions(), data)
+            if position is None:
+                return
+            self.action(position)
+            g.waitfor_move()
+            dic = OrderedDict()
+            dic[(self.name, self.action.unit)] = self.action()
+            yield dic
+
+    def next_position(self, xs, ys):
+        """
+        Choose the next position to measure
+
+        Parameters
+        ----------
+        xs: the positions measured so far
+        ys: the monoids measured so far
+
+        Returns
+        -------
+        The next position, or None if the centre is known well enough
+        or there is no gap left to split
+        """
+        xs = np.asarray(xs, dtype=float)
+        values = np.asarray(ys.values(), dtype=float)
+        errs = np.asarray(ys.err(), dtype=float)
+        try:
+            params = self.centre_fit.fit(xs, values, errs)
+        except (RuntimeError, ValueError, TypeError, np.linalg.LinAlgError):
+            params = None
+        if params is not None and \
+                self.centre_fit.centre_err(xs, values, errs, params) < self.target:
+            return None
+
+        order = np.argsort(xs)
+        xs, values = xs[order], values[order]
+        gaps = np.diff(xs)
+        mids = xs[:-1] + gaps / 2
+        splittable = gaps / 2 >= self.min_step
+        if not np.any(splittable):
+            return None
+
+        score = None
+        if params is not None:
+            score = self.centre_fit.centre_sensitivity(mids, params, gaps / 2)
+        if score is None or not np.any(np.isfinite(score) & (score > 0)):
+            score = np.interp(mids, xs, values) - np.min(values)
+        score = np.where(np.isfinite(score), score, 0) * gaps
+        if not np.any(score[splittable] > 0):
+            score = gaps
+        score = np.where(splittable, score, -np.inf)
+        return mids[np.argmax(score)]
+
+    def __len__(self):
+        return self.max_points
+
+    def __repr__(self):
+        return "AdaptiveScan({}, {}, {})".format(
+            self.scan, self.centre_fit.__class__.__name__, self.target)
+
+    def map(self, func):
+        return AdaptiveScan(self.scan.map(func), self.centre_fit, self.target,
+                            self.max_points, self.min_step)
+
+    @property
+    def reverse(self):
+        return AdaptiveScan(self.scan.reverse, self.centre_fit, self.target,
+                            self.max_points, self.min_step)
+
+    def min(self):
+        return self.scan.min()
+
+    def max(self):
+        return self.scan.max()
+
+    def position_tolerance(self):
+        return min(self.scan.position_tolerance(), self.min_step / 2) \
+            if self.min_step > 0 else self.scan.position_tolerance()
+
+    def positions(self):
+        return self.scan.positions()
+
 
 # We can't test the forever scan by definition, hence the no cover
 # pragma
@@ -764,29 +1598,82 @@ class ForeverScan(Scan):  # pragma: no cover
     """
     ForeverScan repeats the same scan over and over again to improve
     the statistics until the user manually halts the scan.
+
+    Every cycle is folded into the points of the first cycle, so the
+    memory used depends on the points in a cycle rather than on how
+    long the scan runs.  The value of each point within each of the
+    most recent cycles is kept in the history, to show any drift.
     """
 
-    def __init__(self, scan):
+    def __init__(self, scan, history=DEFAULT_CYCLE_HISTORY):
         self.scan = scan
         self.defaults = scan.defaults
+        self.cycles = history
+        self.history = None
 
     def __iter__(self):
         while True:
             for x in self.scan:
                 yield x
 
+    def setpoints(self):
+        while True:
+            for x in self.scan.setpoints():
+                yield x
+
+    def _plan(self):
+        raise TypeError("A scan which runs forever cannot be compiled")
+
+    @property
+    def planned(self):
+        return ForeverScan(self.scan.planned, self.cycles)
+
+    def _point_folder(self):
+        """Fold each cycle into the points of the first.  Once a full
+        cycle has been measured, a position which does not match any
+        point, e.g. because the motor stopped outside of its deadband,
+        goes into the nearest point rather than starting a new one.  A
+        cycle which visits a position more than once, e.g. and_back, has
+        fewer points than measurements, so new points are only started
+        in the first cycle."""
+        cycle = len(self.scan)
+        positions = PositionIndex(self.scan.position_tolerance())
+        history = self.history = CycleHistory(cycle, self.cycles)
+        measured = [0]
+
+        def fold(data, position, value):
+            """Add a measurement to its point and to the history"""
+            point = positions.index(position)
+            if point is None and measured[0] < cycle:
+                positions.add(position)
+                point = data.append(position, value)
+            else:
+                if point is None:
+                    point = int(np.argmin(np.abs(data.positions() - position)))
+                data.accumulate(point, value)
+            history.record(measured[0] % cycle, value)
+            measured[0] += 1
+            if measured[0] % cycle == 0:
+                history.end_cycle()
+            return point
+        return fold
+
     def __repr__(self):
         return "{}({})".format(self.__class__.__name__, self.scan)
 
     def __len__(self):
         raise RuntimeError("Attempted to get the length of an infinite list")
 
+    def calculate(self, time=False, pad=0, **kwargs):
+        # pylint: disable=redefined-outer-name
+        raise RuntimeError("Cannot calculate the time of a scan which runs forever")
+
     def map(self, func):
-        return self.__class__(self.scan.map(func))
+        return self.__class__(self.scan.map(func), self.cycles)
 
     @property
     def reverse(self):
-        return self.__class__(self.scan.reverse)
+        return self.__class__(self.scan.reverse, self.cycles)
 
     def min(self):
         return self.scan.min()
@@ -794,6 +1681,12 @@ class ForeverScan(Scan):  # pragma: no cover
     def max(self):
         return self.scan.max()
 
+    def position_tolerance(self):
+        return self.scan.position_tolerance()
+
+    def positions(self):
+        return self.scan.positions()
+
 
 class ForeverContinuousScan(ContinuousScan):
     """
@@ -827,6 +1720,9 @@ class ReplayScan(Scan):
     def max(self):
         return max(self.xs)
 
+    def positions(self):
+        return np.asarray(self.xs, dtype=float)
+
     @property
     def reverse(self):
         return ReplayScan(self.xs[::-1], self.ys[::-1], self.axis,
@@ -865,6 +1761,7 @@ class ReplayScan(Scan):
 
         if action:
             action_remainder = action(xs, ys, plot_functions, None)
+            action_remainder = _finish_action(action, plot_functions, action_remainder)
 
         plot_functions.draw()
         plot_functions.save(save)
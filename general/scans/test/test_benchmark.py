@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import unittest
+
+from hamcrest import *
+
+from general.scans.benchmark import (LatencyGenie, benchmark, benchmark_names,
+                                     compare, main, report, run_benchmarks)
+
+
+class LatencyGenieTests(unittest.TestCase):
+    """
+    Tests for the simulated instrument of the benchmarks
+    """
+
+    def test_GIVEN_latency_WHEN_call_THEN_latency_counted(self):
+        genie = LatencyGenie({"cget": 0.001})
+
+        genie.cget("Theta")
+        genie.cset("Theta", 2.0)
+
+        assert_that(genie.injected, is_(close_to(0.001, 1e-9)))
+        assert_that(genie.calls, has_entries(cget=1, cset=1))
+        assert_that(genie.cget("Theta")["value"], is_(2.0))
+
+    def test_GIVEN_unknown_call_WHEN_create_THEN_error(self):
+        assert_that(calling(LatencyGenie).with_args({"get_pv": 1.0}),
+                    raises(ValueError))
+
+    def test_GIVEN_velocity_WHEN_move_THEN_axis_travels(self):
+        genie = LatencyGenie()
+        genie.set_pv("CS:SB:Theta.VELO", 1e-6)
+
+        genie.cset("Theta", 10.0)
+
+        assert_that(genie.cget("Theta")["value"], is_(less_than(1.0)))
+
+
+class BenchmarkTests(unittest.TestCase):
+    """
+    Tests for the benchmarks of the scan engine
+    """
+
+    def test_GIVEN_latency_WHEN_benchmark_THEN_latency_not_overhead(self):
+        result = benchmark("SimpleScan", 10, latencies={"cset": 0.002},
+                           memory=False)
+
+        assert_that(result["measured"], is_(10))
+        assert_that(result["latency"], is_(close_to(0.002, 1e-9)))
+        assert_that(result["overhead"], is_(less_than(result["seconds"] / 10)))
+        assert_that(result["calls"], has_entry("integrate_spectrum", 20))
+
+    def test_GIVEN_every_benchmark_WHEN_run_THEN_all_reported(self):
+        results = run_benchmarks(points=[4], memory=False)
+
+        assert_that([result["benchmark"] for result in results],
+                    is_(benchmark_names()))
+        assert_that(report(results).splitlines(),
+                    has_length(len(results) + 1))
+
+    def test_GIVEN_slower_results_WHEN_compare_THEN_regression_found(self):
+        baseline = [{"benchmark": "SimpleScan", "points": 10,
+                     "points_per_second": 100.0, "peak_memory": 1000}]
+        results = [{"benchmark": "SimpleScan", "points": 10,
+                    "points_per_second": 70.0, "peak_memory": 1100}]
+
+        assert_that(compare(results, baseline),
+                    contains_exactly(contains_string("70.0 points/s")))
+        assert_that(compare(results, baseline, margin=1.5), is_(empty()))
+
+    def test_GIVEN_baseline_WHEN_main_THEN_results_and_regressions_returned(
+            self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, "base.json")
+            with open(baseline, "w") as handle:
+                json.dump([{"benchmark": "SimpleScan", "points": 4,
+                            "points_per_second": float("inf")}], handle)
+
+            results, regressions = main(
+                ["--points", "4", "--benchmark", "SimpleScan", "--no-memory",
+                 "--baseline", baseline])
+
+        assert_that([result["measured"] for result in results],
+                    contains_exactly(4))
+        assert_that(regressions,
+                    contains_exactly(contains_string("SimpleScan")))
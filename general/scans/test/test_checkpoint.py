@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from hamcrest import *
+from mock import Mock, patch
+
+from general.scans.checkpoint import Checkpoint, checkpoint_path, latest_checkpoint
+from general.scans.detector import DaePeriods
+from general.scans.monoid import Average
+from general.scans.motion import Motion
+from general.scans.scans import SimpleScan
+from general.scans.test.test_scans import TestDefaults
+
+
+class CheckpointTests(unittest.TestCase):
+    """
+    Tests for stopping and resuming scans
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.defaults = TestDefaults()
+        self.position = {"value": 0.0}
+        self.moves = []
+        self.stop_at = None
+
+        def setter(x):
+            self.moves.append(x)
+            self.position["value"] = x
+
+        def detector(acc, **kwargs):
+            if len(self.moves) == self.stop_at:
+                raise KeyboardInterrupt()
+            return acc, Average(10 * self.position["value"], 1)
+
+        self.defaults.detector = detector
+        self.motion = Motion(lambda: self.position["value"], setter, "theta")
+        self.scan = SimpleScan(self.motion, np.array([1.0, 2.0, 3.0, 4.0]), self.defaults)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _patches(self):
+        return [patch("general.scans.defaults.g.get_script_dir", return_value=self.directory.name),
+                patch("general.scans.detector.g.get_runstate", return_value="SETUP")]
+
+    def _run(self, function, **kwargs):
+        patches = self._patches()
+        for item in patches:
+            item.start()
+        try:
+            return function(**kwargs)
+        finally:
+            for item in patches:
+                item.stop()
+
+    def _interrupt(self):
+        self.stop_at = 3
+        assert_that(calling(self._run).with_args(self.scan.plot, frames=5),
+                    raises(KeyboardInterrupt))
+        self.stop_at = None
+
+    def test_GIVEN_scan_interrupted_WHEN_checkpoint_loaded_THEN_completed_points_and_arguments_saved(self):
+        self._interrupt()
+
+        path = latest_checkpoint(self.directory.name)
+        checkpoint = Checkpoint.load(path)
+
+        assert_that(checkpoint.completed, is_(2))
+        assert_that(checkpoint.kwargs, has_entries(frames=5, save=None))
+        assert_that(checkpoint.remaining, is_(2))
+
+    def test_GIVEN_scan_interrupted_WHEN_resumed_THEN_only_unmeasured_points_measured(self):
+        self._interrupt()
+        self.moves[:] = []
+        captured = {}
+
+        def action(xs, ys, plot_functions, remainder):
+            captured["xs"] = list(xs)
+            captured["ys"] = [float(y) for y in ys]
+
+        self._run(self.defaults.resume_scan, action=action)
+
+        assert_that(self.moves, contains_exactly(3.0, 4.0))
+        assert_that(captured["xs"], contains_exactly(1.0, 2.0, 3.0, 4.0))
+        assert_that(captured["ys"], contains_exactly(10.0, 20.0, 30.0, 40.0))
+        assert_that(latest_checkpoint(self.directory.name), is_(None))
+
+    def test_GIVEN_repeated_points_WHEN_resumed_THEN_readbacks_merged_with_original_tolerance(self):
+        offset = {"value": 0.0}
+
+        def setter(x):
+            self.moves.append(x)
+            self.position["value"] = x + offset["value"]
+
+        motion = Motion(lambda: self.position["value"], setter, "theta",
+                        tolerance_getter=lambda: 0.1)
+        self.scan = SimpleScan(motion, np.array([1.0, 2.0, 1.0, 2.0]), self.defaults)
+        self._interrupt()
+        offset["value"] = 0.03
+        captured = {}
+
+        def action(xs, ys, plot_functions, remainder):
+            captured["xs"] = list(xs)
+
+        self._run(self.defaults.resume_scan, action=action)
+
+        assert_that(captured["xs"], contains_exactly(1.0, 2.0))
+
+    def test_GIVEN_scan_finishes_WHEN_plot_THEN_no_checkpoint_left(self):
+        self._run(self.scan.plot, frames=5)
+
+        assert_that(latest_checkpoint(self.directory.name), is_(None))
+
+    def test_GIVEN_no_interrupted_scan_WHEN_resume_THEN_error(self):
+        assert_that(calling(self._run).with_args(self.defaults.resume_scan),
+                    raises(ValueError, "No interrupted scans"))
+
+
+class DaePeriodsCheckpointTests(unittest.TestCase):
+    """
+    Tests for keeping the DAE run of an interrupted scan
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        filename = os.path.join(self.directory.name, "scan.dat")
+        self.scan = Mock()
+        self.scan.resume = None
+        self.scan.checkpoint = Checkpoint(
+            filename, SimpleScan(Motion(Mock(), Mock(), "theta"), np.array([1.0, 2.0]), None).compile(), {})
+        self.detector = DaePeriods(lambda acc, **kwargs: (acc, Average(1, 1)), lambda: None)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_GIVEN_keyboard_interrupt_WHEN_exit_THEN_run_left_paused_and_recorded(self):
+        with patch("general.scans.detector.g") as g:
+            g.get_runstate.return_value = "RUNNING"
+            g.get_period.return_value = 2
+            g.get_runnumber.return_value = 1234
+            self.detector(self.scan, save=False)
+            self.detector._period_count = 2
+            self.detector.__exit__(KeyboardInterrupt, KeyboardInterrupt(), None)
+
+        g.pause.assert_called_once()
+        g.end.assert_not_called()
+        g.abort.assert_not_called()
+        checkpoint = Checkpoint.load(checkpoint_path(self.scan.checkpoint.log_file))
+        assert_that(checkpoint.run_kept, is_(True))
+        assert_that(checkpoint.period, is_(2))
+
+    def test_GIVEN_run_kept_WHEN_resumed_THEN_counting_carries_on_in_same_run(self):
+        self.scan.resume = self.scan.checkpoint
+        self.scan.resume.run_kept = True
+        self.scan.resume.period = 2
+        self.scan.resume.periods = 2
+        with patch("general.scans.detector.g") as g:
+            g.get_runstate.return_value = "PAUSED"
+            self.detector(self.scan, save=False)
+            with self.detector:
+                pass
+
+        g.begin.assert_not_called()
+        g.change_period.assert_called_once_with(2)
@@ -1,10 +1,14 @@
 import unittest
 
+import numpy as np
 from parameterized import parameterized
 from hamcrest import *
 from mock import patch, Mock
 
-from general.scans.detector import NormalisedIntensityDetector, create_spectra_definition, SPECTRA_RETRY_COUNT
+from general.scans.detector import BlockDetector, DetectorManager, NormalisedIntensityDetector, \
+    create_spectra_definition, SPECTRA_RETRY_COUNT, count_to_precision, on_next_pause, \
+    read_spectra, relative_error, sliced_polarisation, tof_weights
+from general.scans.monoid import Average, Exact, MonoidList, Polarisation
 from general.scans.scans import Scan
 
 
@@ -297,6 +301,199 @@ class TestSpectrasWithTimeRange(unittest.TestCase):
         assert_that(result.total, is_(sum_detector))
         assert_that(result.count, is_(integrated_monitor))
 
+    def test_GIVEN_pixel_missing_WHEN_detect_THEN_only_missing_pixel_integrated_again(self, g_mock):
+        self.setup_mock(g_mock)
+        attempts = {}
+
+        def _get_spectrum(spectrum, period=1, t_min=None, t_max=None):
+            attempts[spectrum] = attempts.get(spectrum, 0) + 1
+            if spectrum == 11 and attempts[spectrum] == 1:
+                return None
+            return 1
+        g_mock.integrate_spectrum = Mock(side_effect=_get_spectrum)
+        detector = NormalisedIntensityDetector(default_detector=10, default_monitor=2,
+                                               spectra_definitions=[create_spectra_definition(2),
+                                                                    create_spectra_definition(10)])
+
+        with detector(MockScan(), save=False) as detector_routine:
+            acc, result = detector_routine(None, frames=1, pixel_range=1)
+
+        assert_that(attempts, is_({2: 1, 9: 1, 10: 1, 11: 2}))
+        assert_that(result.total, is_(3))
+
+
+@patch("general.scans.detector.g")
+class TestSpectraReader(unittest.TestCase):
+    """
+    Tests for integrating the spectra of a NormalisedIntensityDetector read in bulk
+    """
+
+    edges = np.array([0.0, 10.0, 20.0, 30.0])
+
+    def _detector(self, reader):
+        return NormalisedIntensityDetector(
+            default_detector=10, default_monitor=2, spectra_reader=reader,
+            spectra_definitions=[create_spectra_definition(2, None, 15.0),
+                                 create_spectra_definition(10, 5.0, 20.0)])
+
+    def _measure(self, g_mock, detector, **kwargs):
+        g_mock.get_runstate = Mock(return_value="SETUP")
+        g_mock.get_period = Mock(return_value=3)
+        with detector(MockScan(), save=False) as detector_routine:
+            return detector_routine(None, frames=1, **kwargs)[1]
+
+    def test_GIVEN_reader_WHEN_detect_THEN_windows_integrated_with_partial_bins(self, g_mock):
+        reader = Mock(return_value=(self.edges, np.array([[10.0, 20.0, 30.0],
+                                                          [2.0, 4.0, 8.0],
+                                                          [1.0, 1.0, 1.0]])))
+
+        result = self._measure(g_mock, self._detector(reader), max_pixel=11)
+
+        reader.assert_called_once_with([2, 10, 11], 3)
+        assert_that(result.count, is_(close_to(20.0, 1e-12)))
+        assert_that(result.total, is_(close_to(5.0 + 1.5, 1e-12)))
+        g_mock.integrate_spectrum.assert_not_called()
+
+    def test_GIVEN_pixel_missing_WHEN_detect_THEN_only_missing_pixel_read_again(self, g_mock):
+        reader = Mock(side_effect=[(self.edges, np.array([[10.0, 20.0, 30.0],
+                                                          [np.nan, np.nan, np.nan],
+                                                          [1.0, 1.0, 1.0]])),
+                                   (self.edges, np.array([[2.0, 4.0, 8.0]]))])
+
+        result = self._measure(g_mock, self._detector(reader), max_pixel=11)
+
+        reader.assert_called_with([10], 3)
+        assert_that(result.total, is_(close_to(6.5, 1e-12)))
+
+    def test_GIVEN_spectra_never_read_WHEN_detect_THEN_retries_stop_and_result_is_zero(self, g_mock):
+        reader = Mock(return_value=(self.edges, np.full((2, 3), np.nan)))
+
+        result = self._measure(g_mock, self._detector(reader))
+
+        assert_that(reader.call_count, is_(SPECTRA_RETRY_COUNT))
+        assert_that((result.total, result.count), is_((0, 0)))
+
+    def test_GIVEN_window_inside_bins_WHEN_tof_weights_THEN_partial_bins_weighted(self, g_mock):
+        weights = tof_weights([0.0, 10.0, 20.0, 30.0, 30.0], 5.0, 22.0)
+
+        assert_that(list(weights), contains_exactly(0.5, 1.0, close_to(0.2, 1e-12), 0.0))
+
+    def test_GIVEN_spectra_with_bin_centres_WHEN_read_THEN_edges_and_rows_returned(self, g_mock):
+        g_mock.get_spectrum = Mock(side_effect=[{"time": [5.0, 15.0, 25.0], "signal": [1.0, 2.0, 3.0]},
+                                                None,
+                                                {"time": [5.0, 15.0, 25.0], "signal": [4.0, 5.0, 6.0]}])
+
+        edges, signal = read_spectra([2, 10, 11], 3)
+
+        g_mock.get_spectrum.assert_called_with(11, 3, dist=False)
+        assert_that(list(edges), contains_exactly(0.0, 10.0, 20.0, 30.0))
+        np.testing.assert_array_equal(signal, [[1.0, 2.0, 3.0], [np.nan] * 3, [4.0, 5.0, 6.0]])
+
+    def test_GIVEN_default_reader_WHEN_detect_THEN_same_as_reading_each_spectrum(self, g_mock):
+        spectra = {2: [10.0, 20.0, 30.0], 10: [2.0, 4.0, 8.0], 11: [1.0, 1.0, 1.0]}
+        g_mock.get_spectrum = Mock(
+            side_effect=lambda spectrum, period, dist: {"time": self.edges, "signal": spectra[spectrum]})
+
+        result = self._measure(g_mock, self._detector(read_spectra), max_pixel=11)
+
+        assert_that(result.count, is_(close_to(20.0, 1e-12)))
+        assert_that(result.total, is_(close_to(6.5, 1e-12)))
+
+    def test_GIVEN_no_spectra_read_WHEN_read_THEN_every_row_missing(self, g_mock):
+        g_mock.get_spectrum = Mock(return_value=None)
+
+        edges, signal = read_spectra([2, 10], 3)
+
+        assert_that(len(signal), is_(2))
+        assert_that(np.isnan(signal).all(), is_(True))
+
+
+@patch("general.scans.detector.g")
+class TestSlicedPolarisation(unittest.TestCase):
+    """
+    Tests for the polarisation of a set of channels over time of flight slices
+    """
+
+    slices = [slice(2, 8), slice(2, 5), slice(5, 8)]
+
+    def _spectra(self, g_mock):
+        def _get_spectrum(channel, period):
+            return {"signal": np.arange(10.0) * channel + period}
+        g_mock.get_spectrum = Mock(side_effect=_get_spectrum)
+
+    def test_GIVEN_channels_WHEN_sliced_THEN_same_as_polarisation_of_each_channel(self, g_mock):
+        self._spectra(g_mock)
+        expected = [Polarisation.zero() for _ in self.slices]
+        mon_up = np.sum(np.arange(10.0) + 3) * 100.0
+        mon_down = np.sum(np.arange(10.0) + 4) * 100.0
+        for channel in [11, 12, 20]:
+            spec_up = np.arange(10.0) * channel + 3
+            spec_down = np.arange(10.0) * channel + 4
+            for index, slc in enumerate(self.slices):
+                expected[index] += Polarisation(Average(np.sum(spec_up[slc]) * 100.0, mon_up),
+                                                Average(np.sum(spec_down[slc]) * 100.0, mon_down))
+
+        result = sliced_polarisation([11, 12, 20], 3, 4, self.slices)
+
+        np.testing.assert_allclose(result.floats(), [float(x) for x in expected])
+        np.testing.assert_allclose(result.err(), [x.err() for x in expected])
+
+    def test_GIVEN_no_channels_WHEN_sliced_THEN_zero_for_every_slice(self, g_mock):
+        self._spectra(g_mock)
+
+        result = sliced_polarisation([], 3, 4, self.slices)
+
+        assert_that(list(result.floats()), contains_exactly(0.0, 0.0, 0.0))
+
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class TestCountToPrecision(unittest.TestCase):
+
+    def setUp(self):
+        self.slices = []
+
+        def detector(acc, frames=None, **kwargs):
+            # Counts build up over the period, 100 per slice
+            self.slices.append(frames)
+            return acc, Average(100.0 * len(self.slices), 1000.0 * len(self.slices))
+        self.detector = detector
+
+    def test_GIVEN_target_relative_error_WHEN_count_THEN_slices_counted_until_target_reached(self):
+        acc, value = count_to_precision(self.detector, None, rel_err=0.05, frames=10)
+
+        assert_that(self.slices, contains_exactly(10, 10, 10, 10, 10))
+        assert_that(relative_error(value), is_(less_than_or_equal_to(0.05)))
+
+    @patch("general.scans.detector.time.time")
+    def test_GIVEN_target_not_reached_WHEN_max_seconds_pass_THEN_counting_stops(self, time_mock):
+        time_mock.side_effect = [0, 10, 20, 30]
+
+        count_to_precision(self.detector, None, rel_err=0.0001, max_seconds=20, frames=10)
+
+        assert_that(self.slices, has_length(2))
+
+    def test_GIVEN_pause_callback_WHEN_count_in_slices_THEN_callback_only_run_once_counting_finished(self):
+        calls = []
+        on_next_pause(lambda: calls.append(len(self.slices)))
+
+        count_to_precision(self.detector, None, rel_err=0.05, frames=10)
+
+        assert_that(calls, contains_exactly(5))
+
+    def test_GIVEN_monoid_list_WHEN_relative_error_THEN_worst_channel_used(self):
+        worst = Average(100.0, 1000.0)
+        value = MonoidList([Average(10000.0, 100000.0), worst, Exact(5, 1)])
+
+        assert_that(relative_error(value), is_(relative_error(worst)))
+
+    def test_GIVEN_zero_value_WHEN_relative_error_THEN_infinite(self):
+        assert_that(relative_error(Average(0.0, 1)), is_(float("inf")))
+
+    def test_GIVEN_detector_without_periods_WHEN_rel_err_requested_THEN_error(self):
+        for detector in [DetectorManager(lambda acc: (acc, 1.0)), BlockDetector("block")]:
+            assert_that(calling(detector).with_args(MockScan(), save=False, rel_err=0.05),
+                        raises(ValueError))
+            assert_that(detector(MockScan(), save=False, rel_err=None), is_(detector))
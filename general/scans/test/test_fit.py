@@ -1,3 +1,4 @@
+import threading
 import unittest
 import numpy as np
 from mock import Mock
@@ -212,6 +213,105 @@ class FitErrorTests(unittest.TestCase):
         assert_that(result, is_(None))
 
 
+class BlockingFit(PolyFit):
+    """
+    A linear fit which waits to be released before each fit, recording the data it was given
+    """
+    def __init__(self):
+        super(BlockingFit, self).__init__(1)
+        self.started = threading.Event()
+        self.release = threading.Semaphore(0)
+        self.fitted = []
+
+    def fit(self, x, y, err):
+        self.started.set()
+        self.release.acquire()
+        self.fitted.append(len(x))
+        return super(BlockingFit, self).fit(x, y, err)
+
+
+class BackgroundFitTests(unittest.TestCase):
+
+    def _data(self, points):
+        return list(range(points)), ListOfMonoids([Average(2.0 * x + 1, 1) for x in range(points)])
+
+    def test_GIVEN_fit_not_finished_WHEN_background_fit_action_THEN_old_result_returned(self):
+        fit = BlockingFit()
+        action = fit.fit_plot_action(background=True)
+
+        result = action(*self._data(3), Mock(), "old")
+        fit.release.release()
+
+        assert_that(result, is_("old"))
+        assert_that(action.finish(), is_(not_none()))
+
+    def test_GIVEN_data_arrives_while_fitting_WHEN_finish_THEN_stale_data_skipped_and_latest_fitted(self):
+        fit = BlockingFit()
+        action = fit.fit_plot_action(background=True)
+        action(*self._data(2), Mock(), None)
+        fit.started.wait(5)
+        for points in range(3, 6):
+            action(*self._data(points), Mock(), None)
+        for _ in range(2):
+            fit.release.release()
+
+        params = action.finish()
+
+        assert_that(fit.fitted, contains_exactly(2, 5))
+        assert_that(action.superseded, is_(2))
+        assert_that(params[0], is_(close_to(2.0, 1e-9)))
+        assert_that(params[1], is_(close_to(1.0, 1e-9)))
+
+    def test_GIVEN_finished_fit_WHEN_background_fit_action_THEN_latest_fit_plotted(self):
+        action = PolyFit(1).fit_plot_action(background=True)
+        plot_functions = Mock()
+        action(*self._data(4), Mock(), None)
+        action.finish()
+
+        params = action(*self._data(4), plot_functions, None)
+        action.finish(plot_functions)
+
+        assert_that(params[0], is_(close_to(2.0, 1e-9)))
+        assert_that(plot_functions.plot_fit.call_count, is_(2))
+
+    def test_GIVEN_fit_errors_WHEN_background_fit_finishes_THEN_result_is_none(self):
+        action = ErroringFit(1, "hi", RuntimeError).fit_plot_action(background=True)
+
+        action([1, 2], ListOfMonoids([Average(1, 1), Average(2, 1)]), Mock(), None)
+
+        assert_that(action.finish(), is_(None))
+
+    def test_GIVEN_plotting_fails_WHEN_background_fit_action_THEN_error_not_raised(self):
+        action = PolyFit(1).fit_plot_action(background=True)
+        plot_functions = Mock()
+        plot_functions.plot_fit.side_effect = ValueError("bad plot")
+        action(*self._data(4), Mock(), None)
+        action.finish()
+
+        params = action(*self._data(4), plot_functions, None)
+
+        assert_that(params[0], is_(close_to(2.0, 1e-9)))
+        assert_that(action.finish(plot_functions)[0], is_(close_to(2.0, 1e-9)))
+
+    def test_GIVEN_cancelled_while_fitting_WHEN_new_data_submitted_THEN_only_new_worker_fits_it(self):
+        fit = BlockingFit()
+        action = fit.fit_plot_action(background=True)
+        action(*self._data(2), Mock(), None)
+        fit.started.wait(5)
+        old_worker = action._thread
+
+        action.cancel()
+        action(*self._data(4), Mock(), None)
+        for _ in range(2):
+            fit.release.release()
+        params = action.finish()
+        old_worker.join(5)
+
+        assert_that(old_worker.is_alive(), is_(False))
+        assert_that(fit.fitted, contains_inanyorder(2, 4))
+        assert_that(params[0], is_(close_to(2.0, 1e-9)))
+
+
 class TopHatTests(unittest.TestCase):
 
     def test_GIVEN_data_WHEN_fit_top_hat_THEN_fit_returns_value(self):
@@ -336,3 +436,34 @@ class SlitScanFitTests(unittest.TestCase):
 
         for index, (actual, expected) in enumerate(zip(result, expected_value)):
             assert_that(actual, close_to(expected, 1e-6), f"item {index}")
+
+
+class CentreUncertaintyTests(unittest.TestCase):
+    def test_GIVEN_fit_without_centre_WHEN_centre_err_THEN_infinite(self):
+        fitter = MinimalFit(1, "Minimal")
+
+        assert_that(fitter.centre_err([1, 2], [1, 2], [1, 1], None), is_(np.inf))
+        assert_that(fitter.centre_sensitivity([1, 2], None, 0.5), is_(none()))
+
+    def test_GIVEN_gaussian_fit_WHEN_centre_sensitivity_THEN_largest_on_flanks(self):
+        params = (np.array([0.0, 1.0, 10.0, 0.0]), np.eye(4))
+
+        sensitivity = GaussianFit().centre_sensitivity(np.array([-3.0, -1.0, 0.0, 1.0, 3.0]), params, 0.01)
+
+        assert_that(np.argmax(sensitivity), is_in([1, 3]))
+        assert_that(sensitivity[2], is_(close_to(0, 1e-3)))
+
+    def test_GIVEN_curve_fit_covariance_WHEN_centre_err_THEN_root_of_centre_variance(self):
+        params = (np.array([0.5, 1.0, 10.0, 0.0]), np.diag([0.04, 1, 1, 1]))
+
+        assert_that(GaussianFit().centre_err(None, None, None, params), is_(close_to(0.2, 1e-12)))
+
+    def test_GIVEN_centre_of_mass_WHEN_centre_err_THEN_smaller_for_smaller_errors(self):
+        x = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+        y = np.array([0.0, 1.0, 4.0, 1.0, 0.0])
+        fitter = CentreOfMassFit()
+        params = fitter.fit(x, y, np.ones(5))
+
+        assert_that(fitter.centre(params), is_(close_to(2.0, 1e-9)))
+        assert_that(fitter.centre_err(x, y, 0.1 * np.ones(5), params),
+                    is_(less_than(fitter.centre_err(x, y, np.ones(5), params))))
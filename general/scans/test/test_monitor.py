@@ -0,0 +1,70 @@
+import threading
+import unittest
+
+import numpy as np
+from hamcrest import *
+from mock import Mock
+
+from general.scans.monitor import SampleBuffer, watch
+
+
+class SampleBufferTests(unittest.TestCase):
+    """
+    Tests for the timestamped ring buffer
+    """
+
+    def test_GIVEN_samples_WHEN_drain_THEN_only_new_samples_returned_oldest_first(self):
+        samples = SampleBuffer()
+        samples.push(1.0, timestamp=1.0)
+        samples.push(2.0, timestamp=2.0)
+        samples.drain()
+        samples.push(3.0, timestamp=3.0)
+
+        times, values = samples.drain()
+
+        assert_that(list(times), contains_exactly(3.0))
+        assert_that(list(values), contains_exactly(3.0))
+
+    def test_GIVEN_more_samples_than_capacity_WHEN_drain_THEN_newest_samples_kept(self):
+        samples = SampleBuffer(capacity=3)
+        for x in range(5):
+            samples.push(float(x), timestamp=float(x))
+
+        times, values = samples.drain()
+
+        assert_that(list(values), contains_exactly(2.0, 3.0, 4.0))
+        assert_that(len(samples), is_(3))
+        assert_that(samples.latest(), is_(4.0))
+
+    def test_GIVEN_samples_WHEN_value_at_time_between_THEN_interpolated(self):
+        samples = SampleBuffer()
+        samples.push(1.0, timestamp=10.0)
+        samples.push(3.0, timestamp=12.0)
+
+        assert_that(samples.at(11.0), is_(close_to(2.0, 1e-12)))
+        assert_that(samples.at(20.0), is_(3.0))
+
+    def test_GIVEN_empty_buffer_WHEN_latest_or_at_THEN_none(self):
+        samples = SampleBuffer()
+
+        assert_that(samples.latest(), is_(none()))
+        assert_that(samples.at(1.0), is_(none()))
+
+    def test_GIVEN_sample_pushed_from_another_thread_WHEN_wait_THEN_returns_true(self):
+        samples = SampleBuffer()
+        threading.Timer(0.01, samples.push, args=(1.0,)).start()
+
+        assert_that(samples.wait(timeout=5), is_(True))
+
+    def test_GIVEN_source_without_monitor_WHEN_watch_THEN_none(self):
+        assert_that(watch(Mock(spec=[]), SampleBuffer()), is_(none()))
+
+    def test_GIVEN_source_with_monitor_WHEN_watch_THEN_updates_pushed_into_buffer(self):
+        callbacks = []
+        source = Mock(monitor=lambda callback: callbacks.append(callback) or (lambda: None))
+        samples = SampleBuffer()
+
+        watch(source, samples)
+        callbacks[0](5.0)
+
+        assert_that(samples.latest(), is_(5.0))
@@ -1,9 +1,15 @@
 import math
 import unittest
 
+import numpy as np
 from hamcrest import *
+from mock import Mock
 
-from general.scans.monoid import Average
+from general.scans.detector import relative_error
+from general.scans.monoid import (Average, AverageArray, Exact, ListOfMonoids, MonoidList,
+                                  Polarisation, PolarisationArray, RunningBounds, Sum, SumArray,
+                                  monoid_array)
+from general.scans.scan_data import ScanData
 
 
 class TestMonoids(unittest.TestCase):
@@ -38,5 +44,214 @@ class TestMonoids(unittest.TestCase):
         assert_that(math.isnan(result), is_(True), "Is nan")
 
 
+class InPlaceTests(unittest.TestCase):
+    """
+    Tests for combining monoids in place
+    """
+
+    def test_GIVEN_average_WHEN_added_in_place_THEN_same_object_updated(self):
+        av = Average(1, 2)
+
+        result = av.add_in_place(Average(3, 4))
+
+        assert_that(result, is_(same_instance(av)))
+        assert_that((av.total, av.count), is_((4, 6)))
+
+    def test_GIVEN_polarisation_of_averages_WHEN_added_in_place_THEN_added_value_unchanged(self):
+        pol = Polarisation.zero()
+        added = Polarisation(Average(3, 1), Average(1, 1))
+
+        pol = pol.add_in_place(added)
+        pol = pol.add_in_place(added)
+
+        assert_that(float(pol), is_(0.5))
+        assert_that(added.ups.total, is_(3))
+
+    def test_GIVEN_monoid_list_WHEN_added_in_place_THEN_channels_updated(self):
+        lst = MonoidList([Sum(1), Average(2)])
+        channels = list(lst.values)
+
+        lst.add_in_place([1, Average(4)])
+
+        assert_that(lst.values[0], is_(same_instance(channels[0])))
+        assert_that(str(lst), is_("[2, 3.0]"))
+
+    def test_GIVEN_copy_WHEN_original_added_in_place_THEN_copy_unchanged(self):
+        pol = Polarisation(Average(3, 1), Average(1, 1))
+        copy = pol.copy()
+
+        pol.add_in_place(pol)
+
+        assert_that(copy.ups.total, is_(3))
+
+    def test_GIVEN_exact_WHEN_added_in_place_THEN_average_returned_as_with_add(self):
+        ex = Exact(1, 1)
+
+        ex = ex.add_in_place(Exact(1, 1))
+
+        assert_that(type(ex) is Average, is_(True))
+
+    def test_GIVEN_shared_monoids_WHEN_plus_equals_THEN_shared_unchanged(self):
+        x = Average(1.0)
+        lst = MonoidList([Sum(1), x])
+        a = Average(2.0)
+        b = a
+
+        lst += [0, -3]
+        b += Average(2.0)
+
+        assert_that(repr(x), is_("Average(1.0, count=1)"))
+        assert_that(repr(a), is_("Average(2.0, count=1)"))
+        assert_that(repr(b), is_("Average(4.0, count=2)"))
+        assert_that(repr(lst.values[1]), is_("Average(-2.0, count=2)"))
+
+    def test_GIVEN_copied_list_WHEN_added_in_place_THEN_shared_unchanged(self):
+        x = Average(1.0)
+        lst = MonoidList([Sum(1), x]).copy()
+
+        lst.add_in_place([0, -3])
+
+        assert_that(repr(x), is_("Average(1.0, count=1)"))
+
+    def test_GIVEN_scalar_monoid_WHEN_attribute_set_THEN_error(self):
+        def set_attribute():
+            Sum(1).unit = "counts"
+
+        assert_that(calling(set_attribute), raises(AttributeError))
+
+
+class MonoidArrayTests(unittest.TestCase):
+    """
+    Tests for the array-backed monoids
+    """
+
+    def _assert_matches(self, array, scalars):
+        np.testing.assert_allclose(array.floats(), [float(x) for x in scalars])
+        np.testing.assert_allclose(array.err(), [x.err() for x in scalars])
+
+    def test_GIVEN_average_array_WHEN_values_taken_THEN_same_as_scalar_averages(self):
+        scalars = [Average(0, 0), Average(1, 0), Average(0, 5), Average(10, 20), Average(7, 3)]
+
+        self._assert_matches(AverageArray.from_monoids(scalars), scalars)
+
+    def test_GIVEN_sum_array_WHEN_values_taken_THEN_same_as_scalar_sums(self):
+        scalars = [Sum(0), Sum(4), Sum(12.5)]
+
+        self._assert_matches(SumArray.from_monoids(scalars), scalars)
+
+    def test_GIVEN_polarisation_array_of_averages_WHEN_values_taken_THEN_same_as_scalar_polarisations(self):
+        scalars = [Polarisation(Average(30, 10), Average(10, 10)),
+                   Polarisation(Average(10, 10), Average(10, 10)),
+                   Polarisation(Average(0, 10), Average(0, 10)),
+                   Polarisation(Average(5, 10), Average(40, 12))]
+
+        array = PolarisationArray.from_monoids(scalars)
+
+        assert_that(array.ups, is_(instance_of(AverageArray)))
+        self._assert_matches(array, scalars)
+
+    def test_GIVEN_polarisation_array_of_counts_WHEN_values_taken_THEN_same_as_scalar_polarisations(self):
+        scalars = [Polarisation(30, 10), Polarisation(10, 10), Polarisation(0, 0)]
+
+        self._assert_matches(PolarisationArray([30, 10, 0], [10, 10, 0]), scalars)
+
+    def test_GIVEN_arrays_WHEN_added_THEN_same_as_adding_scalars(self):
+        first = [Average(1, 2), Average(3, 4)]
+        second = [Average(5, 6), Average(7, 8)]
+
+        total = 0 + AverageArray.from_monoids(first) + MonoidList(second)
+
+        assert_that(total, is_(instance_of(AverageArray)))
+        self._assert_matches(total, [a + b for a, b in zip(first, second)])
+
+    def test_GIVEN_polarisation_array_WHEN_added_in_place_THEN_same_as_adding(self):
+        array = PolarisationArray(AverageArray([3, 1], [1, 1]), AverageArray([1, 1], [1, 1]))
+        total = array + array
+
+        array = array.add_in_place(array.copy())
+
+        np.testing.assert_allclose(array.floats(), total.floats())
+        np.testing.assert_allclose(array.err(), total.err())
+
+    def test_GIVEN_array_type_WHEN_zero_taken_THEN_identity_for_any_length(self):
+        for array in [AverageArray([1, 2], [3, 4]), SumArray([1, 2, 3]),
+                      PolarisationArray(AverageArray([3, 1], [1, 1]), AverageArray([1, 1], [1, 1]))]:
+            zero = type(array).zero()
+
+            self._assert_matches(array + zero, array.to_monoids())
+            self._assert_matches(zero + array, array.to_monoids())
+            self._assert_matches(zero.add_in_place(array), array.to_monoids())
+            assert_that(list(array.zero_like().floats()), is_([0.0] * len(array)))
+
+    def test_GIVEN_array_WHEN_converted_to_monoids_THEN_scalars_returned(self):
+        array = monoid_array([Sum(1), Sum(2)])
+
+        assert_that(array, is_(instance_of(SumArray)))
+        assert_that([repr(x) for x in array.to_monoids()], contains_exactly("Sum(1.0)", "Sum(2.0)"))
+        assert_that(float(array.max()), is_(2.0))
+
+    def test_GIVEN_mixed_monoids_WHEN_converted_to_array_THEN_error(self):
+        assert_that(calling(monoid_array).with_args(MonoidList([Sum(1), Average(1)])), raises(TypeError))
+
+    def test_GIVEN_array_WHEN_recorded_in_scan_data_THEN_each_channel_stored(self):
+        data = ScanData()
+        array = AverageArray([10, 20], [10, 10])
+
+        data.append(0.0, array)
+
+        np.testing.assert_allclose(data.values(), [[1.0], [2.0]])
+        assert_that(relative_error(array), is_(close_to(float(np.sqrt(0.2)), 1e-9)))
+
+
+class RunningBoundsTests(unittest.TestCase):
+    """
+    Tests for keeping the range of a list of monoids up to date
+    """
+
+    def test_GIVEN_bounds_found_WHEN_points_added_THEN_points_not_checked_again(self):
+        rescan = Mock(return_value=(np.array([3.0, 5.0]), np.array([1.0, 2.0])))
+        bounds = RunningBounds(rescan)
+        bounds.max()
+
+        bounds.update(2, 7.0, 0.5)
+        bounds.update(0, 4.0, 1.5)
+
+        assert_that((bounds.min(), bounds.max()), is_((0.5, 7.0)))
+        assert_that(rescan.call_count, is_(1))
+
+    def test_GIVEN_largest_point_WHEN_it_falls_THEN_points_checked_again(self):
+        bounds = RunningBounds(lambda: (np.array([3.0, 4.0]), np.array([1.0, 2.0])))
+        bounds.update(1, 7.0, 2.0)
+        bounds.max()
+
+        bounds.update(1, 4.0, 2.0)
+
+        assert_that(bounds.max(), is_(4.0))
+
+    def test_GIVEN_list_of_monoids_WHEN_point_accumulated_THEN_range_follows(self):
+        ys = ListOfMonoids([Sum(4), Sum(16)])
+        assert_that(ys.max(), is_(20.0))
+
+        ys.append(Sum(36))
+        ys[2] += Sum(-35)
+        ys[0] += 5
+
+        assert_that((ys.min(), ys.max()), is_((0.0, 20.0)))
+
+    def test_GIVEN_list_of_monoid_lists_WHEN_range_found_THEN_every_channel_used(self):
+        ys = ListOfMonoids([MonoidList([Sum(4), Sum(9)])])
+        ys.append(MonoidList([Sum(0), Sum(1)]))
+
+        assert_that((ys.min(), ys.max()), is_((0.0, 12.0)))
+
+    def test_GIVEN_list_of_monoids_WHEN_point_removed_THEN_range_follows(self):
+        ys = ListOfMonoids([Sum(4), Sum(16)])
+        ys.max()
+
+        ys.pop()
+
+        assert_that(ys.max(), is_(6.0))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+from hamcrest import *
+from mock import Mock
+
+from general.scans.motion import Motion
+from general.scans.plan import ScanPlan
+from general.scans.scans import SimpleScan
+
+
+def _motion(name, low=None, high=None):
+    return Motion(Mock(return_value=0.0), Mock(), name, low=low, high=high)
+
+
+def _targets(plan):
+    return [[float(target) for _, target in point] for point in plan]
+
+
+class ScanPlanTests(unittest.TestCase):
+    """
+    Tests for compiling scans into flat plans
+    """
+
+    def setUp(self):
+        self.x = _motion("x", low=-10, high=10)
+        self.y = _motion("y", low=-10, high=10)
+
+    def test_GIVEN_product_WHEN_compile_THEN_outer_repeated_and_inner_tiled(self):
+        plan = ScanPlan.single(self.x, [0, 1]).product(ScanPlan.single(self.y, [5, 6, 7]))
+
+        assert_that(_targets(plan), contains_exactly([0, 5], [0, 6], [0, 7],
+                                                     [1, 5], [1, 6], [1, 7]))
+        assert_that(plan.targets.dtype.names, contains_exactly("x", "y"))
+
+    def test_GIVEN_serpentine_product_WHEN_compile_THEN_odd_rows_reversed(self):
+        plan = ScanPlan.single(self.x, [0, 1]).product(ScanPlan.single(self.y, [5, 6]),
+                                                       serpentine=True)
+
+        assert_that(_targets(plan), contains_exactly([0, 5], [0, 6], [1, 6], [1, 5]))
+
+    def test_GIVEN_sum_of_different_axes_WHEN_compile_THEN_unmoved_axes_left_out(self):
+        plan = ScanPlan.single(self.x, [0, 1]).concatenate(ScanPlan.single(self.y, [5]))
+
+        assert_that([[motion.title for motion, _ in point] for point in plan],
+                    contains_exactly(["x"], ["x"], ["y"]))
+        assert_that(plan.min(), is_((0.0, 5.0)))
+
+    def test_GIVEN_sum_over_separate_motions_of_one_block_WHEN_compile_THEN_one_axis(self):
+        scan = SimpleScan(self.x, np.array([0.0, 1.0]), None) + \
+            SimpleScan(_motion("x"), np.array([5.0]), None)
+
+        assert_that(scan.compile().targets.dtype.names, contains_exactly("x"))
+        assert_that((scan.min(), scan.max()), is_((0.0, 5.0)))
+
+    def test_GIVEN_sum_of_different_axes_WHEN_range_THEN_combined_as_numbers(self):
+        scan = SimpleScan(self.x, np.array([0.0, 1.0]), None) + \
+            SimpleScan(self.y, np.array([-5.0]), None)
+
+        assert_that((scan.min(), scan.max()), is_((-5.0, 1.0)))
+
+    def test_GIVEN_parallel_of_different_lengths_WHEN_compile_THEN_shorter_length_used(self):
+        plan = ScanPlan.single(self.x, [0, 1, 2]).parallel(ScanPlan.single(self.y, [5, 6]))
+
+        assert_that(len(plan), is_(2))
+        assert_that(plan.max(), is_((1.0, 6.0)))
+
+    def test_GIVEN_composite_scan_WHEN_compile_THEN_plan_matches_setpoints(self):
+        first = SimpleScan(self.x, np.array([0.0, 1.0]), None)
+        second = SimpleScan(self.y, np.array([2.0, 3.0]), None)
+        scan = (first * second).planned + (first & second).reverse
+
+        assert_that(_targets(scan.compile()),
+                    is_([[float(target) for _, target in point] for point in scan.setpoints()]))
+
+    def test_GIVEN_target_beyond_limit_WHEN_compile_THEN_error_before_moving(self):
+        scan = SimpleScan(self.x, np.array([0.0, 1.0]), None) * \
+            SimpleScan(self.y, np.array([5.0, 20.0]), None)
+
+        assert_that(calling(scan.compile),
+                    raises(RuntimeError, "Position 20.0 is above upper limit 10 of motor y"))
+        assert_that(calling(list).with_args(iter(scan)), raises(RuntimeError))
+        self.x.setter.assert_not_called()
+
+    def test_GIVEN_non_numeric_targets_WHEN_compile_THEN_error_names_axis_and_value(self):
+        scan = SimpleScan(self.x, np.array(["in", "out"]), None)
+
+        assert_that(calling(scan.compile),
+                    raises(ValueError, "Cannot plan the target 'in' of x"))
+        assert_that(scan._cached_plan(), is_(None))
+        assert_that(len(scan), is_(2))
+
+    def test_GIVEN_non_numeric_points_WHEN_compile_THEN_error_names_axis_and_value(self):
+        scan = SimpleScan(self.x, np.array([0.0]), None) + \
+            SimpleScan(self.y, np.array(["in"]), None)
+
+        assert_that(calling(ScanPlan.from_points).with_args(list(scan.setpoints())),
+                    raises(ValueError, "Cannot plan the target 'in' of y"))
+        assert_that(scan._cached_plan(), is_(None))
+
+    def test_GIVEN_array_of_positions_WHEN_accessible_THEN_furthest_position_reported(self):
+        assert_that(self.x.accessible(np.array([0, -12, -11])),
+                    is_((False, "Position -12.0 is below lower limit -10 of motor x")))
+        assert_that(self.x.accessible(np.array([0, 5]))[0], is_(True))
@@ -0,0 +1,56 @@
+import unittest
+
+from hamcrest import *
+from mock import Mock
+
+from general.scans.motion import Motion
+from general.scans.planner import axis_velocity, serpentine, travel_order
+
+
+def _motion(name, velocity=None):
+    return Motion(Mock(return_value=0.0), Mock(), name,
+                  velocity_getter=None if velocity is None else (lambda: velocity))
+
+
+class PlannerTests(unittest.TestCase):
+    """
+    Tests for planning the order of scan points
+    """
+
+    def test_GIVEN_motion_without_velocity_WHEN_get_axis_velocity_THEN_default_used(self):
+        assert_that(axis_velocity(_motion("x")), is_(1.0))
+
+    def test_GIVEN_outer_and_inner_points_WHEN_serpentine_THEN_inner_alternates_direction(self):
+        outer, inner = _motion("outer"), _motion("inner")
+
+        points = serpentine([[(outer, 0)], [(outer, 1)], [(outer, 2)]],
+                            [[(inner, 5)], [(inner, 6)]])
+
+        assert_that([[target for _, target in point] for point in points],
+                    contains_exactly([0, 5], [0, 6], [1, 6], [1, 5], [2, 5], [2, 6]))
+
+    def test_GIVEN_points_out_of_order_WHEN_travel_order_THEN_points_visited_by_distance(self):
+        x = _motion("x")
+        points = [[(x, value)] for value in [0, 3, 1, 4, 2]]
+
+        assert_that(travel_order(points, start=[0]), contains_exactly(0, 2, 4, 1, 3))
+
+    def test_GIVEN_motor_at_far_end_WHEN_travel_order_THEN_scan_runs_backwards(self):
+        x = _motion("x")
+        points = [[(x, value)] for value in [0, 1, 2, 3]]
+
+        assert_that(travel_order(points, start=[3]), contains_exactly(3, 2, 1, 0))
+
+    def test_GIVEN_slow_axis_WHEN_travel_order_THEN_slow_axis_moved_least(self):
+        slow, fast = _motion("slow", velocity=0.1), _motion("fast", velocity=10.0)
+        points = [[(slow, s), (fast, f)] for s, f in [(0, 0), (1, 0), (0, 5), (1, 5)]]
+
+        order = travel_order(points, start=[0, 0])
+
+        assert_that([points[i][0][1] for i in order], contains_exactly(0, 0, 1, 1))
+
+    def test_GIVEN_points_on_different_axes_WHEN_travel_order_THEN_original_order_kept(self):
+        x, y = _motion("x"), _motion("y")
+        points = [[(x, 2)], [(y, 0)], [(x, 1)]]
+
+        assert_that(travel_order(points), contains_exactly(0, 1, 2))
@@ -141,6 +141,64 @@ class PlotFunctionsTests(unittest.TestCase):
         assert_that(settings, has_entry("color", expected_colour))
 
 
+class IncrementalPlotFunctionsTests(unittest.TestCase):
+    """
+    Tests for plotting incrementally, where artists are created once and updated in place
+    """
+
+    def setUp(self) -> None:
+        import matplotlib.pyplot as plt
+        self.figure, axis = plt.subplots()
+        self.axis = Mock(wraps=axis)
+        self.plot_functions = PlotFunctions(incremental=True)
+        self.plot_functions.set_figure_and_axis(self.figure, self.axis)
+
+    def tearDown(self) -> None:
+        import matplotlib.pyplot as plt
+        plt.close(self.figure)
+
+    def _plot_points(self, count):
+        xs = []
+        ys = ListOfMonoids()
+        for index in range(count):
+            xs.append(float(index))
+            ys.append(Average(index + 1.0, 1.0))
+            self.plot_functions.setup_plot(0, count, "x")
+            self.plot_functions.plot_data_with_errors(xs, ys)
+        return xs, ys
+
+    def test_GIVEN_incremental_WHEN_many_points_plotted_THEN_errorbar_created_once_and_axis_cleared_once(self):
+        self._plot_points(5)
+
+        assert_that(self.axis.errorbar.call_count, is_(1))
+        assert_that(self.axis.clear.call_count, is_(1))
+
+    def test_GIVEN_incremental_WHEN_points_plotted_THEN_artist_holds_all_points_and_errors(self):
+        xs, ys = self._plot_points(4)
+
+        data_line, _, (bars,) = self.plot_functions._data_series[0].lines
+        assert_that(list(data_line.get_xdata()), contains_exactly(*xs))
+        assert_that(list(data_line.get_ydata()), contains_exactly(*ys.values()))
+        segments = bars.get_segments()
+        assert_that(len(segments), is_(4))
+        assert_that(segments[-1][1][1], is_(close_to(ys.values()[-1] + ys.err()[-1], 1e-6)))
+
+    def test_GIVEN_incremental_WHEN_fit_plotted_twice_THEN_one_fit_line_updated(self):
+        self._plot_points(2)
+        self.plot_functions.plot_fit(np.array([0.0, 1.0]), np.array([1.0, 2.0]), "first")
+        self.plot_functions.plot_fit(np.array([0.0, 1.0]), np.array([3.0, 4.0]), "second")
+
+        assert_that(self.axis.plot.call_count, is_(1))
+        assert_that(list(self.plot_functions._fit_lines[0].get_ydata()), contains_exactly(3.0, 4.0))
+
+    def test_GIVEN_incremental_WHEN_new_figure_set_THEN_artists_recreated(self):
+        self._plot_points(2)
+        self.plot_functions.set_figure_and_axis(self.figure, self.axis)
+        self._plot_points(2)
+
+        assert_that(self.axis.errorbar.call_count, is_(2))
+
+
 if __name__ == '__main__':
     unittest.main()
 
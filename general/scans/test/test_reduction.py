@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+from hamcrest import *
+
+from general.scans.monoid import (Average, AverageArray, MonoidList, Polarisation,
+                                  PolarisationArray, Sum)
+from general.scans.reduction import combine, fold
+
+
+class FoldTests(unittest.TestCase):
+    """
+    Tests for combining monoids on a single thread
+    """
+
+    def test_GIVEN_averages_WHEN_folded_THEN_same_as_adding(self):
+        monoids = [Average(i, i + 1) for i in range(10)]
+
+        total = fold(monoids)
+
+        assert_that((total.total, total.count), is_((45, 55)))
+
+    def test_GIVEN_polarisations_of_averages_WHEN_folded_THEN_same_as_adding(self):
+        monoids = [Polarisation(Average(i, 2), Average(2 * i, 3)) for i in range(10)]
+
+        total = fold(monoids)
+
+        expected = sum(monoids)
+        assert_that(float(total), is_(close_to(float(expected), 1e-12)))
+        assert_that(total.err(), is_(close_to(expected.err(), 1e-12)))
+
+    def test_GIVEN_mixed_monoids_WHEN_folded_THEN_inputs_unchanged(self):
+        first = MonoidList([Sum(1), Average(2)])
+        monoids = [first, MonoidList([Sum(1), Average(2)]), 0]
+
+        total = fold(monoids)
+
+        assert_that(str(total), is_("[2, 2.0]"))
+        assert_that(str(first), is_("[1, 2.0]"))
+
+    def test_GIVEN_nothing_WHEN_folded_THEN_zero(self):
+        assert_that(fold([]), is_(0))
+
+
+class CombineTests(unittest.TestCase):
+    """
+    Tests for the parallel tree reduction of monoids
+    """
+
+    def test_GIVEN_many_sums_WHEN_combined_on_threads_THEN_same_as_adding(self):
+        total = combine([Sum(x) for x in range(1001)], workers=4, chunk_size=10)
+
+        assert_that(total.total, is_(500500))
+
+    def test_GIVEN_polarisation_arrays_WHEN_combined_on_processes_THEN_same_as_adding(self):
+        monoids = [PolarisationArray(AverageArray(np.arange(4.0) + i, 1), AverageArray(np.arange(4.0), 1))
+                   for i in range(20)]
+
+        total = combine(monoids, workers=2, chunk_size=3, processes=True)
+
+        expected = sum(monoids)
+        np.testing.assert_allclose(total.floats(), expected.floats())
+        np.testing.assert_allclose(total.err(), expected.err())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+from hamcrest import *
+from mock import patch
+
+from general.scans.monoid import Average
+from general.scans.render import Renderer, BackgroundRenderer
+from general.scans.scan_data import ScanData
+
+
+class RendererTests(unittest.TestCase):
+    """
+    Tests for the renderer that plots in the acquisition loop
+    """
+
+    def test_GIVEN_update_WHEN_submitted_THEN_run_immediately_with_previous_result(self):
+        calls = []
+
+        def update(data, previous):
+            calls.append((data, previous))
+            return data
+
+        with Renderer() as renderer:
+            renderer.submit(update, 1)
+            renderer.submit(update, 2)
+
+        assert_that(calls, contains_exactly((1, None), (2, 1)))
+        assert_that(renderer.result, is_(2))
+
+
+class BackgroundRendererTests(unittest.TestCase):
+    """
+    Tests for the renderer that plots on a background thread
+    """
+
+    def test_GIVEN_slow_updates_WHEN_many_submitted_THEN_submit_does_not_wait_and_updates_coalesce(self):
+        release = threading.Event()
+        calls = []
+
+        def update(data, previous):
+            release.wait()
+            calls.append(data)
+            return data
+
+        renderer = BackgroundRenderer(max_fps=1000)
+        started = time.time()
+        for index in range(50):
+            renderer.submit(update, index)
+        elapsed = time.time() - started
+        release.set()
+        result = renderer.close()
+
+        assert_that(elapsed, is_(less_than(0.5)))
+        assert_that(len(calls), is_(less_than(50)))
+        assert_that(calls[-1], is_(49))
+        assert_that(result, is_(49))
+
+    def test_GIVEN_max_fps_WHEN_updates_submitted_THEN_updates_are_spaced_out(self):
+        times = []
+
+        def update(data, previous):
+            times.append(time.time())
+
+        renderer = BackgroundRenderer(max_fps=20)
+        for index in range(3):
+            renderer.submit(update, index)
+            time.sleep(0.06)
+        renderer.close()
+
+        assert_that(np.min(np.diff(times)), is_(greater_than_or_equal_to(0.045)))
+
+    def test_GIVEN_update_raises_WHEN_later_update_submitted_THEN_it_still_runs(self):
+        def broken(data, previous):
+            raise ValueError("broken")
+
+        def working(data, previous):
+            return "fine"
+
+        renderer = BackgroundRenderer(max_fps=1000)
+        renderer.submit(broken, None)
+        time.sleep(0.05)
+        renderer.submit(working, None)
+
+        assert_that(renderer.close(), is_("fine"))
+
+    def _blocked_update(self, seen, read):
+        """An update which records what it reads, then waits to be released"""
+        entered = threading.Event()
+        release = threading.Event()
+
+        def update(data, previous):
+            seen.append(read(data))
+            entered.set()
+            release.wait()
+        return update, entered, release
+
+    def test_GIVEN_scan_data_WHEN_submitted_THEN_update_sees_copy_unaffected_by_later_points(self):
+        seen = []
+        update, entered, release = self._blocked_update(seen, len)
+        data = ScanData()
+        data.append(0.0, Average(1, 1))
+        renderer = BackgroundRenderer(max_fps=1000)
+
+        with renderer.changing():
+            renderer.submit(update, data)
+            data.append(1.0, Average(1, 1))
+        entered.wait(5)
+        with renderer.changing():
+            data.append(2.0, Average(1, 1))
+        release.set()
+        renderer.close()
+
+        assert_that(seen, contains_exactly(2))
+
+    def test_GIVEN_grid_of_monoids_WHEN_submitted_THEN_update_sees_cells_unaffected_by_later_counts(self):
+        seen = []
+        update, entered, release = self._blocked_update(seen, lambda data: data[0, 0])
+        grid = np.empty((1, 1), dtype=object)
+        grid[0, 0] = Average(1, 1)
+        renderer = BackgroundRenderer(max_fps=1000)
+
+        renderer.submit(update, grid)
+        entered.wait(5)
+        with renderer.changing():
+            grid[0, 0] = grid[0, 0].add_in_place(Average(1, 1))
+        release.set()
+        renderer.close()
+
+        assert_that(seen[0].total, is_(1))
+
+    def test_GIVEN_slow_updates_WHEN_many_points_submitted_THEN_data_copied_once_per_frame(self):
+        seen = []
+        update, entered, release = self._blocked_update(seen, len)
+        data = ScanData()
+        renderer = BackgroundRenderer(max_fps=1000)
+
+        with patch.object(ScanData, "snapshot", autospec=True,
+                          side_effect=lambda self: list(range(len(self)))) as snapshot:
+            for index in range(50):
+                with renderer.changing():
+                    data.append(float(index), Average(1, 1))
+                renderer.submit(update, data)
+                entered.wait(5)
+            release.set()
+            renderer.close()
+
+        assert_that(snapshot.call_count, is_(len(seen)))
+        assert_that(snapshot.call_count, is_(less_than_or_equal_to(2)))
+        assert_that(seen[-1], is_(50))
+
+
+class CreateRendererTests(unittest.TestCase):
+    """
+    Tests for choosing the renderer from the instrument defaults
+    """
+
+    def test_GIVEN_no_render_fps_WHEN_renderer_created_THEN_plots_in_loop(self):
+        from general.scans.test.test_scans import TestDefaults
+
+        renderer = TestDefaults().create_renderer()
+
+        assert_that(renderer, is_(instance_of(Renderer)))
+        assert_that(renderer, is_not(instance_of(BackgroundRenderer)))
+
+    def test_GIVEN_render_fps_WHEN_renderer_created_THEN_plots_in_background(self):
+        from general.scans.test.test_scans import TestDefaults
+        defaults = TestDefaults()
+        defaults.RENDER_FPS = 10
+
+        with defaults.create_renderer() as renderer:
+            assert_that(renderer, is_(instance_of(BackgroundRenderer)))
+            assert_that(renderer.min_interval, is_(close_to(0.1, 1e-9)))
+
+
+if __name__ == '__main__':
+    unittest.main()
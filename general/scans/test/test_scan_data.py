@@ -0,0 +1,181 @@
+import unittest
+
+import numpy as np
+from hamcrest import *
+
+from general.scans.monoid import Average, Exact, MonoidList, Sum
+from general.scans.scan_data import ScanData, BinnedData, CycleHistory
+
+
+class ScanDataTests(unittest.TestCase):
+    """
+    Tests for the columnar scan data store
+    """
+
+    def test_GIVEN_points_WHEN_appended_THEN_positions_values_and_errors_match_monoids(self):
+        data = ScanData()
+        monoids = [Average(4, 2), Average(9, 3), Average(1, 1)]
+        for position, monoid in zip([0.1, 0.2, 0.3], monoids):
+            data.append(position, monoid)
+
+        assert_that(list(data.positions()), contains_exactly(0.1, 0.2, 0.3))
+        assert_that(list(data.values()), contains_exactly(*[float(x) for x in monoids]))
+        assert_that(list(data.err()), contains_exactly(*[x.err() for x in monoids]))
+        assert_that(list(data.totals()), contains_exactly(4, 9, 1))
+        assert_that(list(data.counts()), contains_exactly(2, 3, 1))
+
+    def test_GIVEN_point_WHEN_accumulated_THEN_cached_value_and_raw_columns_updated(self):
+        data = ScanData()
+        data.append(0.1, Average(4, 2))
+        data.accumulate(0, Average(2, 1))
+
+        assert_that(data.values()[0], is_(2.0))
+        assert_that(data.totals()[0], is_(6))
+        assert_that(data.counts()[0], is_(3))
+        assert_that(len(data), is_(1))
+
+    def test_GIVEN_more_points_than_capacity_WHEN_appended_THEN_store_grows_and_keeps_points(self):
+        data = ScanData(capacity=2)
+        for index in range(10):
+            data.append(float(index), Average(index, 1))
+
+        assert_that(list(data.positions()), contains_exactly(*[float(i) for i in range(10)]))
+        assert_that(list(data.values()), contains_exactly(*[float(i) for i in range(10)]))
+        assert_that(data[9].total, is_(9))
+
+    def test_GIVEN_monoid_lists_WHEN_appended_THEN_values_have_a_row_per_channel(self):
+        data = ScanData()
+        data.append(0.0, MonoidList([Average(1, 1), Average(2, 1)]))
+        data.append(1.0, MonoidList([Average(3, 1), Average(4, 1)]))
+
+        assert_that(data.values().shape, is_((2, 2)))
+        assert_that(list(data.values()[1]), contains_exactly(2.0, 4.0))
+        assert_that(isinstance(data[0], MonoidList), is_(True))
+
+    def test_GIVEN_sum_monoid_WHEN_appended_THEN_count_is_nan(self):
+        data = ScanData()
+        data.append(0.0, Sum(4))
+
+        assert_that(np.isnan(data.counts()[0]), is_(True))
+        assert_that(data.totals()[0], is_(4))
+
+    def test_GIVEN_points_WHEN_min_and_max_THEN_include_uncertainty(self):
+        data = ScanData()
+        data.append(0.0, Sum(4))
+        data.append(1.0, Sum(16))
+
+        assert_that(data.min(), is_(2.0))
+        assert_that(data.max(), is_(20.0))
+
+    def test_GIVEN_snapshot_WHEN_point_accumulated_THEN_snapshot_and_measurement_unchanged(self):
+        data = ScanData()
+        measured = Average(4, 2)
+        data.append(0.1, measured)
+        copy = data.snapshot()
+
+        data.accumulate(0, Average(2, 1))
+        data.accumulate(0, Average(2, 1))
+
+        assert_that(copy[0].total, is_(4))
+        assert_that(measured.total, is_(4))
+        assert_that(data[0].total, is_(8))
+
+    def test_GIVEN_largest_point_WHEN_accumulated_lower_THEN_max_found_again(self):
+        data = ScanData()
+        data.append(0.0, Sum(4))
+        data.append(1.0, Sum(16))
+        assert_that(data.max(), is_(20.0))
+
+        data.accumulate(1, Sum(-12))
+
+        assert_that(data.max(), is_(6.0))
+        assert_that(data.min(), is_(2.0))
+
+    def test_GIVEN_empty_store_WHEN_checked_THEN_falsy(self):
+        assert_that(bool(ScanData()), is_(False))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class BinnedDataTests(unittest.TestCase):
+    """
+    Tests for binning the samples of continuous scans
+    """
+
+    def test_GIVEN_samples_in_same_bin_WHEN_added_THEN_averaged_into_one_point(self):
+        data = BinnedData(0, 10, 5)
+        data.add(0.5, Exact(2))
+        data.add(1.5, Exact(4))
+
+        assert_that(list(data.positions()), contains_exactly(1.0))
+        assert_that(list(data.values()[0]), contains_exactly(3.0))
+        assert_that(len(data), is_(1))
+
+    def test_GIVEN_samples_in_both_directions_WHEN_added_THEN_kept_in_separate_rows(self):
+        data = BinnedData(0, 10, 5)
+        data.add(5.0, Exact(2), forwards=True)
+        data.add(5.0, Exact(6), forwards=False)
+        data.add(9.0, Exact(1), forwards=False)
+
+        values = data.values()
+        assert_that(values[0][0], is_(2.0))
+        assert_that(np.isnan(values[0][1]), is_(True))
+        assert_that(list(values[1]), contains_exactly(6.0, 1.0))
+        assert_that(data[0], instance_of(MonoidList))
+
+    def test_GIVEN_many_samples_WHEN_added_THEN_size_bounded_by_bins(self):
+        data = BinnedData.with_width(0, 10, 2.5)
+        for position in np.linspace(-1, 11, 1000):
+            data.add(position, Exact(1))
+
+        assert_that(len(data), is_(4))
+        assert_that(data.counts().sum(), is_(less_than(1000)))
+
+    def test_GIVEN_position_at_top_edge_WHEN_added_THEN_in_last_bin(self):
+        data = BinnedData(0, 10, 5)
+
+        assert_that(data.add(10.0, Exact(1)), is_(4))
+        assert_that(data.add(10.5, Exact(1)), is_(none()))
+
+    def test_GIVEN_snapshot_WHEN_more_samples_added_THEN_snapshot_unchanged(self):
+        data = BinnedData(0, 10, 5)
+        data.add(1.0, Exact(1))
+        copy = data.snapshot()
+        data.add(9.0, Exact(1))
+
+        assert_that(len(copy), is_(1))
+
+
+class CycleHistoryTests(unittest.TestCase):
+    """
+    Tests for the rotating history of repeated scans
+    """
+
+    def _run(self, history, cycles):
+        for cycle in range(cycles):
+            for point in range(history.points):
+                history.record(point, Average(cycle + point, 1))
+            history.end_cycle()
+
+    def test_GIVEN_fewer_cycles_than_capacity_WHEN_read_THEN_all_cycles_oldest_first(self):
+        history = CycleHistory(2, cycles=5)
+        self._run(history, 3)
+
+        assert_that(history.values().tolist(), is_([[0, 1], [1, 2], [2, 3]]))
+
+    def test_GIVEN_more_cycles_than_capacity_WHEN_read_THEN_only_latest_kept(self):
+        history = CycleHistory(2, cycles=2)
+        self._run(history, 5)
+
+        assert_that(len(history), is_(2))
+        assert_that(history.completed, is_(5))
+        assert_that(list(history.trend()), contains_exactly(3.5, 4.5))
+
+    def test_GIVEN_cycle_in_progress_WHEN_read_THEN_only_completed_cycles_returned(self):
+        history = CycleHistory(2, cycles=2)
+        self._run(history, 2)
+        history.record(0, Average(9, 1))
+
+        assert_that(history.values().tolist(), is_([[0, 1], [1, 2]]))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from hamcrest import *
+from mock import Mock
+
+from general.scans.monoid import Average, Exact
+from general.scans.scan_log import ScanLog, load_points, load_sidecar, sidecar_path
+from general.scans.test.test_scans import TestDefaults
+
+
+class ScanLogTests(unittest.TestCase):
+    """
+    Tests for the buffered scan log writer
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "scan.dat")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _read(self):
+        with open(self.filename) as infile:
+            return infile.read()
+
+    def test_GIVEN_rows_below_threshold_WHEN_written_THEN_nothing_on_disk_until_log_closed(self):
+        with ScanLog(self.filename, flush_rows=10, flush_seconds=1000) as log:
+            log.write("a\n")
+            log.write("b\n")
+            assert_that(self._read(), is_(""))
+
+        assert_that(self._read(), is_("a\nb\n"))
+
+    def test_GIVEN_rows_reach_threshold_WHEN_written_THEN_flushed(self):
+        with ScanLog(self.filename, flush_rows=2, flush_seconds=1000) as log:
+            log.write("a\n")
+            log.write("b\n")
+            assert_that(self._read(), is_("a\nb\n"))
+
+    def test_GIVEN_scan_interrupted_WHEN_leaving_log_THEN_buffered_rows_are_written(self):
+        try:
+            with ScanLog(self.filename, flush_rows=10, flush_seconds=1000) as log:
+                log.write("a\n")
+                log.record(0.1, Average(4, 2))
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+
+        assert_that(self._read(), is_("a\n"))
+        assert_that(len(load_sidecar(sidecar_path(self.filename))), is_(1))
+
+    def test_GIVEN_repeated_positions_WHEN_points_loaded_THEN_raw_totals_and_counts_are_combined(self):
+        with ScanLog(self.filename) as log:
+            log.record(0.2, Average(4, 2))
+            log.record(0.1, Average(3, 7))
+            log.record(0.2, Average(5, 1))
+
+        xs, ys = load_points(sidecar_path(self.filename))
+
+        assert_that(list(xs), contains_exactly(0.2, 0.1))
+        assert_that([(y.total, y.count) for y in ys], contains_exactly((9, 3), (3, 7)))
+
+    def test_GIVEN_exact_measurements_WHEN_points_loaded_THEN_points_are_exact(self):
+        with ScanLog(self.filename) as log:
+            log.record(0.1, Exact(4))
+
+        _, ys = load_points(sidecar_path(self.filename))
+
+        assert_that(ys[0], is_(instance_of(Exact)))
+        assert_that(float(ys[0]), is_(4.0))
+
+    def test_GIVEN_log_with_sidecar_WHEN_last_scan_replayed_THEN_points_are_exact(self):
+        with ScanLog(self.filename) as log:
+            log.write("Theta (deg)\tIntensity\tUncertainty\n")
+            log.write("0.1\t2.0\t1.22\n")
+            log.record(0.1, Average(4, 2))
+
+        scan = TestDefaults().last_scan(path=self.filename)
+
+        assert_that(scan.ys[0].total, is_(4))
+        assert_that(scan.ys[0].count, is_(2))
+        assert_that(scan.axis, is_("Theta (deg)"))
+
+
+if __name__ == '__main__':
+    unittest.main()
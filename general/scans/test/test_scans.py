@@ -4,7 +4,8 @@ import unittest
 from contextlib import contextmanager
 from unittest.mock import MagicMock
 
-from general.scans.scans import SimpleScan, ReplayScan
+from general.scans.scans import (SimpleScan, ReplayScan, ContinuousScan,
+                                 ContinuousMove, ForeverScan, _GridAxis)
 from hamcrest import *
 from mock import Mock, patch, mock_open
 
@@ -12,6 +13,9 @@ from general.scans.defaults import Defaults
 from general.scans.monoid import Average
 from general.scans.motion import Motion
 import os
+import tempfile
+
+import numpy as np
 
 from parameterized import parameterized
 
@@ -82,7 +86,8 @@ def fake_block_server_and_get_pv(block_and_value):
     """
     block_history = []
     with patch("general.scans.motion.g.get_pv") as get_pv, \
-            patch("general.scans.motion.g.adv.get_pv_from_block") as get_pv_from_block, \
+            patch("general.scans.motion.g.adv.get_pv_from_block") \
+            as get_pv_from_block, \
             patch("general.scans.motion.g._genie_api") as api, \
             patch("general.scans.motion.g.get_blocks") as get_blocks, \
             patch("general.scans.motion.g.cget") as cget, \
@@ -111,6 +116,26 @@ def fake_block_server_and_get_pv(block_and_value):
         yield block_history
 
 
+@contextmanager
+def _plotting():
+    """
+    Context for plotting a scan, with the log in a temporary directory and
+    the DAE waiting in SETUP
+
+    Returns
+    -------
+    the log directory
+    """
+    with tempfile.TemporaryDirectory() as log_dir, \
+            patch("general.scans.defaults.g.get_script_dir",
+                  return_value=log_dir), \
+            patch("general.scans.scans.g.get_runstate",
+                  return_value="SETUP"), \
+            patch("general.scans.detector.g.get_runstate",
+                  return_value="SETUP"):
+        yield log_dir
+
+
 class TestScans(unittest.TestCase):
 
     @patch("general.scans.defaults.g.get_script_dir", return_value="")
@@ -255,6 +280,530 @@ class TestScans(unittest.TestCase):
                         raises(ValueError, "No previous scans in dir (.*)"))
 
 
+    def test_GIVEN_noisy_readback_WHEN_plot_and_back_THEN_repeats_merged(self):
+        myscan = TestDefaults()
+        position = {"value": 0.0}
+
+        def setter(x):
+            position["value"] = x + 1e-8
+
+        motion = Motion(lambda: position["value"], setter, "noisy",
+                        tolerance_getter=lambda: 1e-3)
+        scan = SimpleScan(motion, np.array([0.1, 0.2, 0.3]), myscan).and_back
+        captured = {}
+
+        def action(xs, ys, plot_functions, remainder):
+            captured["xs"] = list(xs)
+            captured["ys"] = [y.count for y in ys]
+
+        with _plotting():
+            scan.plot(action=action, frames=1)
+
+        assert_that(captured["xs"], has_length(3))
+        assert_that(captured["ys"], contains_exactly(2, 2, 2))
+
+    def test_GIVEN_nan_readback_WHEN_plot_THEN_kept_as_own_point(self):
+        myscan = TestDefaults()
+        position = {"value": 0.0}
+
+        def setter(x):
+            position["value"] = np.nan if x == 0.2 else x
+
+        motion = Motion(lambda: position["value"], setter, "disconnected",
+                        tolerance_getter=lambda: 1e-3)
+        scan = SimpleScan(motion, np.array([0.1, 0.2, 0.3, 0.2]), myscan)
+        captured = {}
+
+        def action(xs, ys, plot_functions, remainder):
+            captured["xs"] = list(xs)
+
+        with _plotting():
+            scan.plot(action=action, frames=1)
+
+        assert_that(captured["xs"], has_length(4))
+        assert_that(np.isnan(captured["xs"]).sum(), is_(2))
+
+    def test_GIVEN_drifting_forever_scan_WHEN_plot_THEN_cycles_folded(self):
+        myscan = TestDefaults()
+        position = {"value": 0.0, "drift": 0.0}
+        calls = []
+
+        def setter(x):
+            position["value"] = x + position["drift"]
+
+        def detector(acc, **kwargs):
+            calls.append(position["value"])
+            if len(calls) == 11:
+                raise KeyboardInterrupt()
+            if len(calls) % 3 == 0:
+                position["drift"] += 0.01
+            return acc, Average((len(calls) - 1) // 3 + 1, 1)
+
+        myscan.detector = detector
+        motion = Motion(lambda: position["value"], setter, "drifting",
+                        tolerance_getter=lambda: 1e-3)
+        scan = SimpleScan(motion, np.array([0.1, 0.2, 0.3]), myscan).forever
+        captured = {}
+
+        def action(xs, ys, plot_functions, remainder):
+            captured["xs"] = list(xs)
+
+        with _plotting():
+            assert_that(calling(scan.plot).with_args(action=action, frames=1),
+                        raises(KeyboardInterrupt))
+
+        assert_that(captured["xs"], has_length(3))
+        assert_that(len(scan.history), is_(3))
+        assert_that(list(scan.history.trend()),
+                    contains_exactly(1.0, 2.0, 3.0))
+
+    def test_GIVEN_drifting_forever_and_back_WHEN_plot_THEN_size_bounded(self):
+        myscan = TestDefaults()
+        position = {"value": 0.0, "drift": 0.0}
+        calls = []
+        scan = None
+
+        def setter(x):
+            position["value"] = x + position["drift"]
+
+        def detector(acc, **kwargs):
+            calls.append(position["value"])
+            if len(calls) == 8 * len(scan.scan):
+                raise KeyboardInterrupt()
+            if len(calls) % len(scan.scan) == 0:
+                position["drift"] += 0.01
+            return acc, Average(1, 1)
+
+        myscan.detector = detector
+        motion = Motion(lambda: position["value"], setter, "drifting",
+                        tolerance_getter=lambda: 1e-3)
+        values = SimpleScan(motion, np.array([0.1, 0.2, 0.3]), myscan)
+        scan = ForeverScan(values.and_back, history=2)
+        captured = {}
+
+        def action(xs, ys, plot_functions, remainder):
+            captured["xs"] = list(xs)
+
+        with _plotting():
+            assert_that(calling(scan.plot).with_args(action=action, frames=1),
+                        raises(KeyboardInterrupt))
+
+        assert_that(captured["xs"], has_length(3))
+        assert_that(scan.history.values(), has_length(2))
+
+
+class GridAxisTests(unittest.TestCase):
+    """
+    Tests for finding the cell of a two dimensional scan
+    """
+
+    def test_GIVEN_position_off_centre_WHEN_locate_THEN_nearest_cell(self):
+        axis = _GridAxis([0.0, 1.0, 2.0], 0.01)
+
+        assert_that([axis.locate(x) for x in [-3.0, 0.4, 0.6, 1.0, 9.0]],
+                    contains_exactly(0, 0, 1, 1, 2))
+
+    def test_GIVEN_one_point_axis_WHEN_locate_off_target_THEN_first_cell(self):
+        axis = _GridAxis([1.0], 0.01)
+
+        assert_that([axis.locate(x) for x in [0.5, 1.0, 1.5]],
+                    contains_exactly(0, 0, 0))
+
+
+class ProductScanPlotTests(unittest.TestCase):
+    """
+    Tests for plotting two dimensional scans
+    """
+
+    def setUp(self):
+        import matplotlib.pyplot as plt
+        self.figure, self.real_axis = plt.subplots()
+        self.axis = Mock(wraps=self.real_axis)
+        self.defaults = TestDefaults()
+        self.defaults.get_fig = Mock(return_value=(self.figure, self.axis))
+        self.blocks = {"outer": 0.0, "inner": 0.0}
+
+    def tearDown(self):
+        import matplotlib.pyplot as plt
+        plt.close(self.figure)
+
+    def _motion(self, name):
+        return Motion(lambda: self.blocks[name],
+                      lambda x: self.blocks.__setitem__(name, x), name)
+
+    def _scan(self, name, values):
+        return SimpleScan(self._motion(name), np.array(values), self.defaults)
+
+    def _plot(self, scan, **kwargs):
+        with _plotting():
+            return scan.plot(frames=1, **kwargs)
+
+    def test_GIVEN_product_scan_WHEN_plot_THEN_one_mesh_cell_per_point(self):
+        outer = self._scan("outer", [0.0, 1.0, 2.0])
+        inner = self._scan("inner", [5.0, 6.0])
+
+        self._plot(outer * inner)
+
+        self.axis.pcolormesh.assert_called_once()
+        mesh = self.real_axis.collections[0]
+        assert_that(np.ma.count(mesh.get_array()), is_(6))
+
+    def test_GIVEN_parallel_outer_WHEN_plot_THEN_rows_follow_first_axis(self):
+        self.blocks["other"] = 0.0
+        outer = self._scan("outer", [0.0, 1.0]) & \
+            self._scan("other", [10.0, 20.0])
+        inner = self._scan("inner", [5.0, 6.0, 7.0])
+        captured = {}
+
+        def action(xs, cells, axis, remainder):
+            captured["xs"] = xs
+            captured["cells"] = cells
+
+        self._plot(outer * inner, action=action)
+
+        assert_that(list(captured["xs"]), contains_exactly(5.0, 6.0, 7.0))
+        assert_that([cell.count for cell in captured["cells"].ravel()],
+                    contains_exactly(*[1] * 6))
+
+    def test_GIVEN_repeated_inner_points_WHEN_plot_THEN_cells_summed(self):
+        outer = self._scan("outer", [0.0, 1.0])
+        inner = self._scan("inner", [5.0, 6.0])
+        captured = {}
+
+        def action(xs, cells, axis, remainder):
+            captured["cells"] = cells
+
+        self._plot(outer * inner.and_back, action=action)
+
+        assert_that([cell.count for cell in captured["cells"].ravel()],
+                    contains_exactly(2, 2, 2, 2))
+
+    def test_GIVEN_redraw_every_WHEN_plot_THEN_action_every_n_and_at_end(self):
+        outer = self._scan("outer", [0.0, 1.0, 2.0])
+        inner = self._scan("inner", [5.0, 6.0, 7.0])
+        action = Mock()
+
+        self._plot(outer * inner, action=action, redraw_every=4)
+
+        assert_that(action.call_count, is_(3))
+
+    def test_GIVEN_action_WHEN_plot_THEN_remainder_passed_and_finished(self):
+        outer = self._scan("outer", [0.0, 1.0])
+        inner = self._scan("inner", [5.0, 6.0])
+        remainders = []
+
+        def action(xs, cells, axis, remainder):
+            remainders.append(remainder)
+            return len(remainders)
+        action.finish = Mock(return_value="final")
+
+        result = self._plot(outer * inner, action=action)
+
+        assert_that(remainders, contains_exactly(None, 1, 2, 3))
+        action.finish.assert_called_once_with(self.axis)
+        assert_that(result, is_("final"))
+
+
+class PipelinedScanTests(unittest.TestCase):
+    """
+    Tests for overlapping the move to the next point with readout
+    """
+
+    def setUp(self):
+        self.defaults = TestDefaults()
+        self.blocks = {"outer": 0.0, "inner": 0.0}
+        self.events = []
+
+    def _motion(self, name):
+        def setter(x):
+            self.events.append(("move", name, x))
+            self.blocks[name] = x
+        return Motion(lambda: self.blocks[name], setter, name)
+
+    def _scan(self, name, values):
+        return SimpleScan(self._motion(name), np.array(values), self.defaults)
+
+    def test_GIVEN_detector_pauses_WHEN_pipelined_THEN_moves_before_read(self):
+        from general.scans.detector import _paused
+        scan = self._scan("theta", [1.0, 2.0, 3.0])
+
+        for point in scan.pipelined():
+            self.events.append(("count", list(point.values())[0]))
+            _paused()
+            self.events.append(("read", list(point.values())[0]))
+
+        assert_that(self.events, contains_exactly(
+            ("move", "theta", 1.0), ("count", 1.0),
+            ("move", "theta", 2.0), ("read", 1.0),
+            ("count", 2.0), ("move", "theta", 3.0), ("read", 2.0),
+            ("count", 3.0), ("read", 3.0)))
+
+    def test_GIVEN_no_pause_WHEN_pipelined_THEN_moves_after_each_point(self):
+        from general.scans.detector import _PAUSE_CALLBACKS
+        scan = self._scan("theta", [1.0, 2.0])
+
+        points = [dict(point) for point in scan.pipelined()]
+
+        assert_that(points, contains_exactly({("theta", None): 1.0},
+                                             {("theta", None): 2.0}))
+        assert_that(self.events, contains_exactly(("move", "theta", 1.0),
+                                                  ("move", "theta", 2.0)))
+        assert_that(_PAUSE_CALLBACKS, is_(empty()))
+
+    def test_GIVEN_product_scan_WHEN_pipelined_THEN_outer_moved_rarely(self):
+        outer = self._scan("outer", [0.0, 1.0])
+        inner = self._scan("inner", [5.0, 6.0])
+
+        points = [tuple(point.values())
+                  for point in (outer * inner).pipelined()]
+
+        assert_that(points, contains_exactly((0.0, 5.0), (0.0, 6.0),
+                                             (1.0, 5.0), (1.0, 6.0)))
+        assert_that([event for event in self.events if event[1] == "outer"],
+                    has_length(2))
+
+
+class PlannedScanTests(unittest.TestCase):
+    """
+    Tests for reordering scans to reduce motor travel
+    """
+
+    def setUp(self):
+        self.defaults = TestDefaults()
+        self.blocks = {"outer": 0.0, "inner": 0.0}
+        self.moves = []
+
+    def _motion(self, name):
+        def setter(x):
+            self.moves.append((name, x))
+            self.blocks[name] = x
+        return Motion(lambda: self.blocks[name], setter, name)
+
+    def _scan(self, name, values):
+        return SimpleScan(self._motion(name), np.array(values), self.defaults)
+
+    def test_GIVEN_product_scan_WHEN_planned_THEN_inner_scan_alternates(self):
+        outer = self._scan("outer", [0.0, 1.0])
+        inner = self._scan("inner", [5.0, 6.0, 7.0])
+
+        points = [tuple(point.values()) for point in (outer * inner).planned]
+
+        assert_that(points, contains_exactly(
+            (0.0, 5.0), (0.0, 6.0), (0.0, 7.0),
+            (1.0, 7.0), (1.0, 6.0), (1.0, 5.0)))
+
+    def test_GIVEN_planned_product_WHEN_plot_THEN_cells_at_true_place(self):
+        outer = self._scan("outer", [0.0, 1.0])
+        inner = self._scan("inner", [5.0, 6.0])
+        values = {(0.0, 5.0): 1, (0.0, 6.0): 2, (1.0, 5.0): 3, (1.0, 6.0): 4}
+        self.defaults.detector = lambda acc, **kwargs: (
+            acc, Average(values[(self.blocks["outer"], self.blocks["inner"])]))
+        captured = {}
+
+        def action(xs, cells, axis, remainder):
+            captured["cells"] = cells
+
+        with _plotting():
+            (outer * inner).planned.plot(action=action, frames=1)
+
+        assert_that([float(cell) for cell in captured["cells"].ravel()],
+                    contains_exactly(1, 2, 3, 4))
+
+    def test_GIVEN_sum_scan_WHEN_planned_THEN_all_points_less_travel(self):
+        motion = self._motion("outer")
+        scan = SimpleScan(motion, np.array([0.0, 2.0, 4.0]), self.defaults) + \
+            SimpleScan(motion, np.array([1.0, 3.0]), self.defaults)
+
+        points = [list(point.values())[0] for point in scan.planned]
+
+        assert_that(points, contains_exactly(0.0, 1.0, 2.0, 3.0, 4.0))
+        assert_that(len(scan.planned), is_(5))
+
+
+class SimultaneousMoveTests(unittest.TestCase):
+    """
+    Tests for moving every axis of a point together
+    """
+
+    def setUp(self):
+        self.defaults = TestDefaults()
+        self.blocks = {"theta": 0.0, "two_theta": 0.0}
+        self.events = []
+
+    def _motion(self, name):
+        def setter(x):
+            self.events.append(("move", name, x))
+            self.blocks[name] = x
+        motion = Motion(lambda: self.blocks[name], setter, name)
+        motion.block = name
+        return motion
+
+    def _scan(self, name, values):
+        return SimpleScan(self._motion(name), np.array(values), self.defaults)
+
+    def _record_wait(self, *blocks):
+        self.events.append(("wait",) + blocks)
+
+    def test_GIVEN_parallel_scan_WHEN_iterate_THEN_both_moved_then_wait(self):
+        theta = self._scan("theta", [1.0, 2.0])
+        two_theta = self._scan("two_theta", [2.0, 4.0])
+
+        with patch("general.scans.motion.g.waitfor_move",
+                   side_effect=self._record_wait):
+            points = [tuple(point.values()) for point in theta & two_theta]
+
+        assert_that(points, contains_exactly((1.0, 2.0), (2.0, 4.0)))
+        assert_that(self.events, contains_exactly(
+            ("move", "theta", 1.0), ("move", "two_theta", 2.0),
+            ("wait", "theta", "two_theta"),
+            ("move", "theta", 2.0), ("move", "two_theta", 4.0),
+            ("wait", "theta", "two_theta")))
+
+    def test_GIVEN_product_scan_WHEN_iterate_THEN_wait_for_moving_axes(self):
+        outer = self._scan("theta", [1.0])
+        inner = self._scan("two_theta", [2.0, 4.0])
+
+        with patch("general.scans.motion.g.waitfor_move",
+                   side_effect=self._record_wait):
+            list(outer * inner)
+
+        assert_that([event for event in self.events if event[0] == "wait"],
+                    contains_exactly(("wait", "theta", "two_theta"),
+                                     ("wait", "two_theta")))
+
+
+class AdaptiveScanTests(unittest.TestCase):
+    """
+    Tests for scans which refine their points around a fitted centre
+    """
+
+    def setUp(self):
+        self.defaults = TestDefaults()
+        self.position = {"value": 0.0}
+        self.measured = []
+        noise = np.random.RandomState(0)
+        self.motion = Motion(lambda: self.position["value"],
+                             lambda x: self.position.__setitem__("value", x),
+                             "theta")
+
+        def detector(acc, **kwargs):
+            x = self.position["value"]
+            self.measured.append(x)
+            peak = 1000 * np.exp(-(x - 0.3)**2 / 2)
+            return acc, Average(noise.poisson(50 + peak), 1)
+
+        self.defaults.detector = detector
+
+    def _fit(self, scan, fit):
+        with _plotting():
+            return scan.fit(fit, frames=1)
+
+    def test_GIVEN_gaussian_peak_WHEN_adaptive_scan_THEN_refined_at_peak(self):
+        from general.scans.fit import GaussianFit
+        coarse = SimpleScan(self.motion, np.linspace(-5, 5, 11), self.defaults)
+
+        result = self._fit(coarse.adaptive(GaussianFit(), target=0.02,
+                                           max_points=40), GaussianFit())
+
+        refined = self.measured[11:]
+        assert_that(result["center_err"], is_(less_than(0.02)))
+        assert_that(result["center"], is_(close_to(0.3, 0.05)))
+        assert_that(len(self.measured), is_(less_than(40)))
+        assert_that(refined, is_not(empty()))
+        assert_that(all(abs(x - 0.3) < 3 for x in refined), is_(True))
+
+    def test_GIVEN_unreachable_target_WHEN_adaptive_THEN_max_points_used(self):
+        from general.scans.fit import CentreOfMassFit
+        coarse = SimpleScan(self.motion, np.linspace(-5, 5, 11), self.defaults)
+
+        self._fit(coarse.adaptive(CentreOfMassFit(), target=0, max_points=15),
+                  CentreOfMassFit())
+
+        assert_that(self.measured, has_length(15))
+        assert_that(len(set(self.measured)), is_(15))
+
+
+class ContinuousScanEventTests(unittest.TestCase):
+    """
+    Tests for following a continuous scan through monitors
+    """
+
+    def setUp(self):
+        self.defaults = TestDefaults()
+        self.position = {"value": 0.0}
+        self.clock = {"now": 100.0}
+        self.listeners = []
+        self.reads = []
+        self.target = {"value": 0.0}
+        self.motion = Motion(self._read,
+                             lambda x: self.target.__setitem__("value", x),
+                             "axis", velocity_getter=lambda: 1.0,
+                             velocity_setter=lambda x: None,
+                             tolerance_getter=Mock(return_value=0.1),
+                             monitor=self._monitor)
+
+    def _read(self):
+        self.reads.append(self.position["value"])
+        return self.position["value"]
+
+    def _monitor(self, callback):
+        self.listeners.append(callback)
+        callback(self.position["value"])
+        return lambda: self.listeners.remove(callback)
+
+    def _step(self, acc, **kwargs):
+        # The axis moves on by one halfway through each measurement
+        self.clock["now"] += 0.5
+        self.position["value"] += np.sign(self.target["value"]
+                                          - self.position["value"])
+        for listener in self.listeners:
+            listener(self.position["value"])
+        self.clock["now"] += 0.5
+        return acc, self.position["value"] * 10
+
+    def _plot(self, scan, **kwargs):
+        with _plotting(), patch("general.scans.scans.time.sleep"), \
+                patch("general.scans.scans.time.time",
+                      side_effect=lambda: self.clock["now"]):
+            scan.plot(detector=self._step, **kwargs)
+
+    def test_GIVEN_monitored_axis_WHEN_plot_events_THEN_monitor_used(self):
+        scan = ContinuousScan(self.motion, [ContinuousMove(0.0, 4.0, 1.0)],
+                              self.defaults)
+        captured = {}
+        self.defaults.plot_functions = Mock()
+        self.defaults.plot_functions.plot_data_with_errors.side_effect = \
+            lambda xs, ys: captured.update(xs=list(xs), ys=list(ys.values()))
+
+        self._plot(scan, events=True)
+
+        assert_that(captured["xs"], contains_exactly(1.0, 2.0, 3.0, 4.0))
+        assert_that(captured["ys"], contains_exactly(10, 20, 30, 40))
+        assert_that(self.listeners, is_(empty()))
+
+    def test_GIVEN_continuous_scan_WHEN_plot_THEN_tolerance_read_once(self):
+        scan = ContinuousScan(self.motion, [ContinuousMove(0.0, 4.0, 1.0)],
+                              self.defaults)
+        self.defaults.plot_functions = Mock()
+
+        self._plot(scan)
+
+        assert_that(self.motion._tolerance_getter.call_count, is_(1))
+
+    def test_GIVEN_bins_WHEN_plot_back_and_forth_THEN_split_by_direction(self):
+        scan = ContinuousScan(self.motion, [ContinuousMove(0.0, 4.0, 1.0)],
+                              self.defaults)
+        captured = {}
+        self.defaults.plot_functions = Mock()
+        self.defaults.plot_functions.plot_data_with_errors.side_effect = \
+            lambda xs, ys: captured.update(xs=list(xs), ys=ys.values())
+
+        self._plot(ContinuousScan(self.motion, scan.and_back.moves * 3,
+                                  self.defaults), bins=2)
+
+        assert_that(captured["xs"], contains_exactly(1.0, 3.0))
+        assert_that(captured["ys"].shape, is_((2, 2)))
+
 
 if __name__ == '__main__':
     unittest.main()
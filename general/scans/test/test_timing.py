@@ -0,0 +1,245 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from hamcrest import *
+from mock import Mock, patch
+
+from general.scans.detector import _resume_count_pause
+from general.scans.monoid import Average
+from general.scans.motion import Motion
+from general.scans.scans import ProductScan, SimpleScan
+from general.scans.test.test_scans import TestDefaults
+from general.scans.timing import (TIMING_DTYPE, PointTimer, ScanTimeModel, load_timing,
+                                  recent_timing, record, timed, timing_path,
+                                  timing_table_path, travel_times)
+
+
+def _motion(name, velocity=1.0, tolerance=None):
+    return Motion(Mock(return_value=0.0), Mock(), name,
+                  velocity_getter=lambda: velocity,
+                  tolerance_getter=None if tolerance is None else (lambda: tolerance))
+
+
+def _records(**fields):
+    records = np.zeros(4, dtype=TIMING_DTYPE)
+    for name, value in fields.items():
+        records[name] = value
+    return records
+
+
+class ScanTimeModelTests(unittest.TestCase):
+    """
+    Tests for predicting the time taken by a scan
+    """
+
+    def test_GIVEN_no_records_WHEN_count_by_frames_THEN_default_rate_used(self):
+        assert_that(ScanTimeModel().count_time(frames=50), is_(5.0))
+
+    def test_GIVEN_records_WHEN_count_by_frames_THEN_rate_learned_from_records(self):
+        model = ScanTimeModel(_records(count=10.0, frames=400.0))
+
+        assert_that(model.count_time(frames=400), is_(10.0))
+
+    def test_GIVEN_records_WHEN_create_model_THEN_settle_and_overheads_are_medians(self):
+        model = ScanTimeModel(_records(move=3.0, travel=2.5, resume=0.5,
+                                       pause=0.25, readout=1.0, plot=0.25))
+
+        assert_that(model.settle, is_(0.5))
+        assert_that(model.overhead, is_(2.0))
+
+    def test_GIVEN_product_scan_WHEN_predict_time_THEN_flyback_included(self):
+        x, y = _motion("x"), _motion("y", velocity=2.0)
+        scan = ProductScan(SimpleScan(x, np.array([0, 1]), None),
+                           SimpleScan(y, np.array([0, 2, 4]), None))
+
+        # Two 1 second steps along each row, then 2 seconds flying back
+        assert_that(ScanTimeModel().scan_time(scan.setpoints(), seconds=1),
+                    is_(6 + 2 + 2 + 2))
+
+    def test_GIVEN_serpentine_product_scan_WHEN_predict_time_THEN_no_flyback(self):
+        x, y = _motion("x"), _motion("y", velocity=2.0)
+        scan = ProductScan(SimpleScan(x, np.array([0, 1]), None),
+                           SimpleScan(y, np.array([0, 2, 4]), None),
+                           serpentine=True)
+
+        assert_that(ScanTimeModel().scan_time(scan.setpoints(), seconds=1),
+                    is_(6 + 2 + 1 + 2))
+
+    def test_GIVEN_steps_within_tolerance_WHEN_predict_time_THEN_no_move_time(self):
+        x = _motion("x", tolerance=1.5)
+        scan = SimpleScan(x, np.array([0, 0.6, 1.2, 1.8]), None)
+
+        assert_that(ScanTimeModel().scan_time(scan.setpoints(), frames=50),
+                    is_(20.0))
+
+    def test_GIVEN_sum_scan_WHEN_predict_time_THEN_join_included(self):
+        x = _motion("x")
+        first = SimpleScan(x, np.array([0, 1]), None)
+        second = SimpleScan(x, np.array([5, 6]), None)
+
+        assert_that(ScanTimeModel().scan_time((first + second).setpoints()),
+                    is_(1 + 4 + 1))
+
+
+class TimingFileTests(unittest.TestCase):
+    """
+    Tests for reading the timing records of previous scans
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_GIVEN_log_file_WHEN_get_timing_path_THEN_extension_replaced(self):
+        assert_that(timing_path(os.path.join("logs", "scan.dat")),
+                    is_(os.path.join("logs", "scan.timing")))
+
+    def test_GIVEN_timing_files_WHEN_load_recent_THEN_records_concatenated(self):
+        for name in ("a", "b"):
+            _records(count=1.0).tofile(os.path.join(self.directory, name + ".timing"))
+
+        assert_that(len(recent_timing(self.directory)), is_(8))
+
+    def test_GIVEN_missing_directory_WHEN_load_recent_THEN_no_records(self):
+        assert_that(len(recent_timing(os.path.join(self.directory, "missing"))), is_(0))
+
+    def test_GIVEN_no_files_WHEN_load_timing_THEN_empty_records(self):
+        assert_that(load_timing([]).dtype, is_(TIMING_DTYPE))
+
+
+class PointTimerTests(unittest.TestCase):
+    """
+    Tests for recording where the time of a scan goes
+    """
+
+    def test_GIVEN_points_WHEN_timed_THEN_one_record_per_point_with_move(self):
+        with PointTimer() as timer:
+            for _ in timer.points([1, 2, 3]):
+                pass
+
+        assert_that(len(timer.records), is_(3))
+        assert_that(np.all(np.isfinite(timer.records["move"])), is_(True))
+        assert_that(np.all(np.isnan(timer.records["count"])), is_(True))
+
+    def test_GIVEN_dae_count_WHEN_measuring_THEN_dae_phases_left_out_of_readout(self):
+        with PointTimer() as timer, patch("general.scans.detector.g") as g:
+            g.get_frames.return_value = 0
+            g.waitfor_frames.side_effect = lambda frames: timer.add("count", 100.0)
+            timer.start_point()
+            with timer.measuring():
+                _resume_count_pause(frames=50)
+
+        row = timer.records[0]
+        assert_that(row["count"], is_(greater_than_or_equal_to(100.0)))
+        assert_that(row["readout"], is_(less_than(1.0)))
+        assert_that(row["frames"], is_(50.0))
+        assert_that(np.isfinite(row["resume"]) and np.isfinite(row["pause"]), is_(True))
+
+    def test_GIVEN_no_scan_running_WHEN_timed_THEN_nothing_recorded(self):
+        timer = PointTimer()
+        timer.start_point()
+
+        with timed("plot"):
+            record("frames", 10)
+
+        assert_that(np.isnan(timer.records[0]["plot"]), is_(True))
+        assert_that(np.isnan(timer.records[0]["frames"]), is_(True))
+
+    def test_GIVEN_records_WHEN_table_saved_THEN_point_of_each_row_readable(self):
+        with PointTimer() as timer:
+            for _ in timer.points([1, 2]):
+                record("frames", 5)
+        filename = os.path.join(tempfile.mkdtemp(), "scan.dat")
+        timer.save_table(filename)
+        timer.save_table(filename, append=True)
+
+        table = np.genfromtxt(timing_table_path(filename), names=True)
+
+        assert_that(list(table["point"]), contains_exactly(0, 1, 0, 1))
+        assert_that(list(table["frames"]), contains_exactly(5, 5, 5, 5))
+        assert_that(timer.summary(), contains_string("Timing of 2 points"))
+        shutil.rmtree(os.path.dirname(filename))
+
+    def test_GIVEN_more_points_than_capacity_WHEN_timed_THEN_only_latest_kept_but_all_summarised(self):
+        with PointTimer(capacity=4) as timer:
+            for _ in timer.points(range(10)):
+                record("frames", 5)
+
+        assert_that(len(timer), is_(10))
+        assert_that(len(timer.records), is_(4))
+        assert_that(len(timer._records), is_(4))
+        assert_that(timer.summary(), contains_string("Timing of 10 points"))
+        assert_that(timer.table(), contains_string("\n9\t"))
+
+    def test_GIVEN_dropped_points_WHEN_set_travel_THEN_kept_points_get_their_own_times(self):
+        timer = PointTimer(capacity=2)
+        for _ in range(5):
+            timer.start_point()
+
+        timer.set_travel(np.arange(5.0))
+
+        assert_that(list(timer.records["travel"]), contains_exactly(3.0, 4.0))
+
+    def test_GIVEN_steps_WHEN_travel_times_THEN_time_of_each_move(self):
+        x = _motion("x", velocity=2.0, tolerance=0.5)
+        scan = SimpleScan(x, np.array([0, 4, 4.2, 0]), None)
+
+        times = travel_times(scan.setpoints())
+
+        assert_that(np.isnan(times[0]), is_(True))
+        assert_that(list(times[1:]), contains_exactly(2.0, 0.0, 2.1))
+
+
+class ScanTimingTests(unittest.TestCase):
+    """
+    Tests for the timing records of a scan
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.defaults = TestDefaults()
+        self.defaults.detector = lambda acc, **kwargs: (acc, Average(1.0, 1))
+        self.scan = SimpleScan(_motion("theta"), np.array([0.0, 1.0, 2.0]), self.defaults)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_GIVEN_scan_WHEN_plot_THEN_timing_recorded_and_saved_apart_from_log(self):
+        with patch("general.scans.defaults.g.get_script_dir", return_value=self.directory), \
+                patch("general.scans.detector.g.get_runstate", return_value="SETUP"):
+            self.scan.plot(frames=5)
+
+        names = os.listdir(self.directory)
+        log = [name for name in names if name.endswith(".dat")][0]
+        assert_that(len(self.scan.timing), is_(3))
+        assert_that(self.defaults.last_timing is self.scan.timing, is_(True))
+        assert_that(np.all(np.isfinite(self.scan.timing["readout"])), is_(True))
+        assert_that(np.all(np.isfinite(self.scan.timing["plot"])), is_(True))
+        assert_that(len(recent_timing(self.directory)), is_(3))
+        table = np.genfromtxt(timing_table_path(os.path.join(self.directory, log)),
+                              names=True)
+        assert_that(len(table), is_(3))
+        with open(os.path.join(self.directory, log)) as logfile:
+            assert_that(logfile.read(), is_not(contains_string("#")))
+
+    def test_GIVEN_scan_interrupted_WHEN_plot_THEN_timing_still_reported(self):
+        def detector(acc, **kwargs):
+            raise KeyboardInterrupt()
+        self.defaults.detector = detector
+
+        with patch("general.scans.defaults.g.get_script_dir", return_value=self.directory), \
+                patch("general.scans.detector.g.get_runstate", return_value="SETUP"), \
+                patch("sys.stdout", new_callable=io.StringIO) as output:
+            assert_that(calling(self.scan.plot).with_args(frames=5), raises(KeyboardInterrupt))
+
+        log = [name for name in os.listdir(self.directory) if name.endswith(".dat")][0]
+        assert_that(output.getvalue(), contains_string("Scan stopped; timing"))
+        assert_that(output.getvalue(), contains_string("Timing of 1 points"))
+        assert_that(os.path.exists(timing_table_path(os.path.join(self.directory, log))),
+                    is_(True))
@@ -1,6 +1,6 @@
 import unittest
 
-from general.scans.util import get_points
+from general.scans.util import get_points, PositionIndex
 from hamcrest import *
 
 
@@ -57,6 +57,56 @@ class UtilTests(unittest.TestCase):
 
         assert_that(result, contains_exactly(1.0, 2.0, 3.0, 4.0))
 
+
+class PositionIndexTests(unittest.TestCase):
+    """
+    Tests for matching measured positions to scan points
+    """
+
+    def test_GIVEN_position_WHEN_same_position_within_tolerance_looked_up_THEN_index_of_first_point_returned(self):
+        index = PositionIndex(1e-6)
+        index.add(0.0)
+        index.add(0.3)
+
+        assert_that(index.index(0.30000001), is_(1))
+
+    def test_GIVEN_position_on_bucket_boundary_WHEN_looked_up_from_neighbouring_bucket_THEN_found(self):
+        index = PositionIndex(0.1)
+        index.add(0.1999)
+
+        assert_that(index.index(0.2001), is_(0))
+
+    def test_GIVEN_position_WHEN_position_outside_tolerance_looked_up_THEN_none_returned(self):
+        index = PositionIndex(1e-3)
+        index.add(0.3)
+
+        assert_that(index.index(0.302), is_(None))
+
+    def test_GIVEN_two_nearby_positions_WHEN_looked_up_THEN_closest_returned(self):
+        index = PositionIndex(0.1)
+        index.add(1.0)
+        index.add(1.15)
+
+        assert_that(index.index(1.09), is_(1))
+
+    def test_GIVEN_nan_positions_WHEN_added_and_looked_up_THEN_each_its_own_point(self):
+        index = PositionIndex(0.1)
+        index.add(1.0)
+
+        assert_that(index.index(float("nan")), is_(None))
+        assert_that(index.add(float("nan")), is_(1))
+        assert_that(index.index(float("nan")), is_(None))
+        assert_that(index.add(float("nan")), is_(2))
+        assert_that(index.index(float("inf")), is_(None))
+        assert_that(index.index(1.01), is_(0))
+        assert_that(len(index), is_(3))
+
+    def test_GIVEN_no_tolerance_WHEN_created_THEN_default_tolerance_used(self):
+        index = PositionIndex(0)
+
+        assert_that(index.tolerance, is_(greater_than(0)))
+
+
 if __name__ == '__main__':
     unittest.main()
 
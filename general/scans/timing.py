@@ -0,0 +1,627 @@
+"""
+The module records where the time of a scan goes and predicts how long
+a scan will take.
+
+While a scan runs, a PointTimer records how long each phase of every
+point takes: moving the axes, resuming, counting and pausing the DAE,
+reading out the measurement, and logging and plotting it.  The records
+are written to a binary timing file next to the scan log, from which
+later scans are predicted, and as a table to a text timing log.  A
+summary is printed once the scan finishes or is stopped.  Only the
+most recent points are kept in memory, so that scans which run forever
+do not grow without limit.
+
+Rather than allowing a fixed amount of time for every point, the
+ScanTimeModel follows the points of the scan in the order that they
+will be measured, so the time spent moving between them (including
+the flyback of a ProductScan and the join between the parts of a
+SumScan) is included.  The overheads of each point, such as waiting
+for a motor to settle or reading the spectra, are taken from the
+timing records of previous scans.
+"""
+
+from contextlib import contextmanager
+import os
+import time
+
+import numpy as np
+
+from .planner import axis_velocity
+
+#: The layout of a timing record for a single point of a scan.  All of
+#: the times are in seconds.  A phase which did not happen, e.g. the DAE
+#: phases of a scan over a block, is NaN.
+TIMING_DTYPE = np.dtype([
+    ("move", "<f8"),      # issuing the move until in position
+    ("travel", "<f8"),    # predicted travel time of the move
+    ("resume", "<f8"),    # resuming the DAE
+    ("count", "<f8"),     # waiting for the count to finish
+    ("pause", "<f8"),     # pausing the DAE
+    ("readout", "<f8"),   # reading the measurement
+    ("plot", "<f8"),      # logging and plotting the point
+    ("frames", "<f8"),    # frames counted
+    ("uamps", "<f8"),     # current counted
+    ("issue", "<f8"),     # issuing the setpoints, part of move
+    ("fit", "<f8")])      # running the plot action, e.g. a fit
+
+#: The phases that take up the time of a point, one after the other
+POINT_PHASES = ("move", "resume", "count", "pause", "readout", "plot")
+
+# The timers of the scans that are running, innermost last
+_TIMERS = []
+
+#: The count rate assumed when there are no timing records
+DEFAULT_FRAMES_PER_SECOND = 10.0
+
+#: The proton current assumed when there are no timing records
+DEFAULT_UAMPS_PER_SECOND = 1 / 90.0
+
+#: The number of previous scans to learn the overheads from
+TIMING_HISTORY = 20
+
+#: The number of points whose timing records a PointTimer keeps
+TIMING_RECORDS = 10000
+
+
+def timing_path(filename):
+    """
+    Get the name of the timing record file for a log file
+
+    Parameters
+    ----------
+    filename
+        the name of the text log file
+
+    Returns
+    -------
+    The name of the timing file
+    """
+    return os.path.splitext(filename)[0] + ".timing"
+
+
+def timing_table_path(filename):
+    """
+    Get the name of the text timing log for a log file
+
+    Parameters
+    ----------
+    filename
+        the name of the text log file
+
+    Returns
+    -------
+    The name of the text timing log
+    """
+    return os.path.splitext(filename)[0] + ".timing.txt"
+
+
+def load_timing(filenames):
+    """
+    Load the timing records of one or more scans
+
+    Parameters
+    ----------
+    filenames
+        the names of the timing files
+
+    Returns
+    -------
+    A structured array with the fields of TIMING_DTYPE
+    """
+    records = [np.fromfile(name, dtype=TIMING_DTYPE)
+               for name in filenames]
+    if not records:
+        return np.zeros(0, dtype=TIMING_DTYPE)
+    return np.concatenate(records)
+
+
+def recent_timing(directory, history=TIMING_HISTORY):
+    """
+    Load the timing records of the most recent scans in a directory
+
+    Parameters
+    ----------
+    directory
+        the directory holding the scan logs
+    history
+        the number of scans to load
+
+    Returns
+    -------
+    A structured array with the fields of TIMING_DTYPE
+    """
+    try:
+        names = [os.path.join(directory, name)
+                 for name in os.listdir(directory)
+                 if name.endswith(".timing")]
+    except (OSError, TypeError):
+        names = []
+    names = sorted(names, key=os.path.getmtime)[-history:]
+    return load_timing(names)
+
+
+def _median(values, default=0.0):
+    values = values[np.isfinite(values)]
+    if not values.size:
+        return default
+    return float(np.median(values))
+
+
+def _rate(amount, seconds, default):
+    used = np.isfinite(amount) & np.isfinite(seconds) & (amount > 0)
+    if not np.any(used) or np.sum(seconds[used]) <= 0:
+        return default
+    return float(np.sum(amount[used]) / np.sum(seconds[used]))
+
+
+class ScanTimeModel(object):
+    """
+    Predict the time taken by a scan from the distances between its
+    points, the velocity of each axis and the measured overheads of
+    previous scans.
+
+    Examples
+    --------
+    >>> model = ScanTimeModel(recent_timing(log_directory))
+    >>> seconds = model.scan_time(scan.setpoints(), frames=100)
+
+    """
+
+    def __init__(self, records=None):
+        """
+        Parameters
+        ----------
+        records
+            the timing records of previous scans, as a structured array
+            with the fields of TIMING_DTYPE; None to use the defaults
+        """
+        if records is None:
+            records = np.zeros(0, dtype=TIMING_DTYPE)
+        self.settle = max(0.0,
+                          _median(records["move"] - records["travel"]))
+        self.overhead = (_median(records["resume"]) +
+                         _median(records["pause"]) +
+                         _median(records["readout"]) +
+                         _median(records["plot"]))
+        self.frames_per_second = _rate(records["frames"], records["count"],
+                                       DEFAULT_FRAMES_PER_SECOND)
+        self.uamps_per_second = _rate(records["uamps"], records["count"],
+                                      DEFAULT_UAMPS_PER_SECOND)
+
+    def count_time(self, seconds=None, minutes=None, hours=None,
+                   uamps=None, frames=None, **_):
+        """
+        Predict how long the DAE will count for at each point
+
+        Returns
+        -------
+        The time in seconds
+        """
+        # pylint: disable=too-many-arguments
+        if seconds or minutes or hours:
+            return (seconds or 0) + 60 * (minutes or 0) + 3600 * (hours or 0)
+        if frames:
+            return frames / self.frames_per_second
+        if uamps:
+            return uamps / self.uamps_per_second
+        return 0
+
+    @staticmethod
+    def move_time(previous, point, axes):
+        """
+        Predict the time to move from one point to the next.  All of the
+        axes move together, so the slowest one sets the time.  Axes that
+        are already within their tolerance of the target do not move.
+
+        Parameters
+        ----------
+        previous
+            the last point, as a list of (motion, target) pairs, or None
+        point
+            the next point, as a list of (motion, target) pairs
+        axes
+            a dictionary from the id of each motion to its velocity and
+            tolerance
+
+        Returns
+        -------
+        The time in seconds, or None if nothing moves
+        """
+        if previous is None:
+            return None
+        last = {id(motion): target for motion, target in previous}
+        times = []
+        for motion, target in point:
+            if id(motion) not in last:
+                continue
+            velocity, tolerance = axes[id(motion)]
+            distance = abs(target - last[id(motion)])
+            if distance > tolerance:
+                times.append(distance / velocity)
+        return max(times) if times else None
+
+    def scan_time(self, points, pad=0, **kwargs):
+        """
+        Predict the time taken to run a scan
+
+        Parameters
+        ----------
+        points
+            the setpoints of the scan, in the order they are measured
+        pad
+            an extra time in seconds to add to every point
+        kwargs
+            the count arguments (e.g. frames) for each point
+
+        Returns
+        -------
+        The time in seconds
+        """
+        count = self.count_time(**kwargs) + self.overhead + pad
+        axes = {}
+        total = 0.0
+        previous = None
+        for point in points:
+            for motion, _ in point:
+                if id(motion) not in axes:
+                    axes[id(motion)] = (axis_velocity(motion),
+                                        _tolerance(motion))
+            moving = self.move_time(previous, point, axes)
+            if moving is not None:
+                total += moving + self.settle
+            total += count
+            previous = point
+        return total
+
+
+def _tolerance(motion):
+    """The deadband of a motion, or zero if it cannot be read"""
+    try:
+        tolerance = float(motion.tolerance)
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+    return tolerance if np.isfinite(tolerance) and tolerance > 0 else 0.0
+
+
+def _empty_records(size):
+    records = np.zeros(size, dtype=TIMING_DTYPE)
+    for name in TIMING_DTYPE.names:
+        records[name] = np.nan
+    return records
+
+
+def travel_times(points):
+    """
+    Predict the travel time of the move to each point of a scan
+
+    Parameters
+    ----------
+    points
+        the setpoints of the scan, in the order they are measured
+
+    Returns
+    -------
+    An array with the time in seconds of the move to each point, which
+    is zero if no axis moves and NaN for the first point
+    """
+    axes = {}
+    times = []
+    previous = None
+    for point in points:
+        for motion, _ in point:
+            if id(motion) not in axes:
+                axes[id(motion)] = (axis_velocity(motion), _tolerance(motion))
+        moving = ScanTimeModel.move_time(previous, point, axes)
+        times.append(np.nan if previous is None else moving or 0.0)
+        previous = point
+    return np.array(times, dtype=float)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time taken by a block of code to a phase of the current
+    point of the running scan.  Outside of a scan nothing is recorded.
+
+    Parameters
+    ----------
+    phase
+        the field of TIMING_DTYPE to add the time to
+    """
+    timer = _TIMERS[-1] if _TIMERS else None
+    started = time.time()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.add(phase, time.time() - started)
+
+
+def record(field, value):
+    """
+    Add to a field of the current point of the running scan, e.g. the
+    frames counted.  Outside of a scan nothing is recorded.
+
+    Parameters
+    ----------
+    field
+        the field of TIMING_DTYPE
+    value
+        the amount to add; None to leave the field alone
+    """
+    if _TIMERS and value is not None:
+        _TIMERS[-1].add(field, value)
+
+
+class PointTimer(object):
+    """
+    Record how long each phase of every point of a scan takes.
+
+    While the timer is entered, the timed and record functions add to
+    the point that is being measured, so the motion and detector code
+    does not need to be handed the timer.
+
+    The records of the most recent points are kept in a ring buffer.
+    Older records are dropped once they have been added to the running
+    totals of the summary.
+
+    Examples
+    --------
+    >>> with PointTimer() as timer:
+    ...     for x in timer.points(scan):
+    ...         with timer.measuring():
+    ...             acc, value = detect(acc, frames=50)
+    >>> print(timer.summary())
+
+    """
+
+    def __init__(self, capacity=TIMING_RECORDS):
+        """
+        Parameters
+        ----------
+        capacity
+            the number of points whose records are kept
+        """
+        self.capacity = max(1, capacity)
+        self._records = _empty_records(min(16, self.capacity))
+        # The points kept are numbered from _first up to, but not
+        # including, _count
+        self._first = 0
+        self._count = 0
+        # The total, number and largest of each field of the dropped points
+        self._dropped = {name: [0.0, 0, -np.inf]
+                         for name in TIMING_DTYPE.names}
+        # The fields added while moving to a point which may not exist
+        self._moving = None
+        self.started = None
+        self.finished = None
+
+    def __enter__(self):
+        _TIMERS.append(self)
+        self.started = time.time()
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.finished = time.time()
+        if self in _TIMERS:
+            _TIMERS.remove(self)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def records(self):
+        """The timing records of the most recent points, oldest first, as
+        a structured array with the fields of TIMING_DTYPE"""
+        indices = np.arange(self._first, self._count)
+        return self._records[indices % len(self._records)]
+
+    def _row(self, index):
+        return self._records[index % len(self._records)]
+
+    def _drop_oldest(self):
+        """Add the oldest record kept to the running totals and forget it"""
+        row = self._row(self._first)
+        for name, totals in self._dropped.items():
+            if np.isfinite(row[name]):
+                totals[0] += row[name]
+                totals[1] += 1
+                totals[2] = max(totals[2], row[name])
+        self._first += 1
+
+    def start_point(self):
+        """
+        Start recording a new point
+        """
+        kept = self._count - self._first
+        if kept == len(self._records):
+            if len(self._records) < self.capacity:
+                # Nothing has been dropped yet, so the records are in order
+                grown = _empty_records(min(2 * len(self._records),
+                                           self.capacity))
+                grown[:kept] = self._records
+                self._records = grown
+            else:
+                self._drop_oldest()
+        index = self._count % len(self._records)
+        if self._moving is None:
+            self._records[index] = _empty_records(1)[0]
+        else:
+            self._records[index] = self._moving
+            self._moving = None
+        self._count += 1
+
+    def add(self, field, value):
+        """
+        Add to a field of the current point
+
+        Parameters
+        ----------
+        field
+            the field of TIMING_DTYPE
+        value
+            the amount to add
+        """
+        if self._moving is not None:
+            current = self._moving[field]
+            self._moving[field] = (value if np.isnan(current)
+                                   else current + value)
+            return
+        if self._count == self._first:
+            return
+        index = (self._count - 1) % len(self._records)
+        current = self._records[field][index]
+        self._records[field][index] = (value if np.isnan(current)
+                                       else current + value)
+
+    def points(self, points):
+        """
+        Start a new point for every point of a scan, recording the time
+        taken to reach it as the move
+
+        Parameters
+        ----------
+        points
+            an iterator over the points of the scan, which moves to each
+            point before giving it
+        """
+        points = iter(points)
+        while True:
+            # Anything timed during the move, e.g. issuing the setpoints,
+            # belongs to the next point, which is only started once the
+            # move has given one
+            self._moving = _empty_records(1)[0]
+            started = time.time()
+            try:
+                point = next(points)
+            except StopIteration:
+                self._moving = None
+                return
+            self.start_point()
+            self.add("move", time.time() - started)
+            yield point
+
+    def _dae_time(self):
+        if self._count == self._first:
+            return 0.0
+        row = self._row(self._count - 1)
+        return float(np.nansum([row[name]
+                                for name in ("resume", "count", "pause")]))
+
+    @contextmanager
+    def measuring(self):
+        """
+        Time a measurement.  The time not spent resuming, counting and
+        pausing the DAE is recorded as the readout.
+        """
+        before = self._dae_time()
+        started = time.time()
+        try:
+            yield
+        finally:
+            dae = self._dae_time() - before
+            self.add("readout", time.time() - started - dae)
+
+    def set_travel(self, times):
+        """
+        Record the predicted travel time of the move to each point
+
+        Parameters
+        ----------
+        times
+            the travel time of each point, as given by travel_times
+        """
+        indices = np.arange(self._first, min(self._count, len(times)))
+        kept = indices % len(self._records)
+        self._records["travel"][kept] = times[indices]
+
+    def save(self, filename, append=False):
+        """
+        Write the records kept to the timing file of a scan log
+
+        Parameters
+        ----------
+        filename
+            the name of the text log file of the scan
+        append
+            whether to add to the end of an existing timing file, e.g.
+            when a scan is resumed
+        """
+        with open(timing_path(filename), "ab" if append else "wb") as handle:
+            self.records.tofile(handle)
+
+    def table(self, header=True):
+        """
+        Write out the records kept as a table, with a header line naming
+        the columns and a row for each point.  The times are in seconds.
+
+        Parameters
+        ----------
+        header
+            whether to start with the header line
+
+        Returns
+        -------
+        The text of the table
+        """
+        lines = ["point\t" + "\t".join(TIMING_DTYPE.names)] if header else []
+        for index, row in enumerate(self.records, self._first):
+            lines.append("{}\t".format(index) + "\t".join(
+                "{:.4g}".format(row[name]) for name in TIMING_DTYPE.names))
+        return "\n".join(lines) + "\n"
+
+    def save_table(self, filename, append=False):
+        """
+        Write the table of the records kept to the text timing log of a
+        scan log
+
+        Parameters
+        ----------
+        filename
+            the name of the text log file of the scan
+        append
+            whether to add to the end of an existing timing log, e.g.
+            when a scan is resumed
+        """
+        path = timing_table_path(filename)
+        # A resumed scan carries on under the header of the original
+        append = append and os.path.exists(path)
+        with open(path, "a" if append else "w") as handle:
+            handle.write(self.table(header=not append))
+
+    def summary(self):
+        """
+        Summarise where the time of the scan went
+
+        Returns
+        -------
+        The text of the summary
+        """
+        records = self.records
+        finished = self.finished if self.finished is not None else time.time()
+        if self.started is None:
+            wall = np.nan
+        else:
+            wall = finished - self.started
+        lines = ["Timing of {} points over {:.1f} s".format(len(self), wall),
+                 "{:<8}{:>10}{:>10}{:>10}{:>8}".format(
+                     "Phase", "Total", "Mean", "Max", "Share")]
+        accounted = 0.0
+        for name in POINT_PHASES + ("issue", "fit"):
+            times = records[name][np.isfinite(records[name])]
+            dropped_total, dropped_count, dropped_max = self._dropped[name]
+            count = times.size + dropped_count
+            if not count:
+                continue
+            total = float(np.sum(times)) + dropped_total
+            largest = max(float(np.max(times)) if times.size else -np.inf,
+                          dropped_max)
+            if name in POINT_PHASES:
+                accounted += total
+            lines.append("{:<8}{:>10.3f}{:>10.3f}{:>10.3f}{:>7.0%}".format(
+                name, total, total / count, largest,
+                total / wall if wall > 0 else np.nan))
+        if wall > 0:
+            lines.append("{:<8}{:>10.3f}{:>20}{:>7.0%}".format(
+                "other", wall - accounted, "", (wall - accounted) / wall))
+        return "\n".join(lines)
@@ -8,6 +8,9 @@ import numpy as np
 
 TIME_KEYS = ["frames", "uamps", "seconds", "minutes", "hours"]
 
+# Tolerance used to match positions when the motion cannot report its deadband
+DEFAULT_POSITION_TOLERANCE = 1e-6
+
 
 def get_points(
         current,
@@ -110,3 +113,66 @@ def local_wrapper(obj, method):
         def inner(*args, **kwargs):  # pylint: disable=unused-argument
             """Call the method without the object"""
             raise RuntimeError("Stupid Mock Issue")
+
+
+class PositionIndex(object):
+    """Find the point already measured at a motor position in constant time.
+
+    Positions are quantised into buckets the width of the tolerance,
+    so any earlier position within tolerance of a new one must sit in
+    the same bucket or one of its two neighbours.  This means that a
+    readback of 0.30000001 is matched to the point taken at 0.3
+    without searching through every point in the scan.
+
+    A position which is not a finite number, e.g. the NaN readback of a
+    disconnected block, cannot be bucketed by value.  It is kept in a
+    bucket of its own and never matches, so each such readback is
+    stored as a point of its own.
+
+    Parameters
+    ----------
+    tolerance : float
+      The largest distance between two positions that are considered
+      to be the same point, typically the deadband of the motor.
+
+    """
+
+    def __init__(self, tolerance=DEFAULT_POSITION_TOLERANCE):
+        if not tolerance > 0:
+            tolerance = DEFAULT_POSITION_TOLERANCE
+        self.tolerance = tolerance
+        self._buckets = {}
+        self._count = 0
+
+    def _bucket(self, position):
+        if not np.isfinite(position):
+            return None
+        return int(np.floor(position / self.tolerance))
+
+    def index(self, position):
+        """Return the index of the point within tolerance of position,
+        or None if there is no such point."""
+        bucket = self._bucket(position)
+        if bucket is None:
+            return None
+        best = None
+        for key in (bucket - 1, bucket, bucket + 1):
+            for known, idx in self._buckets.get(key, ()):
+                distance = abs(known - position)
+                if distance <= self.tolerance and \
+                        (best is None or distance < best[0]):
+                    best = (distance, idx)
+        if best is None:
+            return None
+        return best[1]
+
+    def add(self, position):
+        """Record a new point at position and return its index"""
+        idx = self._count
+        self._buckets.setdefault(self._bucket(position), []).append(
+            (position, idx))
+        self._count += 1
+        return idx
+
+    def __len__(self):
+        return self._count
@@ -218,3 +218,4 @@ rscan = _scan_instance.rscan
 mscan = _scan_instance.mscan
 qscan = _scan_instance.qscan
 last_scan = _scan_instance.last_scan
+resume_scan = _scan_instance.resume_scan
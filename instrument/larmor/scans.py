@@ -10,7 +10,6 @@ environment.
 from __future__ import print_function
 from datetime import datetime
 import os.path
-import numpy as np
 
 try:
     # pylint: disable=import-error
@@ -18,8 +17,7 @@ try:
 except ImportError:
     from general.scans.mocks import g
 from general.scans.defaults import Defaults
-from general.scans.detector import dae_periods, specific_spectra
-from general.scans.monoid import Polarisation, Average, MonoidList
+from general.scans.detector import dae_periods, sliced_polarisation, specific_spectra
 # from general.scans.motion import pv_motion
 from general.scans.motion import BlockMotion
 from general.scans.util import local_wrapper
@@ -113,21 +111,7 @@ def generic_pol(spectra, preconfig=lambda: None):
         g.waitfor(frames=gfrm + kwargs["frames"])
         g.pause()
 
-        pols = [Polarisation.zero() for _ in slices]
-        for channel in spectra:
-            mon1 = g.get_spectrum(1, i + 1)
-            spec1 = g.get_spectrum(channel, i + 1)
-            mon2 = g.get_spectrum(1, i + 2)
-            spec2 = g.get_spectrum(channel, i + 2)
-            for idx, slc in enumerate(slices):
-                ups = Average(
-                    np.sum(spec1["signal"][slc]) * 100.0,
-                    np.sum(mon1["signal"]) * 100.0)
-                down = Average(
-                    np.sum(spec2["signal"][slc]) * 100.0,
-                    np.sum(mon2["signal"]) * 100.0)
-                pols[idx] += Polarisation(ups, down)
-        return (acc, MonoidList(pols))
+        return acc, sliced_polarisation(spectra, i + 1, i + 2, slices)
     return inner_pol
 
 
@@ -144,6 +128,7 @@ ascan = local_wrapper(_lm, "ascan")
 dscan = local_wrapper(_lm, "dscan")
 rscan = local_wrapper(_lm, "rscan")
 last_scan = local_wrapper(_lm, "last_scan")
+resume_scan = local_wrapper(_lm, "resume_scan")
 
 
 def new_figure():
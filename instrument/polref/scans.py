@@ -126,3 +126,4 @@ ascan = _scan_instance.ascan
 dscan = _scan_instance.dscan
 rscan = _scan_instance.rscan
 last_scan = _scan_instance.last_scan
+resume_scan = _scan_instance.resume_scan